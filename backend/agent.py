@@ -10,30 +10,53 @@ from tools import (
     get_purchase_links, track_shipment, get_application_details,
     faqdoc, errordscdoc, website_search, query_data_tool
 )
-from prompts import LIA_SYSTEM_PROMPT 
+from tool_runtime import prepare_tools
+from llm_cassette import client_kwargs
+from metrics import LLM_METRICS
+
+def get_summary_llm():
+    """Small, bounded LLM used to fold old chat turns into a running summary."""
+    return ChatOpenAI(
+        model=config.OPENAI_MODEL_NAME,
+        temperature=0,
+        max_tokens=300,
+        openai_api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        callbacks=[LLM_METRICS],
+        **client_kwargs()
+    )
 
 def get_agent_executor():
     # Use config for model name and temp
     llm = ChatOpenAI(
         model=config.OPENAI_MODEL_NAME, 
         temperature=config.OPENAI_TEMPERATURE,
-        openai_api_key=config.OPENAI_API_KEY
+        openai_api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        stream_usage=True,  # Token counts for streamed calls too (/metrics)
+        callbacks=[LLM_METRICS],
+        **client_kwargs()
     )
     
     # ✅ Add all RAG tools here
-    tools = [
+    # Tool calls from one model step run concurrently (AgentExecutor gathers them on the
+    # async path); prepare_tools adds per-tool timeouts and the bounded tool thread pool.
+    tools = prepare_tools([
         get_purchase_links, track_shipment, get_application_details,
         faqdoc, errordscdoc, website_search, query_data_tool
-    ]
+    ])
     
+    # System prompt is assembled per turn from the relevant sections (prompt_builder)
     prompt = ChatPromptTemplate.from_messages([
-        ("system", LIA_SYSTEM_PROMPT),
+        ("system", "{system_prompt}"),
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
     
     agent = create_openai_tools_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    # Intermediate steps tell the caller which tools produced the answer (answer cache).
+    # Per-step timings come from agent_profiler traces; verbose is only for local debugging.
+    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=config.AGENT_VERBOSE, return_intermediate_steps=True)
     
     return agent_executor
\ No newline at end of file
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+class AgentMessageBroker:
+    """
+    In-process wake-up channel for live-agent messages. SSE streams
+    subscribe per session; the Ameyo webhook calls notify() after queueing,
+    so waiting streams drain the queue immediately instead of polling.
+
+    notify() is safe to call from any thread.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # session_id -> set[(loop, asyncio.Event)]
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id):
+        event = asyncio.Event()
+        entry = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(entry)
+        return entry
+
+    def unsubscribe(self, session_id, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+    def notify(self, session_id):
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed (worker shutting down)
+                pass
+        return len(subscribers)
+
+    def active_sessions(self):
+        with self._lock:
+            return len(self._subscribers)
+
+AGENT_BROKER = AgentMessageBroker()
@@ -0,0 +1,355 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import logging
+import argparse
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from langchain_core.callbacks import BaseCallbackHandler
+import config
+from metrics import token_usage
+
+# Structured per-turn agent traces (replaces AgentExecutor's verbose stdout).
+# Only sizes, timings and token counts are recorded, never prompt or tool text.
+
+def _new_id(nbytes):
+    return random.getrandbits(nbytes * 8).to_bytes(nbytes, "big").hex()
+
+# =========================================================
+# 📤 SPAN EXPORTERS (ROTATING JSONL / OTLP JSON FILE)
+# =========================================================
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans):
+    """One turn's spans as an OTLP/JSON ExportTraceServiceRequest (what a collector's file receiver reads)."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "lia-support-bot"}}]},
+        "scopeSpans": [{
+            "scope": {"name": "agent_profiler"},
+            "spans": [{
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_span_id"] or "",
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start_time_unix_nano"]),
+                "endTimeUnixNano": str(span["end_time_unix_nano"]),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span["attributes"].items() if v is not None],
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            } for span in spans],
+        }],
+    }]}
+
+class TraceExporter:
+    """
+    Appends finished turns to a size-rotated file: "jsonl" writes one span
+    per line, "otlp" one OTLP/JSON request per turn.
+    """
+
+    def __init__(self, path, fmt="jsonl", max_bytes=20_000_000, backup_count=5):
+        self.path = path
+        self.fmt = fmt
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # A private logger gives us thread-safe appends and rotation for free
+        self._logger = logging.getLogger(f"agent_profiler.{path}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.handlers = [handler]
+        self._logger.propagate = False
+        self.turns = 0
+        self.spans = 0
+
+    def export(self, spans):
+        if self.fmt == "otlp":
+            self._logger.info(json.dumps(to_otlp(spans), separators=(",", ":")))
+        else:
+            for span in spans:
+                self._logger.info(json.dumps(span, separators=(",", ":")))
+        self.turns += 1
+        self.spans += len(spans)
+
+# =========================================================
+# 🧵 PER-TURN TRACE (LANGCHAIN CALLBACK)
+# =========================================================
+
+class TurnTrace(BaseCallbackHandler):
+    """
+    Callback for one agent run. Records an `agent.turn` root span with one
+    child span per LLM call (tokens, latency, time to first token) and per
+    tool call (name, argument and output size, latency). Each child carries
+    the agent iteration it belongs to; every iteration is one LLM call.
+    """
+
+    # Timestamps are taken when the event happens, not after a thread hop
+    run_inline = True
+
+    def __init__(self, exporter, session_id):
+        self.exporter = exporter
+        self.trace_id = _new_id(16)
+        self.root = self._span("agent.turn", None, {"session_id": session_id})
+        self.spans = {}  # LangChain run_id -> open span
+        self.finished = []
+        self.iteration = 0
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _span(self, name, parent, attributes):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": _new_id(8),
+            "parent_span_id": parent,
+            "name": name,
+            "start_time_unix_nano": time.time_ns(),
+            "end_time_unix_nano": None,
+            "duration_ms": None,
+            "status": "ok",
+            "attributes": attributes,
+        }
+
+    def _start(self, run_id, name, attributes):
+        self.spans[run_id] = self._span(name, self.root["span_id"], {"iteration": self.iteration, **attributes})
+
+    def _end(self, run_id, status="ok", **attributes):
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return None
+        self._close(span, status)
+        span["attributes"].update(attributes)
+        self.finished.append(span)
+        return span
+
+    @staticmethod
+    def _close(span, status):
+        span["end_time_unix_nano"] = time.time_ns()
+        span["duration_ms"] = round((span["end_time_unix_nano"] - span["start_time_unix_nano"]) / 1e6, 3)
+        span["status"] = status
+
+    # --- LLM calls ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.iteration += 1
+        self.llm_calls += 1
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, "llm", {
+            "model": params.get("model_name") or params.get("model") or config.OPENAI_MODEL_NAME,
+            "messages": len(messages[0]) if messages else 0,
+            "first_token_ms": None,
+        })
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        span = self.spans.get(run_id)
+        if span is not None and span["attributes"]["first_token_ms"] is None:
+            span["attributes"]["first_token_ms"] = round((time.time_ns() - span["start_time_unix_nano"]) / 1e6, 3)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens, completion_tokens = token_usage(response)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=type(error).__name__)
+
+    # --- Tool calls ---
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.tool_calls += 1
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, f"tool:{name}", {"tool": name, "args_chars": len(input_str or "")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_chars=len(str(getattr(output, "content", output))))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=type(error).__name__)
+
+    def finish(self, error=None):
+        """Closes the turn (and any span left open by a cancelled run) and exports it."""
+        for run_id in list(self.spans):
+            self._end(run_id, "error", error="unfinished")
+        self._close(self.root, "error" if error else "ok")
+        self.root["attributes"].update({
+            "iterations": self.iteration,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        })
+        if error:
+            self.root["attributes"]["error"] = type(error).__name__
+        self.exporter.export([self.root] + self.finished)
+
+_exporter = None
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        _exporter = TraceExporter(
+            config.AGENT_TRACE_PATH,
+            fmt=config.AGENT_TRACE_FORMAT,
+            max_bytes=config.AGENT_TRACE_MAX_BYTES,
+            backup_count=config.AGENT_TRACE_BACKUP_COUNT
+        )
+    return _exporter
+
+@contextmanager
+def trace_turn(session_id):
+    """
+    Yields the callbacks to pass to one agent run: a TurnTrace, or nothing
+    when tracing is off or the turn is not sampled.
+    """
+    if not config.AGENT_TRACE_ENABLED or random.random() >= config.AGENT_TRACE_SAMPLE_RATE:
+        yield []
+        return
+    trace = TurnTrace(get_exporter(), session_id)
+    try:
+        yield [trace]
+    except BaseException as e:
+        trace.finish(error=e)
+        raise
+    trace.finish()
+
+# =========================================================
+# 📊 OFFLINE REPORT (python agent_profiler.py [files] --top 20)
+# =========================================================
+
+def _attributes_from_otlp(attributes):
+    values = {}
+    for item in attributes:
+        value = item["value"]
+        if "intValue" in value:
+            values[item["key"]] = int(value["intValue"])
+        else:
+            values[item["key"]] = next(iter(value.values()), None)
+    return values
+
+def read_spans(paths):
+    """Spans from JSONL or OTLP trace files (either format, rotated backups included)."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "resourceSpans" not in record:
+                    yield record
+                    continue
+                for resource in record["resourceSpans"]:
+                    for scope in resource.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                            yield {
+                                "trace_id": span["traceId"],
+                                "span_id": span["spanId"],
+                                "parent_span_id": span.get("parentSpanId") or None,
+                                "name": span["name"],
+                                "start_time_unix_nano": start,
+                                "end_time_unix_nano": end,
+                                "duration_ms": round((end - start) / 1e6, 3),
+                                "status": "error" if span.get("status", {}).get("code") == 2 else "ok",
+                                "attributes": _attributes_from_otlp(span.get("attributes", [])),
+                            }
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def _detail(span):
+    attrs = span["attributes"]
+    if span["name"] == "llm":
+        ttft = attrs.get("first_token_ms")
+        return (f"tokens {attrs.get('prompt_tokens', 0)}/{attrs.get('completion_tokens', 0)}"
+                + (f", first token {ttft:.0f} ms" if ttft is not None else ""))
+    if span["name"].startswith("tool:"):
+        return f"args {attrs.get('args_chars', 0)} chars, output {attrs.get('output_chars', 0)} chars"
+    return ""
+
+def build_report(spans, top=20):
+    turns, steps = [], []
+    for span in spans:
+        (turns if span["parent_span_id"] is None else steps).append(span)
+    sessions = {t["trace_id"]: t["attributes"].get("session_id") for t in turns}
+    turn_ms = {t["trace_id"]: t["duration_ms"] for t in turns}
+
+    by_name = {}
+    for span in steps:
+        by_name.setdefault(span["name"], []).append(span["duration_ms"])
+    step_total = sum(span["duration_ms"] for span in steps) or 1.0
+
+    return {
+        "turns": {
+            "count": len(turns),
+            "errors": sum(1 for t in turns if t["status"] == "error"),
+            "p50_ms": _percentile([t["duration_ms"] for t in turns], 0.5),
+            "p95_ms": _percentile([t["duration_ms"] for t in turns], 0.95),
+            "avg_iterations": round(sum(t["attributes"].get("iterations", 0) for t in turns) / len(turns), 2) if turns else 0,
+            "avg_tool_calls": round(sum(t["attributes"].get("tool_calls", 0) for t in turns) / len(turns), 2) if turns else 0,
+        },
+        "steps": sorted((
+            {
+                "name": name,
+                "count": len(durations),
+                "avg_ms": round(sum(durations) / len(durations), 1),
+                "p95_ms": _percentile(durations, 0.95),
+                "max_ms": max(durations),
+                "share": round(sum(durations) / step_total, 3),
+            } for name, durations in by_name.items()
+        ), key=lambda row: -row["share"]),
+        "slowest": [
+            {
+                "name": span["name"],
+                "duration_ms": span["duration_ms"],
+                "turn_ms": turn_ms.get(span["trace_id"]),
+                "iteration": span["attributes"].get("iteration"),
+                "status": span["status"],
+                "trace_id": span["trace_id"],
+                "session_id": sessions.get(span["trace_id"]),
+                "detail": _detail(span),
+            } for span in sorted(steps, key=lambda s: -s["duration_ms"])[:top]
+        ],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate agent traces into a slowest-steps report")
+    parser.add_argument("paths", nargs="*", help=f"Trace files (default: {config.AGENT_TRACE_PATH} and its rotated backups)")
+    parser.add_argument("--top", type=int, default=20, help="How many of the slowest steps to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(config.AGENT_TRACE_PATH + "*"))
+    if not paths:
+        sys.exit(f"No trace files found at {config.AGENT_TRACE_PATH}")
+    report = build_report(read_spans(paths), top=args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    turns = report["turns"]
+    print(f"Turns: {turns['count']} ({turns['errors']} errors)  p50 {turns['p50_ms']:.0f} ms  p95 {turns['p95_ms']:.0f} ms  "
+          f"avg iterations {turns['avg_iterations']}  avg tool calls {turns['avg_tool_calls']}")
+    print(f"\n{'step':<28} {'count':>6} {'avg ms':>9} {'p95 ms':>9} {'max ms':>9} {'share':>6}")
+    for row in report["steps"]:
+        print(f"{row['name']:<28} {row['count']:>6} {row['avg_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['max_ms']:>9.1f} {row['share']:>6.1%}")
+    print(f"\nTop {len(report['slowest'])} slowest steps")
+    for row in report["slowest"]:
+        print(f"{row['duration_ms']:>9.1f} ms  {row['name']:<24} iter {row['iteration']}  "
+              f"turn {row['turn_ms'] or 0:.0f} ms  {row['trace_id'][:12]}  {row['detail']}"
+              + ("  ❌" if row["status"] == "error" else ""))
+
+if __name__ == "__main__":
+    main()
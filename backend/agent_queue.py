@@ -0,0 +1,216 @@
+import json
+import select
+import itertools
+import threading
+import psycopg2
+import psycopg2.extensions
+from collections import defaultdict, deque
+from fastapi.concurrency import run_in_threadpool
+import config
+import db_pool
+from agent_events import AGENT_BROKER
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+NOTIFY_CHANNEL = "agent_messages"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS agent_message_queue (
+    id BIGSERIAL PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    message JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_agent_message_queue_session ON agent_message_queue (session_id, id);
+"""
+
+# Used only when Postgres is not configured (local dev), per worker: session_id -> deque[(id, message)]
+_memory_queues = defaultdict(deque)
+_memory_ids = itertools.count(1)
+_memory_lock = threading.Lock()
+
+def ensure_schema():
+    with db_pool.connection() as conn:
+        if not conn: return
+        try:
+            cur = conn.cursor()
+            cur.execute(SCHEMA_SQL)
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            logger.error(f"❌ Agent queue schema error: {e}")
+
+# =========================================================
+# 📥 QUEUE OPERATIONS
+# =========================================================
+
+def enqueue(session_id, message):
+    """
+    Appends one message for the session. The NOTIFY is sent in the same
+    transaction, so listeners on every worker wake only after it is visible.
+    """
+    with db_pool.connection() as conn:
+        if not conn:
+            with _memory_lock:
+                _memory_queues[session_id].append((next(_memory_ids), message))
+            return
+
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO agent_message_queue (session_id, message) VALUES (%s, %s::jsonb)",
+                (session_id, json.dumps(message))
+            )
+            cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, session_id))
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            logger.error(f"❌ Agent queue write error ({session_id}): {e}")
+
+def drain(session_id):
+    """
+    Atomically removes and returns every pending message in sequence order.
+    Concurrent drains (poll + SSE, two workers) never return the same row.
+    """
+    with db_pool.connection() as conn:
+        if not conn:
+            with _memory_lock:
+                queue = _memory_queues.pop(session_id, None)
+            return [message for _, message in queue] if queue else []
+
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "DELETE FROM agent_message_queue WHERE session_id = %s RETURNING id, message",
+                (session_id,)
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            cur.close()
+            return [message for _, message in sorted(rows)]
+        except Exception as e:
+            logger.warning(f"⚠️ Agent queue read error ({session_id}): {e}")
+            return []
+
+def pending(session_id, after_id=0):
+    """(id, message) pairs still queued after `after_id`, in sequence order. Nothing is removed."""
+    with db_pool.connection() as conn:
+        if not conn:
+            with _memory_lock:
+                return [(i, m) for i, m in _memory_queues.get(session_id, ()) if i > after_id]
+
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT id, message FROM agent_message_queue WHERE session_id = %s AND id > %s ORDER BY id",
+                (session_id, after_id)
+            )
+            rows = cur.fetchall()
+            cur.close()
+            return rows
+        except Exception as e:
+            logger.warning(f"⚠️ Agent queue read error ({session_id}): {e}")
+            return []
+
+def ack(session_id, message_id):
+    """Removes one delivered message."""
+    with db_pool.connection() as conn:
+        if not conn:
+            with _memory_lock:
+                queue = _memory_queues.get(session_id)
+                if queue:
+                    _memory_queues[session_id] = deque((i, m) for i, m in queue if i != message_id)
+                    if not _memory_queues[session_id]:
+                        del _memory_queues[session_id]
+            return
+
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM agent_message_queue WHERE session_id = %s AND id = %s", (session_id, message_id))
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Agent queue ack error ({session_id}): {e}")
+
+async def deliver(session_id, after_id=0):
+    """
+    Async generator of pending (id, message) pairs for an SSE stream. A
+    message is acked only when the consumer comes back for the next one,
+    i.e. after the chunk carrying it was sent; if the client disconnects
+    mid-stream the unsent messages stay queued for the next stream or poll.
+    Delivery is at-least-once: two open streams may both send a message.
+    """
+    for message_id, message in await run_in_threadpool(pending, session_id, after_id):
+        yield message_id, message
+        await run_in_threadpool(ack, session_id, message_id)
+
+# =========================================================
+# 🔔 LISTEN/NOTIFY -> IN-PROCESS BROKER
+# =========================================================
+
+class AgentQueueListener:
+    """
+    Background thread holding one dedicated (non-pooled) connection that
+    LISTENs on the queue channel and forwards each notification to
+    AGENT_BROKER, waking the matching SSE streams on this worker.
+    """
+
+    def __init__(self, dsn, poll_timeout=5):
+        self.dsn = dsn
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="agent-queue-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_timeout + 1)
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL};")
+                logger.info(f"👂 Listening on '{NOTIFY_CHANNEL}'")
+                backoff = 1
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notification = conn.notifies.pop(0)
+                        AGENT_BROKER.notify(notification.payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Agent queue listener error, reconnecting in {backoff}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+_listener = None
+
+def start_listener():
+    global _listener
+    if config.POSTGRES_DB_URL and _listener is None:
+        _listener = AgentQueueListener(config.POSTGRES_DB_URL)
+        _listener.start()
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,90 @@
+import time
+from pii_masking import StreamingMasker
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+HANDOVER_MARKER = "HANDOVER_REQUIRED"
+# The agent may wrap the marker in one or two braces
+_MARKER_FORMS = ("{{" + HANDOVER_MARKER, "{" + HANDOVER_MARKER, HANDOVER_MARKER)
+
+class HandoverTokenFilter:
+    """
+    Holds back streamed text that could be the start of the handover marker,
+    so `{HANDOVER_REQUIRED}` never reaches the browser. Once the marker is
+    seen nothing else is forwarded; the final `done` event carries the
+    cleaned response.
+    """
+
+    def __init__(self):
+        self._held = ""
+        self.handover = False
+
+    def feed(self, text):
+        if self.handover:
+            return ""
+        buffer = self._held + text
+        index = buffer.find(HANDOVER_MARKER)
+        if index >= 0:
+            self.handover = True
+            self._held = ""
+            return buffer[:index].rstrip("{")
+
+        hold = 0
+        for form in _MARKER_FORMS:
+            for size in range(min(len(form), len(buffer)), hold, -1):
+                if buffer.endswith(form[:size]):
+                    hold = size
+                    break
+        self._held = buffer[len(buffer) - hold:] if hold else ""
+        return buffer[:len(buffer) - hold]
+
+    def flush(self):
+        """End of one model call: releases text that turned out not to be the marker."""
+        held, self._held = self._held, ""
+        return "" if self.handover else held
+
+async def stream_agent(executor, inputs, emit, mask_output=False, callbacks=None):
+    """
+    Runs the agent through `astream_events`, forwarding tool progress and
+    answer tokens to `emit(event, data)` as they are produced. With
+    `mask_output`, tokens pass through a StreamingMasker (PII) first.
+    `callbacks` are attached to the run (agent_profiler traces).
+
+    Returns (result, first_token_seconds) where result is the executor's
+    final output (`output`, `intermediate_steps`), same as `ainvoke`.
+    """
+    start = time.perf_counter()
+    first_token = None
+    result = None
+    root_run_id = None
+    token_filter = HandoverTokenFilter()
+    masker = StreamingMasker() if mask_output else None
+
+    async for event in executor.astream_events(inputs, {"callbacks": callbacks or []}, version="v2"):
+        kind = event["event"]
+        if root_run_id is None:
+            root_run_id = event["run_id"]
+
+        if kind == "on_chat_model_stream":
+            text = token_filter.feed(event["data"]["chunk"].content or "")
+            if masker:
+                text = masker.feed(text)
+            if text:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                await emit("token", {"text": text})
+        elif kind == "on_chat_model_end":
+            text = token_filter.flush()
+            if masker:
+                text = masker.feed(text) + masker.flush()
+            if text:
+                await emit("token", {"text": text})
+        elif kind in ("on_tool_start", "on_tool_end"):
+            await emit("tool", {"name": event["name"], "status": "start" if kind == "on_tool_start" else "end"})
+        elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+            result = event["data"]["output"]
+
+    if result is None:
+        raise RuntimeError("Agent stream ended without a final output")
+    return result, first_token
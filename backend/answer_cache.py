@@ -0,0 +1,155 @@
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from embedding_cache import normalize_text
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Answers produced with these tools depend on who is asking, so they are never shared
+USER_SPECIFIC_TOOLS = {"get_application_details", "track_shipment"}
+
+# At least one of these must have run, i.e. the answer came from the knowledge base
+KNOWLEDGE_TOOLS = {"query_data_tool", "faqdoc", "errordscdoc", "website_search"}
+
+class SemanticAnswerCache:
+    """
+    Maps questions to previously generated agent answers. A new question is
+    served from cache when its embedding is within `threshold` cosine
+    similarity of a stored one. Entries expire after `ttl_seconds`, the
+    oldest are evicted past `max_entries`, and the whole cache is dropped
+    when the knowledge base reloads.
+    """
+
+    def __init__(self, embed_fn, threshold=0.95, ttl_seconds=3600, max_entries=1000, min_chars=12):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.min_chars = min_chars
+
+        # normalized question -> (unit vector, answer, stored_at)
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.skips = 0
+        self.invalidations = 0
+
+    def _is_lookup_candidate(self, normalized):
+        # Short turns ("yes", "ok thanks") lean on chat history and are not standalone questions
+        return len(normalized) >= self.min_chars
+
+    def _embed(self, text):
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _purge_expired(self, now):
+        expired = [k for k, (_, _, ts) in self._entries.items() if now - ts > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _rebuild_matrix(self):
+        self._matrix_keys = list(self._entries.keys())
+        if self._matrix_keys:
+            self._matrix = np.vstack([self._entries[k][0] for k in self._matrix_keys])
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    def lookup(self, question):
+        """Returns a cached answer for a near-duplicate question, or None."""
+        normalized = normalize_text(question)
+        if not self._is_lookup_candidate(normalized):
+            self.skips += 1
+            return None
+
+        with self._lock:
+            now = time.time()
+            self._purge_expired(now)
+            exact = self._entries.get(normalized)
+            if exact:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return exact[1]
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        try:
+            vector = self._embed(question)
+        except Exception as e:
+            logger.warning(f"⚠️ Answer cache embedding failed: {e}")
+            self.misses += 1
+            return None
+
+        with self._lock:
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._matrix_keys:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ vector
+            best = int(np.argmax(scores))
+            key = self._matrix_keys[best]
+            entry = self._entries.get(key)
+            if entry is None or float(scores[best]) < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.info(f"♻️ Answer cache hit ({float(scores[best]):.3f}): '{question}' ~ '{key}'")
+            return entry[1]
+
+    @staticmethod
+    def is_cacheable(intermediate_steps, answer):
+        """Only knowledge-base answers that used no user-specific tool are shareable."""
+        if not answer or "HANDOVER_REQUIRED" in answer:
+            return False
+        used_tools = {action.tool for action, _ in intermediate_steps}
+        if used_tools & USER_SPECIFIC_TOOLS:
+            return False
+        return bool(used_tools & KNOWLEDGE_TOOLS)
+
+    def store(self, question, answer):
+        normalized = normalize_text(question)
+        if not self._is_lookup_candidate(normalized):
+            return
+        try:
+            vector = self._embed(question)
+        except Exception as e:
+            logger.warning(f"⚠️ Answer cache embedding failed: {e}")
+            return
+
+        with self._lock:
+            self._entries[normalized] = (vector, answer, time.time())
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+        logger.info("🧹 Answer cache invalidated")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skips": self.skips,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,120 @@
+import time
+import asyncio
+from collections import OrderedDict
+import config
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+class ApplicationDetailsCache:
+    """
+    Per-mobile cache for eMudhra application details.
+
+    - Responses are fresh for `ttl_seconds`; the oldest entries are evicted
+      past `max_entries`.
+    - Concurrent lookups for the same mobile share one upstream call
+      (singleflight), e.g. the OTP auto-fetch racing an agent tool call.
+    - If the upstream call fails, a response up to `stale_if_error_seconds`
+      old is served instead of the error (stale-if-error). Stale data is
+      never served while upstream is healthy: every lookup past the TTL
+      waits for a fresh call.
+    - invalidate() drops a mobile, e.g. when the user logs in again.
+
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, ttl_seconds=60, stale_if_error_seconds=600, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.stale_if_error_seconds = stale_if_error_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # mobile -> (data, fetched_at)
+        self._in_flight = {}            # mobile -> asyncio.Task
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_seconds = 0.0
+        self.upstream_max_seconds = 0.0
+
+    async def get(self, mobile, fetch):
+        """
+        Returns the details for `mobile`, calling `await fetch(mobile)` on a
+        miss. Raises the upstream error only when nothing usable is cached.
+        """
+        entry = self._entries.get(mobile)
+        if entry and time.monotonic() - entry[1] <= self.ttl_seconds:
+            self.hits += 1
+            self._entries.move_to_end(mobile)
+            return entry[0]
+
+        task = self._in_flight.get(mobile)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._refresh(mobile, fetch))
+            self._in_flight[mobile] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(mobile, None))
+        else:
+            self.coalesced += 1
+
+        try:
+            # Shielded: one cancelled caller must not cancel the shared call
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            entry = self._entries.get(mobile)
+            if entry and time.monotonic() - entry[1] <= self.stale_if_error_seconds:
+                self.stale_served += 1
+                logger.warning(f"⚠️ Upstream failed, serving stale application details for {mobile}")
+                return entry[0]
+            raise
+
+    async def _refresh(self, mobile, fetch):
+        start = time.perf_counter()
+        self.upstream_calls += 1
+        try:
+            data = await fetch(mobile)
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.upstream_seconds += elapsed
+            self.upstream_max_seconds = max(self.upstream_max_seconds, elapsed)
+
+        self._entries[mobile] = (data, time.monotonic())
+        self._entries.move_to_end(mobile)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def invalidate(self, mobile):
+        self._entries.pop(mobile, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "upstream_avg_ms": round(self.upstream_seconds / self.upstream_calls * 1000, 1) if self.upstream_calls else 0,
+            "upstream_max_ms": round(self.upstream_max_seconds * 1000, 1),
+        }
+
+APPLICATION_DETAILS_CACHE = ApplicationDetailsCache(
+    ttl_seconds=config.APP_DETAILS_CACHE_TTL_SECONDS,
+    stale_if_error_seconds=config.APP_DETAILS_CACHE_STALE_IF_ERROR_SECONDS,
+    max_entries=config.APP_DETAILS_CACHE_MAX_ENTRIES
+)
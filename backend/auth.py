@@ -1,39 +1,17 @@
 import os
-import time
-import hashlib
-import requests
 import json
 import config 
+from http_client import apost, emudhra_meta
 from logger_config import get_logger # Import Logger
-from datetime import datetime, timedelta, timezone
 
 logger = get_logger(__name__)
 
-def get_ist_timestamp():
-    """Get IST time string YYYY-MM-DDTHH:mm:ss"""
-    now_utc = datetime.now(timezone.utc)
-    ist_time = now_utc + timedelta(hours=5, minutes=30)
-    return ist_time.strftime("%Y-%m-%dT%H:%M:%S")
-
-def send_otp(mobile: str):
+async def send_otp(mobile: str):
     """
     Sends OTP via eMudhra Internal API.
     """
-    ts = get_ist_timestamp()
-    txn = f"TXN{int(time.time() * 1000)}"
-    client_key = config.CLIENT_ACCESS_KEY
-    
-    raw_str = f"{client_key}{ts}{txn}"
-    auth_hash = hashlib.sha256(raw_str.encode()).hexdigest()
-    
     payload = {
-        "meta": {
-            "ver": "1.0",
-            "ts": ts,
-            "txn": txn,
-            "clientCode": config.CLIENT_CODE,
-            "clientAccessKey": auth_hash
-        },
+        "meta": emudhra_meta(),
         "userdetails": {
             "mobileno": mobile
         }
@@ -44,7 +22,7 @@ def send_otp(mobile: str):
     logger.info(f"🚀 Sending OTP to {mobile}...")
 
     try:
-        resp = requests.post(api_url, json=payload, verify=False, timeout=10)
+        resp = await apost("emudhra.send_otp", api_url, json=payload, timeout=10)
         data = resp.json()
         logger.info(f"📩 API Response: {data}")
 
@@ -70,29 +48,15 @@ def send_otp(mobile: str):
         logger.error(f"❌ Network Error: {e}")
         return False, f"Connection Failed: {str(e)}", None
 
-def verify_otp(mobile: str, otp: str, api_session_id: str):
+async def verify_otp(mobile: str, otp: str, api_session_id: str):
     """
     Verifies OTP using the api_session_id stored in DB.
     """
     if not api_session_id:
         return False, "Session expired. Please request OTP again."
 
-    ts = get_ist_timestamp()
-    txn = f"TXN{int(time.time() * 1000)}"
-    client_key = config.CLIENT_ACCESS_KEY
-    
-    raw_str = f"{client_key}{ts}{txn}"
-    auth_hash = hashlib.sha256(raw_str.encode()).hexdigest()
-
     payload = {
-        "meta": {
-            "ver": "1.0",
-            "ts": ts,
-            "txn": txn,
-            "clientCode": config.CLIENT_CODE,
-            "clientAccessKey": auth_hash,
-            "sessionId": api_session_id 
-        },
+        "meta": emudhra_meta(sessionId=api_session_id),
         "userdetails": {
             "mobileno": mobile,
             "OTP": otp
@@ -102,7 +66,7 @@ def verify_otp(mobile: str, otp: str, api_session_id: str):
     api_url = f"{config.EMUDHRA_API_URL}/CustomerCareAPI/AuthenticateMobileOTP"
 
     try:
-        resp = requests.post(api_url, json=payload, verify=False, timeout=10)
+        resp = await apost("emudhra.verify_otp", api_url, json=payload, timeout=10)
         data = resp.json()
         
         status = None
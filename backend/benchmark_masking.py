@@ -0,0 +1,164 @@
+"""
+Correctness corpus and microbenchmark for PII masking: the single-pass
+pii_masking.mask_pii() against the previous three-regex implementation.
+
+    python benchmark_masking.py [--iterations 20000] [--json]
+
+Each corpus case lists the values that must be masked (`pii`) and the
+values that must survive untouched (`keep`: error codes, AWB numbers,
+ordinary words). The streaming masker is checked against mask_pii() over
+every chunk size from 1 to 20 characters, and over random chunk splits
+of random mixes of corpus messages.
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+from pii_masking import mask_pii, verhoeff_valid, StreamingMasker
+
+def legacy_mask(text):
+    """The three-pass masking previously in main.py, kept for comparison."""
+    if not text: return ""
+    text = re.sub(r'\b(\d)\d{10}(\d)\b', r'\1XXXXXXXXXX\2', text)
+    text = re.sub(r'\b(\d)\d{8}(\d)\b', r'\1XXXXXXXX\2', text)
+    text = re.sub(r'\b([A-Za-z])[A-Za-z0-9]{8}([A-Za-z0-9])\b', r'\1XXXXXXXX\2', text)
+    return text
+
+def aadhaar(first_eleven):
+    """Appends the Verhoeff check digit."""
+    return next(first_eleven + d for d in "0123456789" if verhoeff_valid(first_eleven + d))
+
+AADHAAR_A = aadhaar("23456789012")
+AADHAAR_B = aadhaar("87654321098")
+SPACED_AADHAAR = f"{AADHAAR_B[:4]} {AADHAAR_B[4:8]} {AADHAAR_B[8:]}"
+BAD_CHECKSUM = AADHAAR_A[:-1] + str((int(AADHAAR_A[-1]) + 1) % 10)
+
+CORPUS = [
+    {"text": "My mobile is 9876543210", "pii": ["9876543210"], "keep": []},
+    {"text": "call me on +91 98765 43210 please", "pii": ["98765 43210"], "keep": []},
+    {"text": "my number 919812345678", "pii": ["919812345678"], "keep": []},
+    {"text": f"Aadhaar {AADHAAR_A} linked", "pii": [AADHAAR_A], "keep": []},
+    {"text": f"aadhar no {SPACED_AADHAAR}", "pii": [SPACED_AADHAAR], "keep": []},
+    {"text": "PAN is ABCPE1234F", "pii": ["ABCPE1234F"], "keep": []},
+    {"text": "pan abcpe1234f for KYC", "pii": ["abcpe1234f"], "keep": []},
+    {"text": "Mobile 9123456789, PAN AAACB1234C.", "pii": ["9123456789", "AAACB1234C"], "keep": []},
+    {"text": "Getting error 0x80090016 on signing", "pii": [], "keep": ["0x80090016"]},
+    {"text": "token shows CKR_TOKEN_NOT_PRESENT", "pii": [], "keep": ["CKR_TOKEN_NOT_PRESENT"]},
+    {"text": "error code DSCERR1023 in the utility", "pii": [], "keep": ["DSCERR1023"]},
+    {"text": "courier AWB 1234567890 not delivered", "pii": [], "keep": ["1234567890"]},
+    {"text": "tracking number 5098765432 status", "pii": [], "keep": ["5098765432"]},
+    {"text": "please connect me to a specialist", "pii": [], "keep": ["specialist"]},
+    {"text": "the installation failed with signature", "pii": [], "keep": ["installation", "signature"]},
+    {"text": "my ePass2003 token driver", "pii": [], "keep": ["ePass2003"]},
+    {"text": "invoice INV2024567 paid", "pii": [], "keep": ["INV2024567"]},
+    {"text": f"random 12 digits {BAD_CHECKSUM}", "pii": [], "keep": [BAD_CHECKSUM]},
+    {"text": "helpline 080-46156902", "pii": [], "keep": ["080-46156902"]},
+    {"text": "class 3 dsc validity 2 years", "pii": [], "keep": ["class 3 dsc validity 2 years"]},
+]
+
+def score(mask, corpus):
+    masked = missed = kept = over_masked = 0
+    failures = []
+    for case in corpus:
+        output = mask(case["text"])
+        for value in case["pii"]:
+            if value in output:
+                missed += 1
+                failures.append((case["text"], output))
+            else:
+                masked += 1
+        for value in case["keep"]:
+            if value in output:
+                kept += 1
+            else:
+                over_masked += 1
+                failures.append((case["text"], output))
+    return {
+        "pii_masked": masked,
+        "pii_missed": missed,
+        "benign_kept": kept,
+        "benign_masked": over_masked,
+        "recall": round(masked / (masked + missed), 3) if masked + missed else 1.0,
+        "precision": round(masked / (masked + over_masked), 3) if masked + over_masked else 1.0,
+        "failures": failures,
+    }
+
+def time_per_message(mask, corpus, iterations):
+    texts = [case["text"] for case in corpus]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            mask(text)
+    return (time.perf_counter() - start) / (iterations * len(texts)) * 1e6
+
+def check_streaming(corpus):
+    """Streamed output must equal mask_pii() of the whole text for any chunking."""
+    mismatches = []
+    for case in corpus:
+        text = f"Sure, {case['text']}. Anything else?"
+        expected = mask_pii(text)
+        for size in range(1, 21):
+            masker = StreamingMasker()
+            streamed = "".join(masker.feed(text[i:i + size]) for i in range(0, len(text), size)) + masker.flush()
+            if streamed != expected:
+                mismatches.append({"text": text, "chunk": size, "streamed": streamed})
+    return mismatches
+
+def _stream(text, sizes):
+    masker = StreamingMasker()
+    out, i = [], 0
+    for size in sizes:
+        out.append(masker.feed(text[i:i + size]))
+        i += size
+    out.append(masker.feed(text[i:]))
+    return "".join(out) + masker.flush()
+
+def check_random_splits(corpus, runs, seed=0):
+    """Random corpus mixes split at random points must still stream to mask_pii() of the whole text."""
+    rng = random.Random(seed)
+    pieces = [case["text"] for case in corpus] + [value for case in corpus for value in case["pii"] + case["keep"]]
+    mismatches = []
+    for _ in range(runs):
+        text = "".join(rng.choice(pieces) + rng.choice(["", " ", ", ", ". ", "\n"]) for _ in range(rng.randint(2, 12)))
+        sizes, total = [], 0
+        while total < len(text):
+            sizes.append(rng.randint(1, rng.choice((3, 8, 30))))
+            total += sizes[-1]
+        streamed, expected = _stream(text, sizes), mask_pii(text)
+        if streamed != expected:
+            mismatches.append({"text": text, "sizes": sizes, "streamed": streamed})
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="PII masking correctness and speed")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--random-runs", type=int, default=20000, help="Random chunk-split streaming checks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    for name, mask in (("legacy", legacy_mask), ("pii_masking", mask_pii)):
+        report[name] = {**score(mask, CORPUS), "us_per_message": round(time_per_message(mask, CORPUS, args.iterations), 2)}
+    report["streaming_mismatches"] = check_streaming(CORPUS) + check_random_splits(CORPUS, args.random_runs, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'impl':<12} {'recall':>7} {'precision':>9} {'missed':>7} {'over':>5} {'us/msg':>8}")
+        for name in ("legacy", "pii_masking"):
+            row = report[name]
+            print(f"{name:<12} {row['recall']:>7} {row['precision']:>9} {row['pii_missed']:>7} "
+                  f"{row['benign_masked']:>5} {row['us_per_message']:>8}")
+        for text, output in report["pii_masking"]["failures"]:
+            print(f"❌ {text!r} -> {output!r}")
+        print(f"Streaming mismatches: {len(report['streaming_mismatches'])}")
+
+    if report["pii_masking"]["failures"] or report["streaming_mismatches"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
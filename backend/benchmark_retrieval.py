@@ -0,0 +1,122 @@
+"""
+Compares lexical-only, vector-only and hybrid retrieval over the live
+knowledge base: recall@k, latency and embedding API calls per mode.
+
+    python benchmark_retrieval.py [--k 3] [--limit 50] [--queries eval.jsonl] [--warm]
+
+Without --queries, an evaluation set is derived from the documents: every
+error code in the Error doc (expected: the chunk containing that code) and
+every question line in the FAQ doc (expected: the chunk containing it).
+A --queries file holds one {"query", "expect", "source"} object per line,
+where `expect` is a substring the retrieved chunk must contain.
+
+Vector queries bypass the embedding cache unless --warm is given, so the
+numbers reflect first-time questions.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import knowledge_base
+from bm25_index import is_code_like
+
+MODES = ("lexical", "vector", "hybrid")
+
+def build_eval_set(limit):
+    cases = []
+    error_index = knowledge_base.LEXICAL_INDEXES.get("Error_Doc")
+    if error_index:
+        codes = []
+        for doc in error_index.documents:
+            for token in re.findall(r"[A-Za-z0-9_]+", doc.page_content):
+                if is_code_like(token.lower()) and token not in codes:
+                    codes.append(token)
+        cases += [{"query": code, "expect": code, "source": "Error_Doc"} for code in codes[:limit]]
+
+    faq_index = knowledge_base.LEXICAL_INDEXES.get("FAQ_Doc")
+    if faq_index:
+        questions = []
+        for doc in faq_index.documents:
+            for line in doc.page_content.splitlines():
+                line = line.strip()
+                if line.endswith("?") and len(line) > 15 and line not in questions:
+                    questions.append(line)
+        cases += [{"query": q, "expect": q, "source": "FAQ_Doc"} for q in questions[:limit]]
+    return cases
+
+def load_eval_set(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class CountingEmbeddings:
+    """Counts embed_query calls made by the search under test."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.inner.embed_query(text)
+
+def run_mode(mode, cases, k, warm):
+    inner = knowledge_base.embeddings if warm else knowledge_base.embeddings.underlying
+    counter = CountingEmbeddings(inner)
+    original = knowledge_base.embeddings
+    knowledge_base.embeddings = counter
+    hits, latencies = 0, []
+    try:
+        for case in cases:
+            start = time.perf_counter()
+            results = knowledge_base.search_knowledge_base(case["query"], k=k, sources=[case["source"]], mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            docs = results.get(case["source"], [])
+            if any(case["expect"].lower() in doc.page_content.lower() for doc, _ in docs):
+                hits += 1
+    finally:
+        knowledge_base.embeddings = original
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "queries": len(cases),
+        "recall_at_k": round(hits / len(cases), 3) if cases else 0,
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else 0,
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else 0,
+        "embedding_calls": counter.calls,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexical vs vector vs hybrid retrieval benchmark")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=50, help="Max derived queries per document")
+    parser.add_argument("--queries", help="JSONL evaluation set instead of derived queries")
+    parser.add_argument("--warm", action="store_true", help="Allow embedding cache hits")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    cases = load_eval_set(args.queries) if args.queries else build_eval_set(args.limit)
+    if not cases:
+        print("❌ No evaluation queries (knowledge base empty?)")
+        sys.exit(1)
+
+    report = []
+    for source in sorted({c["source"] for c in cases}):
+        subset = [c for c in cases if c["source"] == source]
+        for mode in MODES:
+            report.append({"source": source, **run_mode(mode, subset, args.k, args.warm)})
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'source':<10} {'mode':<8} {'queries':>7} {'recall@' + str(args.k):>9} {'mean ms':>9} {'p95 ms':>9} {'embeds':>7}")
+    for row in report:
+        print(f"{row['source']:<10} {row['mode']:<8} {row['queries']:>7} {row['recall_at_k']:>9} "
+              f"{row['mean_ms']:>9} {row['p95_ms']:>9} {row['embedding_calls']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+# Dropped at index and query time; they carry no signal and would dilute coverage
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "am", "i", "me", "my", "we", "our",
+    "you", "your", "it", "its", "this", "that", "these", "those", "to", "of", "in", "on", "for",
+    "with", "at", "by", "from", "as", "or", "and", "but", "if", "so", "do", "does", "did", "can",
+    "could", "will", "would", "should", "what", "which", "who", "how", "when", "where", "why",
+    "there", "here", "please", "kindly", "hi", "hello", "get", "getting", "have", "has", "had",
+    "not", "no", "any", "some", "all", "about", "into", "up", "out", "then", "than", "also",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[_\-.][a-z0-9]+)*")
+_PART_SPLIT_RE = re.compile(r"[_\-.]")
+
+def tokenize(text):
+    """
+    Lowercased word tokens. Compound tokens such as CKR_PIN_INCORRECT or
+    0x80090016 are kept whole and their parts are added too, so both the
+    exact code and "pin incorrect" match.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if _PART_SPLIT_RE.search(token):
+            tokens.extend(p for p in _PART_SPLIT_RE.split(token) if p and p not in STOPWORDS)
+    return tokens
+
+_NUMERIC_CODE_MIN_LENGTH = 5
+
+def is_code_like(token):
+    """
+    Error codes, hex values and identifiers of 4+ chars: letters mixed with
+    digits (err-1023, 0x80090016), underscores (ckr_pin_incorrect) or a bare
+    digit run of 5+ (80090016). Years, dates and short numbers ("2024",
+    "1603", "12-05-2024") are not codes on their own.
+    """
+    if len(token) < 4:
+        return False
+    if token.isdigit():
+        return len(token) >= _NUMERIC_CODE_MIN_LENGTH
+    has_letter = any(c.isalpha() for c in token)
+    return has_letter and ("_" in token or any(c.isdigit() for c in token))
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring over a fixed list of
+    documents (the same chunks as the FAISS store, so results can be fused).
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75, strong_coverage=0.9):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.strong_coverage = strong_coverage
+
+        self._postings = defaultdict(list)  # term -> [(doc_index, term_frequency)]
+        self._doc_terms = []
+        self._doc_lengths = []
+        for index, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            for term, tf in counts.items():
+                self._postings[term].append((index, tf))
+            self._doc_terms.append(set(counts))
+            self._doc_lengths.append(sum(counts.values()))
+
+        count = len(documents)
+        self._avg_length = (sum(self._doc_lengths) / count) if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        # Idf a term would have if it occurred nowhere (used for coverage)
+        self._max_idf = math.log(1 + (count + 0.5) / 0.5)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        """Indexes the documents held by a FAISS store, in index order."""
+        ids = vectorstore.index_to_docstore_id
+        documents = [vectorstore.docstore.search(ids[i]) for i in range(len(ids))]
+        return cls([d for d in documents if d is not None], **kwargs)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query, k=5):
+        """
+        Returns ([(Document, bm25_score), ...], strong) for the top `k`
+        documents. `strong` means the best document is a confident lexical
+        match: it contains a code-like query term (e.g. 0x80090016), or
+        covers at least `strong_coverage` of a 3+ term query's idf weight.
+        """
+        terms = tokenize(query)
+        if not terms or not self.documents:
+            return [], False
+
+        scores = defaultdict(float)
+        for term, query_tf in Counter(terms).items():
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[index] / self._avg_length)
+                scores[index] += query_tf * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if not scores:
+            return [], False
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        hits = [(self.documents[index], score) for index, score in ranked]
+        return hits, self._is_strong(set(terms), ranked[0][0])
+
+    def _is_strong(self, terms, top_index):
+        top_terms = self._doc_terms[top_index]
+        if any(is_code_like(t) and t in top_terms for t in terms):
+            return True
+        if len(terms) < 3:
+            return False
+        total = sum(self._idf.get(t, self._max_idf) for t in terms)
+        matched = sum(self._idf[t] for t in terms if t in top_terms)
+        return matched / total >= self.strong_coverage
+
+def reciprocal_rank_fusion(result_lists, k, rrf_k=60):
+    """
+    Fuses ranked [(Document, score)] lists by reciprocal rank: each list
+    contributes 1 / (rrf_k + rank). Documents are matched on content.
+    Returns the top `k` as [(Document, fused_score)].
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = doc.page_content
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [doc, 1.0 / (rrf_k + rank)]
+            else:
+                entry[1] += 1.0 / (rrf_k + rank)
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:k]
+    return [(doc, score) for doc, score in ranked]
@@ -15,9 +15,44 @@ SHIPROCKET_EMAIL = os.getenv("SHIPROCKET_EMAIL")
 SHIPROCKET_PASSWORD = os.getenv("SHIPROCKET_PASSWORD")
 POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
 
+# --- DATABASE CONNECTION POOL ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_LIFETIME_SECONDS = int(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+DB_POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", "5"))
+DB_POOL_HEALTH_CHECK_SECONDS = int(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30"))  # Idle time before SELECT 1
+
+# --- CHAT TRANSCRIPT LOGGING (BATCH WRITER) ---
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+CHAT_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+CHAT_LOG_QUEUE_MAX = int(os.getenv("CHAT_LOG_QUEUE_MAX", "10000"))
+CHAT_LOG_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_LOG_ENQUEUE_TIMEOUT_SECONDS", "0.05"))  # Backpressure before dropping
+CHAT_LOG_RETRY_DELAY_SECONDS = float(os.getenv("CHAT_LOG_RETRY_DELAY_SECONDS", "0.5"))  # Before the one retry of a failed batch
+
+# --- SESSION STATE CACHE ---
+# Hits are checked against the stored version on every load; 0 disables the cache
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "15"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+
+# --- LIVE AGENT PUSH (SSE) ---
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))  # Keepalive + fallback drain interval
+SSE_RETRY_MS = 3000  # Browser reconnect delay
+SHUTDOWN_TURN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TURN_TIMEOUT_SECONDS", "10"))  # Wait for streaming turns still logging
+
 # --- API URLS ---
 EMUDHRA_API_URL = os.getenv("EMUDHRA_API_URL", "https://qaserver-int.emudhra.net:18006")
 AMEYO_BASE_URL = os.getenv("AMEYO_BASE_URL", "http://127.0.0.1:5000")  # Changed to mock API for testing
+GOOGLE_DOCS_BASE_URL = os.getenv("GOOGLE_DOCS_BASE_URL", "https://docs.google.com")
+
+# --- OUTBOUND HTTP CLIENTS (POOLED, KEEP-ALIVE) ---
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))  # Default read timeout; calls may override
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))  # Async client, all hosts
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))  # Idle connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))  # Host pools kept by the sync session
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))  # Connection failures (async); also 5xx/429 on GET (sync)
+HTTP_RETRY_BACKOFF_SECONDS = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", "0.3"))
 
 # --- AMEYO CONFIGURATION ---
 AMEYO_APP_ID = os.getenv("AMEYO_APP_ID", "5cac75981134520011f881ab")
@@ -35,10 +70,91 @@ CHUNK_SIZE = 800
 CHUNK_OVERLAP = 150
 RETRIEVER_K = 3  # Number of docs to retrieve
 
+# --- HYBRID RETRIEVAL (BM25 + VECTOR) ---
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid | vector | lexical
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "10"))  # Per-retriever candidates fed into fusion
+RRF_K = 60  # Reciprocal rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_STRONG_COVERAGE = float(os.getenv("BM25_STRONG_COVERAGE", "0.9"))  # Skip embedding above this term coverage (>1 disables)
+
+# --- ERROR CODE LOOKUP (PARSED ERROR DOC) ---
+ERROR_CODE_INDEX_ENABLED = os.getenv("ERROR_CODE_INDEX_ENABLED", "true").lower() == "true"
+ERROR_CODE_FUZZY_CUTOFF = float(os.getenv("ERROR_CODE_FUZZY_CUTOFF", "0.85"))  # difflib ratio for near-miss codes (>1 disables)
+ERROR_CODE_MAX_RESULTS = 3  # Entries returned when a query names several codes
+
+# --- KNOWLEDGE BASE SNAPSHOTS (ON-DISK FAISS INDEXES) ---
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-ada-002")
+KB_INDEX_DIR = os.getenv("KB_INDEX_DIR", "kb_index")
+KB_SNAPSHOT_VERSION = 1  # Bump when the on-disk index format changes
+KB_SNAPSHOT_KEEP = int(os.getenv("KB_SNAPSHOT_KEEP", "3"))  # Newest snapshots kept per source; older ones are deleted
+
+# --- EMBEDDING CACHE ---
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(KB_INDEX_DIR, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))  # In-process LRU entries
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "50000"))  # On-disk entries
+
+# --- SEMANTIC ANSWER CACHE (VERIFIED AGENT FLOW) ---
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Cosine similarity
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_MIN_CHARS = 12  # Shorter inputs are usually follow-ups that depend on history
+
+# --- CONVERSATION MEMORY (AGENT CHAT HISTORY) ---
+CHAT_HISTORY_MAX_SESSIONS = int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "5000"))  # Resident sessions per worker
+CHAT_HISTORY_TTL_SECONDS = int(os.getenv("CHAT_HISTORY_TTL_SECONDS", "3600"))  # Idle time before eviction
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "3000"))  # Hard per-session cap (estimated)
+CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS", "1500"))  # Summarize above this
+CHAT_HISTORY_KEEP_MESSAGES = int(os.getenv("CHAT_HISTORY_KEEP_MESSAGES", "8"))  # Recent messages kept verbatim
+
+# --- APPLICATION DETAILS CACHE (EMUDHRA STATUS API) ---
+APP_DETAILS_CACHE_TTL_SECONDS = int(os.getenv("APP_DETAILS_CACHE_TTL_SECONDS", "60"))  # Fresh responses reused per mobile
+APP_DETAILS_CACHE_STALE_IF_ERROR_SECONDS = int(os.getenv("APP_DETAILS_CACHE_STALE_IF_ERROR_SECONDS", "600"))  # Max age served only when the API fails
+APP_DETAILS_CACHE_MAX_ENTRIES = int(os.getenv("APP_DETAILS_CACHE_MAX_ENTRIES", "10000"))
+
+# --- PII MASKING ---
+PII_MASK_AGENT_OUTPUT = os.getenv("PII_MASK_AGENT_OUTPUT", "false").lower() == "true"  # Also mask Aadhaar/mobile/PAN in agent replies (streamed and final)
+
+# --- SYSTEM PROMPT ASSEMBLY ---
+PROMPT_SCOPING_ENABLED = os.getenv("PROMPT_SCOPING_ENABLED", "true").lower() == "true"  # Send only sections relevant to the turn
+
+# --- FAST-PATH ROUTER (ANSWERED WITHOUT THE LLM) ---
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MAX_WORDS = int(os.getenv("FAST_PATH_MAX_WORDS", "8"))  # Longer messages always go to the agent
+
+# --- AGENT TOOL EXECUTION ---
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE", "16"))  # Threads for sync tools, per worker
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "20"))  # Default per-call limit
+TOOL_TIMEOUTS = {  # Per-tool overrides
+    "website_search": float(os.getenv("WEBSITE_SEARCH_TIMEOUT_SECONDS", "10")),
+    "get_application_details": float(os.getenv("APP_DETAILS_TOOL_TIMEOUT_SECONDS", "8")),
+}
+
 # --- AI MODEL SETTINGS ---
 OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE") or None  # OpenAI-compatible endpoint (load tests, proxies); None = api.openai.com
 OPENAI_TEMPERATURE = 0
 
+# --- LLM RECORD / REPLAY (OFFLINE BENCHMARKS) ---
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")  # off | record | replay
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join("cassettes", "llm.jsonl.gz"))
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0"))  # Replay timing: 1 = as recorded, 0 = instant
+LLM_CASSETTE_STRICT = os.getenv("LLM_CASSETTE_STRICT", "true").lower() == "true"  # false: unmatched requests reuse the next entry for the endpoint
+
+# --- AGENT TRACES (PER-TURN PROFILER) ---
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() == "true"  # AgentExecutor's unstructured stdout dump
+AGENT_TRACE_ENABLED = os.getenv("AGENT_TRACE_ENABLED", "true").lower() == "true"
+AGENT_TRACE_SAMPLE_RATE = float(os.getenv("AGENT_TRACE_SAMPLE_RATE", "1.0"))  # Fraction of agent turns traced
+AGENT_TRACE_PATH = os.getenv("AGENT_TRACE_PATH", os.path.join("logs", "agent_traces.jsonl"))
+AGENT_TRACE_FORMAT = os.getenv("AGENT_TRACE_FORMAT", "jsonl")  # jsonl (one span per line) | otlp (OTLP/JSON, one turn per line)
+AGENT_TRACE_MAX_BYTES = int(os.getenv("AGENT_TRACE_MAX_BYTES", str(20 * 1024 * 1024)))  # Rotate after this size
+AGENT_TRACE_BACKUP_COUNT = int(os.getenv("AGENT_TRACE_BACKUP_COUNT", "5"))
+
+# --- METRICS (PROMETHEUS /metrics) ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # false: /metrics is not served
+METRICS_ACTIVE_SESSION_WINDOW_SECONDS = int(os.getenv("METRICS_ACTIVE_SESSION_WINDOW_SECONDS", "300"))  # A session counts as active this long after its last message
+
 # --- WEBSITE URLS (HARDCODED LINKS) ---
 URL_BUY_DSC = "https://emudhradigital.com/buy-digital-signature"
 URL_BUY_SSL = "https://emudhradigital.com/buy-ssl-certificate"
@@ -0,0 +1,177 @@
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+HUMAN = "human"
+AI = "ai"
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 chars per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+class _Conversation:
+    __slots__ = ("turns", "summary", "tokens", "size_bytes", "rev", "last_access")
+
+    def __init__(self, turns, rev, summary=""):
+        self.turns = []          # [(type, content)] — compact, no message objects
+        self.summary = summary   # Running summary of turns folded out of `turns`
+        self.tokens = 0
+        self.size_bytes = 0
+        self.rev = rev
+        self.last_access = time.monotonic()
+        for kind, content in turns:
+            self.add(kind, content)
+
+    def add(self, kind, content):
+        self.turns.append((kind, content))
+        self.tokens += estimate_tokens(content)
+        self.size_bytes += len(content.encode("utf-8"))
+
+    def drop_oldest(self, count):
+        for _ in range(count):
+            _, content = self.turns.pop(0)
+            self.tokens -= estimate_tokens(content)
+            self.size_bytes -= len(content.encode("utf-8"))
+
+    def trim(self, max_tokens):
+        # Drop the oldest messages first; always keep the latest exchange
+        while self.tokens > max_tokens and len(self.turns) > 2:
+            self.drop_oldest(1)
+
+    def serialize(self):
+        return {
+            "ai_history": [{"type": kind, "content": c} for kind, c in self.turns],
+            "ai_summary": self.summary,
+            "ai_history_rev": self.rev,
+        }
+
+class CompactionCandidate:
+    """Snapshot of the turns to fold into the summary, tied to a history rev."""
+    __slots__ = ("rev", "summary", "turns")
+
+    def __init__(self, rev, summary, turns):
+        self.rev = rev
+        self.summary = summary
+        self.turns = turns
+
+class ConversationMemory:
+    """
+    Bounded per-session chat history for the agent.
+
+    - LRU over sessions, capped at `max_sessions`, plus idle TTL eviction.
+    - Each session is hard-capped at `max_tokens` (oldest messages go first);
+      normally HistoryCompactor folds old turns into `summary` well before.
+    - Turns are held as compact (type, content) tuples and only turned into
+      LangChain messages when the agent needs them.
+    - The persisted `ai_history`/`ai_summary` in session_data are the source
+      of truth: a session that was evicted, or updated by another worker
+      (different `ai_history_rev`), is lazily rehydrated from them.
+    """
+
+    def __init__(self, max_sessions=5000, ttl_seconds=3600, max_tokens=3000):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.rehydrations = 0
+        self.evictions = 0
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, conv = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - conv.last_access > self.ttl_seconds:
+                del self._sessions[session_id]
+                self.evictions += 1
+            else:
+                break
+
+    def _get(self, session_id, session_data):
+        """Returns the resident conversation, rehydrating it when missing or stale."""
+        now = time.monotonic()
+        rev = session_data.get("ai_history_rev", 0)
+        conv = self._sessions.get(session_id)
+        if conv is None or conv.rev != rev or now - conv.last_access > self.ttl_seconds:
+            persisted = session_data.get("ai_history") or []
+            turns = [(m["type"], m["content"]) for m in persisted if m.get("type") in (HUMAN, AI)]
+            conv = _Conversation(turns, rev, session_data.get("ai_summary") or "")
+            conv.trim(self.max_tokens)
+            self._sessions[session_id] = conv
+            if turns:
+                self.rehydrations += 1
+        conv.last_access = now
+        self._sessions.move_to_end(session_id)
+        self._evict(now)
+        return conv
+
+    def get_messages(self, session_id, session_data):
+        """LangChain messages for the agent's chat_history (summary first, if any)."""
+        with self._lock:
+            conv = self._get(session_id, session_data)
+            turns = list(conv.turns)
+            summary = conv.summary
+        messages = [HumanMessage(content=c) if kind == HUMAN else AIMessage(content=c) for kind, c in turns]
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        return messages
+
+    def append(self, session_id, user_msg, bot_msg, session_data):
+        """
+        Records one exchange and returns the session_data updates
+        (ai_history, ai_summary, ai_history_rev) for the caller to persist.
+        """
+        with self._lock:
+            conv = self._get(session_id, session_data)
+            if user_msg:
+                conv.add(HUMAN, user_msg)
+            if bot_msg:
+                conv.add(AI, bot_msg)
+            conv.trim(self.max_tokens)
+            conv.rev += 1
+            return conv.serialize()
+
+    def compaction_candidate(self, session_id, trigger_tokens, keep_messages):
+        """Older turns to summarize once the session passes `trigger_tokens`, else None."""
+        with self._lock:
+            conv = self._sessions.get(session_id)
+            if conv is None or conv.tokens <= trigger_tokens or len(conv.turns) <= keep_messages:
+                return None
+            return CompactionCandidate(conv.rev, conv.summary, conv.turns[:len(conv.turns) - keep_messages])
+
+    def apply_compaction(self, session_id, candidate, new_summary):
+        """
+        Replaces the folded turns with the new summary. Returns the
+        session_data updates, or None if the history moved on meanwhile
+        (e.g. another turn was trimmed past the candidate's turns).
+        """
+        with self._lock:
+            conv = self._sessions.get(session_id)
+            if conv is None or conv.turns[:len(candidate.turns)] != candidate.turns:
+                return None
+            conv.drop_oldest(len(candidate.turns))
+            conv.summary = new_summary
+            conv.rev += 1
+            return conv.serialize()
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            conversations = list(self._sessions.values())
+        return {
+            "sessions": len(conversations),
+            "messages": sum(len(c.turns) for c in conversations),
+            "tokens": sum(c.tokens for c in conversations),
+            "resident_bytes": sum(c.size_bytes for c in conversations),
+            "rehydrations": self.rehydrations,
+            "evictions": self.evictions,
+        }
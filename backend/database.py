@@ -1,92 +1,249 @@
 import os
 import json
 import time
-import psycopg2
+import queue
+import threading
 import config
+import db_pool
+import metrics
 from datetime import datetime
+from psycopg2.extras import execute_values
 from logger_config import get_logger
 
 logger = get_logger(__name__)
-DB_URL = config.POSTGRES_DB_URL
 
-def get_db_connection():
-    """Establishes connection to Postgres"""
-    if not DB_URL:
-        logger.error("❌ Error: POSTGRES_DB_URL is not set in .env")
-        return None
-    try:
-        conn = psycopg2.connect(DB_URL)
-        return conn
-    except Exception as e:
-        logger.error(f"❌ Database Connection Error: {e}")
-        return None
+UPSERT_SQL = """
+INSERT INTO chat_transaction_logs (
+    session_id,
+    mobile_number,
+    txn_start_time,
+    txn_end_time,
+    chat_messages
+)
+VALUES %s
+ON CONFLICT (session_id)
+DO UPDATE SET
+    mobile_number = COALESCE(NULLIF(EXCLUDED.mobile_number, ''), chat_transaction_logs.mobile_number),
+    txn_end_time = EXCLUDED.txn_end_time,
+    chat_messages = COALESCE(chat_transaction_logs.chat_messages, '[]'::jsonb) || EXCLUDED.chat_messages,
+    updated_at = NOW();
+"""
+
+# =========================================================
+# 📝 BUFFERED BATCH WRITER
+# =========================================================
+
+class ChatLogWriter:
+    """
+    Collects chat log entries in a bounded in-memory queue and writes them
+    from one background thread as a multi-row upsert, flushed every
+    `batch_size` entries or `flush_interval` seconds, whichever comes first.
+
+    When the queue is full, callers wait up to `enqueue_timeout` seconds
+    (backpressure) and the entry is then dropped and counted. A batch whose
+    upsert fails is retried once after `retry_delay` seconds, then dropped
+    and counted.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=100, flush_interval=1.0, max_queue=10000, enqueue_timeout=0.05, retry_delay=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.retried_batches = 0
+        self.failed_batches = 0
+        self.max_depth = 0
+
+    def submit(self, entry):
+        try:
+            self._queue.put(entry, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.error(f"❌ Chat log queue full, dropped {self.dropped} entries so far")
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP or self._stopping.is_set():
+                # Stop flag covers a close() that couldn't enqueue _STOP (queue full)
+                if item is not None and item is not self._STOP:
+                    batch.append(item)
+                self._drain_and_flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _drain_and_flush(self, batch):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+
+        # ON CONFLICT can touch a row only once per statement: merge per session, keep order
+        merged = {}
+        for session_id, mobile, txn_time, messages in batch:
+            row = merged.get(session_id)
+            if row is None:
+                merged[session_id] = [mobile, txn_time, txn_time, list(messages)]
+            else:
+                row[0] = mobile or row[0]
+                row[2] = txn_time
+                row[3].extend(messages)
+
+        rows = [
+            (session_id, mobile, start, end, json.dumps(messages))
+            for session_id, (mobile, start, end, messages) in merged.items()
+        ]
+
+        flush_start = time.perf_counter()
+        written = self._write(rows, len(batch))
+        if not written:
+            self.retried_batches += 1
+            time.sleep(self.retry_delay)
+            written = self._write(rows, len(batch))
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - flush_start, "db_log_write")
+
+        if written:
+            self.written += len(batch)
+            self.batches += 1
+        else:
+            self.failed += len(batch)
+            self.failed_batches += 1
+            logger.error(f"❌ Dropped chat log batch after retry ({len(batch)} entries, {self.failed_batches} batches so far)")
+
+    def _write(self, rows, entries):
+        with db_pool.connection() as conn:
+            if not conn:
+                return False
+            try:
+                cur = conn.cursor()
+                execute_values(cur, UPSERT_SQL, rows, template="(%s, %s, %s, %s, %s::jsonb)")
+                conn.commit()
+                cur.close()
+                return True
+            except Exception as e:
+                logger.error(f"❌ SQL Logging Error ({entries} entries): {e}")
+                return False
+
+    def close(self, timeout=10):
+        """Flushes everything still queued, then stops the writer thread."""
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        try:
+            # Wakes the thread right away; with a full queue the stop flag alone ends it
+            self._queue.put(self._STOP, timeout=min(1.0, timeout))
+        except queue.Full:
+            pass
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            logger.error("❌ Chat log writer did not finish flushing before shutdown")
+
+    def stats(self):
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retried_batches": self.retried_batches,
+            "failed_batches": self.failed_batches,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+        }
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_log_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ChatLogWriter(
+                    batch_size=config.CHAT_LOG_BATCH_SIZE,
+                    flush_interval=config.CHAT_LOG_FLUSH_INTERVAL_SECONDS,
+                    max_queue=config.CHAT_LOG_QUEUE_MAX,
+                    enqueue_timeout=config.CHAT_LOG_ENQUEUE_TIMEOUT_SECONDS,
+                    retry_delay=config.CHAT_LOG_RETRY_DELAY_SECONDS
+                )
+    return _writer
+
+def close_log_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = None
 
 def log_chat_to_db(session_id: str, mobile: str, user_msg: str, bot_msg: str, sender_role: str = "bot"):
     """
-    Logs chat messages to PostgreSQL asynchronously.
+    Logs chat messages to PostgreSQL asynchronously (queued for the batch writer).
     """
-    conn = get_db_connection()
-    if not conn:
+    if not config.POSTGRES_DB_URL:
+        logger.error("❌ Error: POSTGRES_DB_URL is not set in .env")
         return
 
-    try:
-        cur = conn.cursor()
-        
-        current_ts = int(time.time())
-        txn_time = datetime.now()
-        
-        new_history = []
-        
-        if user_msg:
-            new_history.append({
-                "source": "user",
-                "sentTime": str(current_ts),
-                "message": user_msg
-            })
-            
-        if bot_msg:
-            new_history.append({
-                "source": sender_role, 
-                "sentTime": str(current_ts), 
-                "message": bot_msg
-            })
-            
-        if not new_history:
-            return
+    current_ts = int(time.time())
+    txn_time = datetime.now()
+
+    new_history = []
+
+    if user_msg:
+        new_history.append({
+            "source": "user",
+            "sentTime": str(current_ts),
+            "message": user_msg
+        })
+
+    if bot_msg:
+        new_history.append({
+            "source": sender_role,
+            "sentTime": str(current_ts),
+            "message": bot_msg
+        })
+
+    if not new_history:
+        return
 
-        json_payload = json.dumps(new_history)
-
-        sql = """
-        INSERT INTO chat_transaction_logs (
-            session_id,
-            mobile_number,
-            txn_start_time,
-            txn_end_time,
-            chat_messages
-        )
-        VALUES (%s, %s, %s, %s, %s::jsonb)
-        ON CONFLICT (session_id)
-        DO UPDATE SET
-            mobile_number = COALESCE(NULLIF(EXCLUDED.mobile_number, ''), chat_transaction_logs.mobile_number),
-            txn_end_time = EXCLUDED.txn_end_time,
-            chat_messages = COALESCE(chat_transaction_logs.chat_messages, '[]'::jsonb) || EXCLUDED.chat_messages,
-            updated_at = NOW();
-        """
-        
-        cur.execute(sql, (
-            session_id,
-            mobile,
-            txn_time,
-            txn_time,
-            json_payload
-        ))
-        
-        conn.commit()
-        cur.close()
-        # logger.info(f"📝 DB Logged: {session_id}") 
-
-    except Exception as e:
-        logger.error(f"❌ SQL Logging Error: {e}")
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+    get_log_writer().submit((session_id, mobile, txn_time, new_history))
@@ -0,0 +1,241 @@
+import time
+import asyncio
+import threading
+import psycopg2
+import psycopg2.extensions
+from contextlib import contextmanager, asynccontextmanager
+import config
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe psycopg2 pool shared by StateManager and database.py.
+
+    - Idle connections are health-checked (SELECT 1) before reuse once they
+      have been idle longer than `health_check_interval`.
+    - Connections older than `max_lifetime` are closed instead of reused.
+    - Callers wait up to `acquire_timeout` for a free slot.
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=10, max_lifetime=1800,
+                 acquire_timeout=5, health_check_interval=30):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = []            # [(conn, created_at, last_used)]
+        self._created_at = {}      # id(conn) -> created_at
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.in_use = 0
+        self.acquired = 0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+        for _ in range(min_size):
+            try:
+                conn = self._connect()
+                self._idle.append((conn, self._created_at[id(conn)], time.monotonic()))
+            except Exception as e:
+                logger.error(f"❌ DB Pool warm-up failed: {e}")
+                break
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        self._created_at[id(conn)] = time.monotonic()
+        self.created += 1
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, conn, now):
+        return now - self._created_at.get(id(conn), now) > self.max_lifetime
+
+    def _is_healthy(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        if self._closed:
+            raise PoolTimeout("Connection pool is closed")
+
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self.timeouts += 1
+            raise PoolTimeout(f"No DB connection available within {self.acquire_timeout}s")
+
+        waited = time.monotonic() - started
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        try:
+            conn = None
+            while conn is None:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn = self._connect()
+                    break
+
+                candidate, _, last_used = entry
+                now = time.monotonic()
+                if candidate.closed or self._is_expired(candidate, now):
+                    self._discard(candidate)
+                elif now - last_used > self.health_check_interval and not self._is_healthy(candidate):
+                    logger.warning("⚠️ DB Pool dropped a dead connection")
+                    self._discard(candidate)
+                else:
+                    conn = candidate
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+        return conn
+
+    def putconn(self, conn):
+        try:
+            now = time.monotonic()
+            reusable = not self._closed and not conn.closed and not self._is_expired(conn, now)
+            if reusable and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Never hand an open or failed transaction to the next caller
+                try:
+                    conn.rollback()
+                except Exception:
+                    reusable = False
+
+            if reusable:
+                with self._lock:
+                    self._idle.append((conn, self._created_at.get(id(conn), now), now))
+            else:
+                self._discard(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    @asynccontextmanager
+    async def aconnection(self):
+        """Async variant: waits for a slot in a worker thread so the event loop stays free."""
+        conn = await asyncio.to_thread(self.getconn)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+        logger.info(f"🔌 DB Pool closed ({len(idle)} idle connections)")
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            in_use = self.in_use
+        return {
+            "in_use": in_use,
+            "idle": idle,
+            "max_size": self.max_size,
+            "utilization": round(in_use / self.max_size, 4) if self.max_size else 0.0,
+            "acquired": self.acquired,
+            "created": self.created,
+            "discarded": self.discarded,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+# =========================================================
+# SHARED POOL (One per worker process)
+# =========================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide pool, or None when POSTGRES_DB_URL is unset."""
+    global _pool
+    if _pool is None and config.POSTGRES_DB_URL:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    config.POSTGRES_DB_URL,
+                    min_size=config.DB_POOL_MIN_SIZE,
+                    max_size=config.DB_POOL_MAX_SIZE,
+                    max_lifetime=config.DB_POOL_MAX_LIFETIME_SECONDS,
+                    acquire_timeout=config.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                    health_check_interval=config.DB_POOL_HEALTH_CHECK_SECONDS
+                )
+    return _pool
+
+@contextmanager
+def connection():
+    """
+    Yields a pooled connection, or None when the DB is not configured or
+    unreachable, so callers keep their `if not conn: return` fallbacks.
+    """
+    pool = get_pool()
+    if not pool:
+        yield None
+        return
+
+    try:
+        conn = pool.getconn()
+    except Exception as e:
+        logger.error(f"❌ DB Connection Error: {e}")
+        conn = None
+
+    if conn is None:
+        yield None
+        return
+
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+def normalize_text(text):
+    """Collapses whitespace and case so trivially different inputs share a key."""
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+def make_cache_key(text, model_name):
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+# =========================================================
+# 💾 PERSISTENT TIER (SQLite)
+# =========================================================
+
+class SQLiteEmbeddingStore:
+    """
+    On-disk vector store keyed by cache key. Bounded to `max_rows`;
+    least recently used rows are evicted when the limit is passed.
+    """
+
+    def __init__(self, path, max_rows=50000):
+        self.path = path
+        self.max_rows = max_rows
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                cache_key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT cache_key, vector FROM embeddings WHERE cache_key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE cache_key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (cache_key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_rows
+        if overflow > 0:
+            self._conn.execute("""
+                DELETE FROM embeddings WHERE cache_key IN (
+                    SELECT cache_key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                )
+            """, (overflow,))
+            self.evictions += overflow
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+# =========================================================
+# ⚡ CACHED EMBEDDINGS (Memory LRU -> Store -> Model)
+# =========================================================
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain Embeddings object. Lookups go memory LRU first,
+    then the persistent store, and only misses reach the embedding API.
+    """
+
+    def __init__(self, underlying, model_name, store=None, memory_size=2048):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = store
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+                self.memory_evictions += 1
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing and self.store:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache read failed: {e}")
+                stored = {}
+            self.store_hits += len(stored)
+            for key, vector in stored.items():
+                self._remember(key, vector)
+            found.update(stored)
+        return found
+
+    def _save(self, computed):
+        for key, vector in computed.items():
+            self._remember(key, vector)
+        if self.store:
+            try:
+                self.store.put_many(computed)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache write failed: {e}")
+
+    def embed_documents(self, texts):
+        keys = [make_cache_key(t, self.model_name) for t in texts]
+        found = self._lookup(keys)
+
+        # Embed each distinct missing text once
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+
+        if pending:
+            self.misses += len(pending)
+            vectors = self.underlying.embed_documents(list(pending.values()))
+            computed = dict(zip(pending.keys(), vectors))
+            self._save(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        key = make_cache_key(text, self.model_name)
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._save({key: vector})
+        return vector
+
+    def stats(self):
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_evictions": self.memory_evictions,
+            "store_evictions": self.store.evictions if self.store else 0,
+        }
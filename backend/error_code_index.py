@@ -0,0 +1,200 @@
+import re
+import time
+import difflib
+from bm25_index import is_code_like
+
+# Error codes as written in the Error doc: hex (0x80090016), PKCS#11 style
+# identifiers (CKR_PIN_INCORRECT) and prefixed codes (ERR-1023, E1001)
+_CODE_RE = re.compile(
+    r"0x[0-9a-f]{4,}|[a-z][a-z0-9]*(?:_[a-z0-9]+)+|[a-z]{1,8}-?\d{2,}[a-z0-9]*",
+    re.IGNORECASE
+)
+# Plain numbers only count as codes after "error"/"code" (e.g. "Error 1603")
+_NUMERIC_CODE_RE = re.compile(r"^(?:error|code)(?:\s*code)?\s*(?:no\.?)?\s*[:#-]?\s*(\d{3,})\b", re.IGNORECASE)
+
+# Bullets, numbering and "Error:" / "Error Code:" prefixes before the code on an entry line
+_BULLET_RE = re.compile(r"^\s*(?:[-•*▪]|\d{1,3}[.)])?\s*")
+_PREFIX_RE = re.compile(r"^(?:error|code)(?:\s*code)?\s*(?:no\.?)?\s*[:#-]?\s*", re.IGNORECASE)
+_CODE_SEPARATOR_RE = re.compile(r"^\s*(?:,|/|&|\bor\b)\s*", re.IGNORECASE)
+_QUERY_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[_\-.][A-Za-z0-9]+)*")
+_NORMALIZE_RE = re.compile(r"[\s_\-.]")
+_HEADING_MAX_CHARS = 60
+
+def normalize_code(code):
+    """Case/separator-insensitive key: 0x8009-0016, 80090016 and 0X80090016 are equal."""
+    key = _NORMALIZE_RE.sub("", code.lower())
+    return key[2:] if key.startswith("0x") and len(key) > 2 else key
+
+def _has_digit(key):
+    """Numeric, hex and prefixed codes (1603, 80090016, err1023) only match exactly."""
+    return any(c.isdigit() for c in key)
+
+def _is_heading(line, previous):
+    """Short unpunctuated line after a blank line, e.g. "Installation Errors"."""
+    stripped = line.strip()
+    return (
+        not previous.strip()
+        and len(stripped) <= _HEADING_MAX_CHARS
+        and not stripped.endswith((".", ":", "?", "!", ")"))
+    )
+
+def _head_codes(line):
+    """Codes that open an entry line, e.g. "2. Error 0x80090016 / 0x8009001D: ..."."""
+    rest = _BULLET_RE.sub("", line, count=1)
+    numeric = _NUMERIC_CODE_RE.match(rest)
+    if numeric:
+        return [numeric.group(1)]
+
+    prefixed = _PREFIX_RE.match(rest)
+    if prefixed:
+        rest = rest[prefixed.end():]
+
+    codes = []
+    while True:
+        match = _CODE_RE.match(rest)
+        if not match or not is_code_like(match.group(0).lower()):
+            break
+        codes.append(match.group(0))
+        rest = rest[match.end():]
+        separator = _CODE_SEPARATOR_RE.match(rest)
+        if not separator:
+            break
+        rest = rest[separator.end():]
+
+    if not codes and prefixed:
+        # "Error: Keyset does not exist (0x80090016)" - code later on an Error line
+        codes = [c for c in _CODE_RE.findall(rest) if is_code_like(c.lower())]
+    return codes
+
+class ErrorEntry:
+    __slots__ = ("codes", "text")
+
+    def __init__(self, codes, text):
+        self.codes = codes
+        self.text = text
+
+class ErrorCodeIndex:
+    """
+    Code -> resolution table parsed from the Error doc.
+
+    An entry starts at a line that opens with one or more error codes and
+    runs until the next such line or section heading, so a code's message
+    and fix are always returned together (vector chunks can split them or
+    mix in neighbours).
+
+    Lookups try, per code-like query token:
+    - exact: the code as written in the doc
+    - normalized: case and separators ignored, "0x" optional
+    - fuzzy: closest normalized key at or above `fuzzy_cutoff` (typos such
+      as CKR_PIN_INCORECT), for tokens of 5+ characters. Only for names
+      without digits: 0x80090017 or 16030 are different codes, not typos.
+    """
+
+    def __init__(self, entries, fuzzy_cutoff=0.85, max_results=3):
+        self.entries = entries
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.max_results = max_results
+        self._exact = {}
+        self._normalized = {}
+        for entry in entries:
+            for code in entry.codes:
+                self._exact.setdefault(code, entry)
+                self._normalized.setdefault(normalize_code(code), entry)
+        self._fuzzy_keys = [key for key in self._normalized if not _has_digit(key)]
+
+        # Metrics
+        self.lookups = 0
+        self.matches = {"exact": 0, "normalized": 0, "fuzzy": 0}
+        self.misses = 0
+        self.lookup_seconds = 0.0
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        entries, codes, lines = [], None, []
+
+        def close():
+            body = "\n".join(lines).strip()
+            if codes and body:
+                entries.append(ErrorEntry(codes, body))
+
+        previous = ""
+        for line in text.splitlines():
+            head = _head_codes(line) if line.strip() else []
+            if head:
+                close()
+                codes, lines = head, [line]
+            elif codes is not None and line.strip() and _is_heading(line, previous):
+                close()
+                codes, lines = None, []
+            elif codes is not None:
+                lines.append(line)
+            previous = line
+        close()
+        return cls(_merge_duplicates(entries), **kwargs)
+
+    @classmethod
+    def from_documents(cls, documents, **kwargs):
+        """Fallback when only snapshot chunks are available (doc download failed)."""
+        return cls.from_text("\n\n".join(d.page_content for d in documents), **kwargs)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, query):
+        """
+        Returns [(ErrorEntry, match_type), ...] for the codes named in
+        `query` (at most `max_results`), or [] when none is recognised.
+        """
+        start = time.perf_counter()
+        found = []
+        for token in _QUERY_TOKEN_RE.findall(query):
+            # Plain numbers ("error 1603") too: digit keys only ever match exactly, never fuzzy
+            if not is_code_like(token.lower()) and not normalize_code(token).isdigit():
+                continue
+            match = self._match(token)
+            if match and all(match[0] is not entry for entry, _ in found):
+                found.append(match)
+                if len(found) >= self.max_results:
+                    break
+
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        if found:
+            for _, match_type in found:
+                self.matches[match_type] += 1
+        else:
+            self.misses += 1
+        return found
+
+    def _match(self, token):
+        entry = self._exact.get(token)
+        if entry:
+            return entry, "exact"
+        key = normalize_code(token)
+        entry = self._normalized.get(key)
+        if entry:
+            return entry, "normalized"
+        if len(key) >= 5 and self.fuzzy_cutoff <= 1 and not _has_digit(key):
+            close = difflib.get_close_matches(key, self._fuzzy_keys, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return self._normalized[close[0]], "fuzzy"
+        return None
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "codes": len(self._normalized),
+            "lookups": self.lookups,
+            **self.matches,
+            "misses": self.misses,
+            "avg_us": round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else 0,
+        }
+
+def _merge_duplicates(entries):
+    """A code listed twice (e.g. overlapping snapshot chunks) keeps its longest entry."""
+    best = {}
+    for entry in entries:
+        key = normalize_code(entry.codes[0])
+        if key not in best or len(entry.text) > len(best[key].text):
+            best[key] = entry
+    return list(best.values())
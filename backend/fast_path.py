@@ -0,0 +1,161 @@
+import re
+import threading
+import config
+from prompt_builder import is_smalltalk
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Routes that never reach the LLM agent
+GREETING = "greeting"
+HANDOVER = "handover"
+PURCHASE = "purchase"
+STATUS = "status"
+
+HANDOVER_TOKEN = "{HANDOVER_REQUIRED}"
+
+SUGGESTIONS = (
+    "\n\nI can also help you with:\n"
+    "- Checking your application status\n"
+    "- Choosing the right Digital Signature Certificate\n"
+    "- Downloading your DSC with a USB token"
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_HANDOVER_RE = re.compile(
+    r"\b(talk|speak|connect|chat|transfer)\b.*\b(human|agent|person|executive|specialist|representative|someone|support)\b"
+    r"|\b(live|human|real) (agent|person|support)\b|\bcustomer (care|support)\b"
+)
+_NEGATION_WORDS = {"not", "dont", "don", "no", "never", "without"}
+
+_PURCHASE_RE = re.compile(r"\b(buy|purchase|order)\b")
+_PRODUCTS = (
+    ("dsc", re.compile(r"\b(dsc|digital signature|signature certificate)\b"), "Digital Signature Certificate", config.URL_BUY_DSC),
+    ("ssl", re.compile(r"\bssl\b"), "SSL Certificate", config.URL_BUY_SSL),
+    ("token", re.compile(r"\b(usb )?token\b"), "USB Token", config.URL_BUY_TOKEN),
+)
+
+_STATUS_RE = re.compile(
+    r"\b(application|app|dsc|order)\b.*\b(status|details)\b|\b(status|details)\b.*\b(application|app|dsc|order)\b"
+    r"|\bcheck (my )?status\b|^status$"
+)
+
+# Anything needing a decision, explanation or troubleshooting goes to the agent
+_REASONING_WORDS = {
+    "which", "why", "how", "when", "difference", "compare", "for", "error", "not",
+    "failed", "problem", "issue", "help", "can", "should", "class", "price", "cost",
+}
+
+# Request phrasing ("can I talk to ...", "need help from ...") still counts as an explicit handover
+_HANDOVER_BLOCKERS = _REASONING_WORDS - {"can", "help", "for"}
+
+_THANKS_WORDS = {"thanks", "thank", "thx", "ty"}
+_BYE_WORDS = {"bye", "goodbye"}
+
+class FastPathMatch:
+    __slots__ = ("route", "response", "product")
+
+    def __init__(self, route, response="", product=None):
+        self.route = route
+        self.response = response
+        self.product = product
+
+class FastPathRouter:
+    """
+    Rule/keyword router for verified users, run before the LLM agent.
+    Only unambiguous, short requests match (greetings, explicit handover,
+    "buy <product>", "show my application status"); everything else
+    returns None and goes to the agent.
+
+    Also tracks which route served each turn and the agent latency saved
+    (running average agent latency minus fast-path latency).
+    """
+
+    def __init__(self, max_words=8, enabled=True):
+        self.max_words = max_words
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.route_counts = {}
+        self.agent_calls = 0
+        self.agent_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def route(self, message):
+        if not self.enabled:
+            return None
+        text = (message or "").lower().strip()
+        words = _WORD_RE.findall(text)
+        if not words:
+            return None
+        word_set = set(words)
+
+        # Greetings, thanks and goodbyes only: "ok" may be the answer to the agent's question
+        if is_smalltalk(word_set):
+            return FastPathMatch(GREETING, self._greeting(word_set))
+
+        # Longer messages describe a problem, even when they mention support or an agent
+        if len(words) > self.max_words:
+            return None
+
+        if _HANDOVER_RE.search(text) and not word_set & (_NEGATION_WORDS | _HANDOVER_BLOCKERS):
+            # Same token the agent emits; the caller's handover branch takes over
+            return FastPathMatch(HANDOVER, HANDOVER_TOKEN)
+
+        if word_set & _REASONING_WORDS:
+            return None
+
+        if _PURCHASE_RE.search(text):
+            matches = [p for p in _PRODUCTS if p[1].search(text)]
+            if len(matches) == 1:
+                product, _, label, url = matches[0]
+                return FastPathMatch(PURCHASE, self._purchase(label, url), product)
+            return None
+
+        if _STATUS_RE.search(text):
+            # Response is rendered by the caller from get_application_details
+            return FastPathMatch(STATUS)
+
+        return None
+
+    @staticmethod
+    def _greeting(words):
+        if words & _BYE_WORDS:
+            return "Thank you for contacting eMudhra. Have a great day! 👋"
+        if words & _THANKS_WORDS:
+            return "You're welcome! 😊 Is there anything else I can help you with?" + SUGGESTIONS
+        return "Hello! 👋 I'm Lia, your eMudhra Digital Trust Support Agent. How can I help you today?" + SUGGESTIONS
+
+    @staticmethod
+    def _purchase(label, url):
+        return (
+            f"You can buy your {label} online from the official eMudhra website:\n\n"
+            f"🔗 [Buy {label}]({url})"
+            + SUGGESTIONS
+        )
+
+    # =========================================================
+    # 📊 ROUTE ACCOUNTING
+    # =========================================================
+
+    def record(self, route, seconds):
+        """Records the route that served a turn ("agent", "answer_cache" or a fast path)."""
+        with self._lock:
+            self.route_counts[route] = self.route_counts.get(route, 0) + 1
+            if route == "agent":
+                self.agent_calls += 1
+                self.agent_seconds += seconds
+                return 0.0
+            avg_agent = self.agent_seconds / self.agent_calls if self.agent_calls else 0.0
+            saved = max(0.0, avg_agent - seconds)
+            self.saved_seconds += saved
+        logger.info(f"⚡ Route [{route}] served in {seconds * 1000:.0f}ms (~{saved:.2f}s saved)")
+        return saved
+
+    def stats(self):
+        with self._lock:
+            return {
+                "routes": dict(self.route_counts),
+                "avg_agent_seconds": round(self.agent_seconds / self.agent_calls, 3) if self.agent_calls else 0,
+                "saved_seconds": round(self.saved_seconds, 2),
+            }
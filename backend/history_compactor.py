@@ -0,0 +1,83 @@
+from fastapi.concurrency import run_in_threadpool
+from langchain_core.messages import SystemMessage, HumanMessage
+from conversation_memory import HUMAN
+from state_manager import StateManager
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a support chat between a customer and Lia, "
+    "eMudhra's Digital Trust Support Agent. Merge the previous summary with the new "
+    "messages into one concise summary (max 120 words). Keep product names, DSC "
+    "class/type, error codes, troubleshooting steps already tried, application status "
+    "facts and open questions. Do not add anything that was not said."
+)
+
+class HistoryCompactor:
+    """
+    Folds older turns of long sessions into a running summary so the prompt
+    stays flat: once a session's history passes `trigger_tokens`, everything
+    except the last `keep_messages` messages is summarized. Runs after the
+    response is sent (FastAPI background task), never on the request path.
+    """
+
+    def __init__(self, llm, memory, trigger_tokens=1500, keep_messages=8):
+        self.llm = llm
+        self.memory = memory
+        self.trigger_tokens = trigger_tokens
+        self.keep_messages = keep_messages
+        self._in_flight = set()
+        self.compactions = 0
+        self.failures = 0
+
+    async def summarize(self, previous_summary, turns):
+        transcript = "\n".join(
+            f"{'Customer' if kind == HUMAN else 'Lia'}: {content}" for kind, content in turns
+        )
+        prompt = [
+            SystemMessage(content=SUMMARY_INSTRUCTIONS),
+            HumanMessage(content=f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"),
+        ]
+        result = await self.llm.ainvoke(prompt)
+        return result.content.strip()
+
+    async def maybe_compact(self, session_id):
+        """Background task: summarizes old turns if the session is over budget."""
+        if session_id in self._in_flight:
+            return
+        candidate = self.memory.compaction_candidate(session_id, self.trigger_tokens, self.keep_messages)
+        if not candidate:
+            return
+
+        self._in_flight.add(session_id)
+        try:
+            summary = await self.summarize(candidate.summary, candidate.turns)
+            updates = self.memory.apply_compaction(session_id, candidate, summary)
+            if updates is None:
+                return
+
+            persisted = await run_in_threadpool(self._persist, session_id, candidate.rev, updates)
+            if persisted:
+                self.compactions += 1
+                logger.info(f"🗜️ Compacted {len(candidate.turns)} messages for {session_id}")
+            else:
+                # A newer turn was written meanwhile; drop our copy and retry next turn
+                self.memory.discard(session_id)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"❌ History compaction failed ({session_id}): {e}")
+        finally:
+            self._in_flight.discard(session_id)
+
+    @staticmethod
+    def _persist(session_id, expected_rev, updates):
+        session = StateManager.load_session(session_id)
+        if session.get("ai_history_rev", 0) != expected_rev:
+            return False
+        session.update(updates)
+        # The rev is re-checked on every CAS retry: a turn written meanwhile invalidates the summary
+        return session.flush(expected={"ai_history_rev": expected_rev})
+
+    def stats(self):
+        return {"compactions": self.compactions, "failures": self.failures, "in_flight": len(self._in_flight)}
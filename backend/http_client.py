@@ -0,0 +1,200 @@
+import time
+import hashlib
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import config
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# =========================================================
+# 🔏 EMUDHRA REQUEST SIGNER
+# =========================================================
+
+def get_ist_timestamp():
+    """Get IST time string YYYY-MM-DDTHH:mm:ss"""
+    now_utc = datetime.now(timezone.utc)
+    ist_time = now_utc + timedelta(hours=5, minutes=30)
+    return ist_time.strftime("%Y-%m-%dT%H:%M:%S")
+
+def emudhra_meta(**extra):
+    """
+    Signed `meta` block for eMudhra CustomerCareAPI requests:
+    clientAccessKey = sha256(CLIENT_ACCESS_KEY + ts + txn).
+    Extra fields (e.g. sessionId) are appended as given.
+    """
+    ts = get_ist_timestamp()
+    txn = f"TXN{int(time.time() * 1000)}"
+    auth_hash = hashlib.sha256(f"{config.CLIENT_ACCESS_KEY}{ts}{txn}".encode()).hexdigest()
+    meta = {
+        "ver": "1.0",
+        "ts": ts,
+        "txn": txn,
+        "clientCode": config.CLIENT_CODE,
+        "clientAccessKey": auth_hash
+    }
+    meta.update(extra)
+    return meta
+
+# =========================================================
+# ⏱️ PER-ENDPOINT LATENCY HISTOGRAMS
+# =========================================================
+
+# Upper bounds in seconds (cumulative buckets, Prometheus style)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """Bucket upper bound containing the q-quantile (None in the +Inf bucket)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return None
+
+    def snapshot(self):
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_seconds": round(self.total_seconds, 4),
+            "avg_ms": round(self.total_seconds / self.count * 1000, 1) if self.count else 0,
+            "p50_le_s": self.quantile(0.5),
+            "p95_le_s": self.quantile(0.95),
+            "buckets": cumulative,
+        }
+
+_histograms = {}
+_histogram_lock = threading.Lock()
+
+def observe(endpoint, seconds, error=False):
+    with _histogram_lock:
+        histogram = _histograms.get(endpoint)
+        if histogram is None:
+            histogram = _histograms[endpoint] = LatencyHistogram()
+        histogram.observe(seconds, error)
+
+def latency_stats():
+    """endpoint -> histogram snapshot, for every outbound endpoint called so far."""
+    with _histogram_lock:
+        return {endpoint: h.snapshot() for endpoint, h in _histograms.items()}
+
+# =========================================================
+# 🌐 ASYNC CLIENT (EMUDHRA, AMEYO)
+# =========================================================
+
+# One shared async client per worker so outbound calls never block the event loop
+_async_client = None
+
+def _timeout():
+    return httpx.Timeout(config.HTTP_TIMEOUT_SECONDS, connect=config.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+def get_async_client():
+    """Returns the process-wide httpx.AsyncClient (created lazily on first use)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        limits = httpx.Limits(
+            max_connections=config.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        # Transport retries cover connection failures only, so POSTs (e.g. OTP) are never sent twice.
+        # verify=False matches the internal eMudhra servers' self-signed certificates
+        transport = httpx.AsyncHTTPTransport(verify=False, limits=limits, retries=config.HTTP_RETRIES)
+        _async_client = httpx.AsyncClient(transport=transport, timeout=_timeout())
+    return _async_client
+
+async def apost(endpoint, url, **kwargs):
+    """POST on the shared async client, timed into the `endpoint` histogram."""
+    start = time.perf_counter()
+    try:
+        response = await get_async_client().post(url, **kwargs)
+    except Exception:
+        observe(endpoint, time.perf_counter() - start, error=True)
+        raise
+    observe(endpoint, time.perf_counter() - start, error=response.status_code >= 500)
+    return response
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+        logger.info("🔌 Async HTTP client closed")
+    _async_client = None
+
+# =========================================================
+# 🌐 SYNC SESSION (GOOGLE DOCS, SCRIPTS)
+# =========================================================
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the process-wide requests.Session with pooled, retrying adapters."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=config.HTTP_RETRIES,
+                    backoff_factor=config.HTTP_RETRY_BACKOFF_SECONDS,
+                    status_forcelist=(429, 502, 503, 504),
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    raise_on_status=False
+                )
+                # pool_connections = hosts kept, pool_maxsize = keep-alive connections per host
+                adapter = HTTPAdapter(
+                    pool_connections=config.HTTP_POOL_HOSTS,
+                    pool_maxsize=config.HTTP_POOL_MAX_KEEPALIVE,
+                    max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def get(endpoint, url, **kwargs):
+    """GET on the shared session, timed into the `endpoint` histogram."""
+    kwargs.setdefault("timeout", (config.HTTP_CONNECT_TIMEOUT_SECONDS, config.HTTP_TIMEOUT_SECONDS))
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, **kwargs)
+    except Exception:
+        observe(endpoint, time.perf_counter() - start, error=True)
+        raise
+    observe(endpoint, time.perf_counter() - start, error=response.status_code >= 500)
+    return response
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
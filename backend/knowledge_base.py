@@ -1,27 +1,47 @@
 import os
-import config 
-import requests
+import json
+import shutil
+import hashlib
+import config
+import http_client
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from error_code_index import ErrorCodeIndex
+from llm_cassette import client_kwargs
 from logger_config import get_logger
 
 logger = get_logger(__name__)
 
 FAQ_DOC_ID = config.FAQ_DOC_ID
 ERROR_DOC_ID = config.ERROR_DOC_ID
+INDEX_DIR = config.KB_INDEX_DIR
+LATEST_POINTER = "LATEST"
 
 if not config.OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY not found. Please check your .env file.")
 
-embeddings = OpenAIEmbeddings(openai_api_key=config.OPENAI_API_KEY)
+# Shared by index builds and live queries, so repeated text never re-hits the API
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(
+        model=config.EMBEDDING_MODEL_NAME,
+        openai_api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        **client_kwargs()
+    ),
+    model_name=config.EMBEDDING_MODEL_NAME,
+    store=SQLiteEmbeddingStore(config.EMBEDDING_CACHE_PATH, max_rows=config.EMBEDDING_CACHE_MAX_ROWS),
+    memory_size=config.EMBEDDING_CACHE_MEMORY_SIZE
+)
 
 def download_google_doc(file_id):
     """Downloads Google Doc content as plain text and cleans it."""
-    url = f"https://docs.google.com/document/d/{file_id}/export?format=txt"
+    url = f"{config.GOOGLE_DOCS_BASE_URL}/document/d/{file_id}/export?format=txt"
     try:
-        response = requests.get(url)
+        response = http_client.get("google.doc_export", url)
         response.raise_for_status()
         text = response.text
         cleaned_text = text.replace('\r\n', '\n').replace('\n\n\n', '\n\n')
@@ -30,35 +50,274 @@ def download_google_doc(file_id):
         logger.error(f"Error downloading doc {file_id}: {e}")
         return ""
 
-def create_retriever_from_text(text, source_name):
-    """Creates a FAISS retriever from text content."""
-    if not text:
+# =========================================================
+# 💾 INDEX SNAPSHOTS (Content-Hash Keyed)
+# =========================================================
+
+def get_snapshot_key(text, source_name):
+    """
+    Hash of everything that changes the index: source text, chunking
+    settings, embedding model and the snapshot format version.
+    """
+    settings = json.dumps({
+        "version": config.KB_SNAPSHOT_VERSION,
+        "source": source_name,
+        "chunk_size": config.CHUNK_SIZE,
+        "chunk_overlap": config.CHUNK_OVERLAP,
+        "model": config.EMBEDDING_MODEL_NAME,
+    }, sort_keys=True)
+
+    digest = hashlib.sha256()
+    digest.update(settings.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def _read_latest_key(source_name):
+    pointer = os.path.join(INDEX_DIR, source_name, LATEST_POINTER)
+    try:
+        with open(pointer, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
         return None
-        
+
+def _write_latest_key(source_name, key):
+    pointer = os.path.join(INDEX_DIR, source_name, LATEST_POINTER)
+    tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(key)
+    os.replace(tmp_pointer, pointer)
+
+def load_snapshot(source_name, key):
+    """Loads a saved FAISS index for this source/key, or None if missing."""
+    snapshot_dir = os.path.join(INDEX_DIR, source_name, key)
+    if not os.path.isdir(snapshot_dir):
+        return None
+    try:
+        # Snapshots are written only by this service, so the pickled docstore is trusted.
+        return FAISS.load_local(snapshot_dir, embeddings, allow_dangerous_deserialization=True)
+    except Exception as e:
+        logger.warning(f"⚠️ Corrupt KB snapshot {snapshot_dir}, rebuilding: {e}")
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        return None
+
+def save_snapshot(vectorstore, source_name, key):
+    """
+    Writes the index to a temp dir and renames it into place, so parallel
+    workers never see a half-written snapshot.
+    """
+    source_dir = os.path.join(INDEX_DIR, source_name)
+    snapshot_dir = os.path.join(source_dir, key)
+    tmp_dir = f"{snapshot_dir}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(source_dir, exist_ok=True)
+        vectorstore.save_local(tmp_dir)
+        try:
+            os.rename(tmp_dir, snapshot_dir)
+        except OSError:
+            # Another worker published the same snapshot first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        _write_latest_key(source_name, key)
+        logger.info(f"💾 Saved KB snapshot {source_name}/{key}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save KB snapshot {source_name}/{key}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    prune_snapshots(source_name, key, config.KB_SNAPSHOT_KEEP)
+
+def prune_snapshots(source_name, latest_key, keep):
+    """
+    Deletes all but the `keep` newest snapshots of a source (by mtime). The
+    one the latest pointer names is always kept; temp dirs are left to the
+    worker writing them.
+    """
+    source_dir = os.path.join(INDEX_DIR, source_name)
+    try:
+        snapshots = [
+            (entry.stat().st_mtime, entry) for entry in os.scandir(source_dir)
+            if entry.is_dir() and not entry.name.endswith(".tmp") and entry.name != latest_key
+        ]
+    except OSError as e:
+        # e.g. another worker pruning at the same time; the next save retries
+        logger.warning(f"⚠️ Could not prune KB snapshots for {source_name}: {e}")
+        return
+    snapshots.sort(key=lambda item: item[0], reverse=True)
+    for _, entry in snapshots[max(keep - 1, 0):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+        logger.info(f"🧹 Pruned KB snapshot {source_name}/{entry.name}")
+
+def build_vectorstore(text, source_name):
+    """Splits and embeds text into a new FAISS index (network heavy)."""
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=config.CHUNK_SIZE, 
+        chunk_size=config.CHUNK_SIZE,
         chunk_overlap=config.CHUNK_OVERLAP
     )
     texts = text_splitter.split_text(text)
-    
+
     docs = [Document(page_content=t, metadata={"source": source_name}) for t in texts]
-    
+
     if not docs:
         return None
-        
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    
+
+    return FAISS.from_documents(docs, embeddings)
+
+def get_vectorstore(text, source_name):
+    """
+    Returns the FAISS index for this text, loading a matching snapshot when
+    one exists and only re-embedding when content or settings changed.
+    """
+    if not text:
+        # Download failed: serve the last good snapshot rather than nothing
+        latest_key = _read_latest_key(source_name)
+        if latest_key:
+            vectorstore = load_snapshot(source_name, latest_key)
+            if vectorstore:
+                logger.warning(f"⚠️ {source_name} unavailable, using last snapshot {latest_key}")
+                return vectorstore
+        return None
+
+    key = get_snapshot_key(text, source_name)
+    vectorstore = load_snapshot(source_name, key)
+    if vectorstore:
+        logger.info(f"   - {source_name}: loaded snapshot {key}")
+        return vectorstore
+
+    logger.info(f"   - {source_name}: no snapshot for {key}, embedding...")
+    vectorstore = build_vectorstore(text, source_name)
+    if vectorstore:
+        save_snapshot(vectorstore, source_name, key)
+    return vectorstore
+
+def as_retriever(vectorstore):
+    if not vectorstore:
+        return None
     return vectorstore.as_retriever(search_kwargs={"k": config.RETRIEVER_K})
 
-# --- INITIALIZE KNOWLEDGE BASE ---
-logger.info("📚 Loading Knowledge Base (FAQs & Error Docs)...")
+def create_retriever_from_text(text, source_name):
+    """Creates a FAISS retriever from text content."""
+    return as_retriever(get_vectorstore(text, source_name))
+
+# =========================================================
+# 🔎 HYBRID RETRIEVAL (BM25 + Vector, One Embedding)
+# =========================================================
+
+RETRIEVAL_STATS = {"queries": 0, "lexical_only": 0, "embedded": 0}
 
-faq_text = download_google_doc(FAQ_DOC_ID)
-logger.info(f"   - FAQ Doc loaded: {len(faq_text)} characters")
-faq_retriever = create_retriever_from_text(faq_text, "FAQ_Doc")
+def build_lexical_index(vectorstore):
+    """BM25 index over the same chunks as the FAISS store (works for snapshots too)."""
+    if not vectorstore:
+        return None
+    return BM25Index.from_vectorstore(
+        vectorstore,
+        k1=config.BM25_K1,
+        b=config.BM25_B,
+        strong_coverage=config.BM25_STRONG_COVERAGE
+    )
+
+def search_knowledge_base(query, k=None, sources=None, mode=None):
+    """
+    Searches the loaded corpora (all, or just `sources`) and returns
+    {source_name: [(Document, score), ...]}, best first.
+
+    mode (default config.RETRIEVAL_MODE):
+    - "hybrid": BM25 first; if any source has a strong lexical hit (exact
+      error code, near-complete term coverage) the BM25 results are returned
+      with no embedding call. Otherwise the query is embedded once and
+      BM25 and vector rankings are fused per source (reciprocal rank fusion).
+    - "lexical": BM25 only. "vector": FAISS only (score = L2 distance).
+    """
+    k = k or config.RETRIEVER_K
+    mode = mode or config.RETRIEVAL_MODE
+    names = [name for name in (sources or VECTOR_STORES) if VECTOR_STORES.get(name)]
+    if not names:
+        return {}
+    RETRIEVAL_STATS["queries"] += 1
 
-error_text = download_google_doc(ERROR_DOC_ID)
-logger.info(f"   - Error Doc loaded: {len(error_text)} characters")
-error_retriever = create_retriever_from_text(error_text, "Error_Doc")
+    candidates = max(k, config.RETRIEVAL_CANDIDATES)
+    lexical, strong = {}, False
+    if mode != "vector":
+        for name in names:
+            index = LEXICAL_INDEXES.get(name)
+            hits, is_strong = index.search(query, candidates) if index else ([], False)
+            lexical[name] = hits
+            strong = strong or is_strong
+        if mode == "lexical" or strong:
+            RETRIEVAL_STATS["lexical_only"] += 1
+            return {name: hits[:k] for name, hits in lexical.items()}
 
-logger.info("✅ Knowledge Base Loaded!")
\ No newline at end of file
+    query_vector = embeddings.embed_query(query)
+    RETRIEVAL_STATS["embedded"] += 1
+    results = {}
+    for name in names:
+        vector_hits = VECTOR_STORES[name].similarity_search_with_score_by_vector(query_vector, k=candidates)
+        if mode == "vector":
+            results[name] = vector_hits[:k]
+        else:
+            results[name] = reciprocal_rank_fusion([vector_hits, lexical[name]], k, rrf_k=config.RRF_K)
+    return results
+
+# =========================================================
+# 🧾 ERROR CODE LOOKUP (Parsed Error Doc)
+# =========================================================
+
+def build_error_code_index(text, lexical_index):
+    """
+    Parses the Error doc into a code -> resolution table. Falls back to the
+    snapshot chunks (via the BM25 index) when the download failed.
+    """
+    if not config.ERROR_CODE_INDEX_ENABLED:
+        return None
+    kwargs = {"fuzzy_cutoff": config.ERROR_CODE_FUZZY_CUTOFF, "max_results": config.ERROR_CODE_MAX_RESULTS}
+    if text:
+        index = ErrorCodeIndex.from_text(text, **kwargs)
+    elif lexical_index:
+        index = ErrorCodeIndex.from_documents(lexical_index.documents, **kwargs)
+    else:
+        return None
+    logger.info(f"   - Error codes indexed: {index.stats()['codes']} codes in {len(index)} entries")
+    return index
+
+# =========================================================
+# 🔄 LOAD / RELOAD
+# =========================================================
+
+_reload_listeners = []
+
+def on_reload(callback):
+    """Registers a callback run after every knowledge base reload (e.g. cache invalidation)."""
+    _reload_listeners.append(callback)
+
+def load_knowledge_base():
+    """Downloads both docs and (re)binds the module-level indexes and retrievers."""
+    global faq_store, faq_retriever, error_store, error_retriever, VECTOR_STORES, LEXICAL_INDEXES, ERROR_CODE_INDEX, KB_VERSION
+
+    logger.info("📚 Loading Knowledge Base (FAQs & Error Docs)...")
+
+    faq_text = download_google_doc(FAQ_DOC_ID)
+    logger.info(f"   - FAQ Doc loaded: {len(faq_text)} characters")
+    faq_store = get_vectorstore(faq_text, "FAQ_Doc")
+    faq_retriever = as_retriever(faq_store)
+
+    error_text = download_google_doc(ERROR_DOC_ID)
+    logger.info(f"   - Error Doc loaded: {len(error_text)} characters")
+    error_store = get_vectorstore(error_text, "Error_Doc")
+    error_retriever = as_retriever(error_store)
+
+    VECTOR_STORES = {"FAQ_Doc": faq_store, "Error_Doc": error_store}
+    LEXICAL_INDEXES = {name: build_lexical_index(store) for name, store in VECTOR_STORES.items() if store}
+    ERROR_CODE_INDEX = build_error_code_index(error_text, LEXICAL_INDEXES.get("Error_Doc"))
+    KB_VERSION = hashlib.sha256(f"{faq_text}\0{error_text}".encode("utf-8")).hexdigest()[:16]
+
+    logger.info(f"✅ Knowledge Base Loaded! (version {KB_VERSION})")
+
+def reload_knowledge_base():
+    """Rebuilds the indexes from the latest docs and notifies listeners."""
+    load_knowledge_base()
+    for callback in _reload_listeners:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ KB reload listener failed: {e}")
+
+# --- INITIALIZE KNOWLEDGE BASE ---
+load_knowledge_base()
@@ -0,0 +1,289 @@
+import os
+import json
+import gzip
+import time
+import codecs
+import asyncio
+import hashlib
+import threading
+from collections import deque
+import httpx
+import config
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# =========================================================
+# 📼 CASSETTE FILE (JSON Lines, gzip when the path ends in .gz)
+# =========================================================
+
+def _open(path, mode):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+def request_key(method, path, body):
+    """Stable key for a request: method, path and the JSON body with sorted keys."""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = body.decode("utf-8", "replace")
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode("utf-8")).hexdigest()
+
+class Cassette:
+    """
+    Recorded OpenAI request/response pairs. Each entry keeps the response
+    body as chunks with their offset (seconds since the request was sent),
+    so streamed completions replay with their original time-to-first-token.
+
+    Identical requests are replayed in recorded order (the last one repeats).
+    In non-strict mode a request with no recorded match gets the next unused
+    entry for the same endpoint, so slightly different prompts still replay.
+    """
+
+    def __init__(self, path, strict=True):
+        self.path = path
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._by_path = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.loose_matches = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, entry):
+        self._by_key.setdefault(entry["key"], deque()).append(entry)
+        self._by_path.setdefault(entry["path"], deque()).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._by_key.values())
+
+    def append(self, entry):
+        with self._lock:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with _open(self.path, "a") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.recorded += 1
+
+    def find(self, key, path):
+        with self._lock:
+            entries = self._by_key.get(key)
+            if entries:
+                self.replayed += 1
+                return entries.popleft() if len(entries) > 1 else entries[0]
+            candidates = self._by_path.get(path)
+            if not self.strict and candidates:
+                self.loose_matches += 1
+                candidates.rotate(-1)
+                return candidates[-1]
+            self.misses += 1
+            return None
+
+    def stats(self):
+        return {
+            "entries": len(self),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "loose_matches": self.loose_matches,
+            "misses": self.misses,
+        }
+
+# =========================================================
+# 🔌 HTTPX TRANSPORT (RECORD / REPLAY)
+# =========================================================
+
+class _RecordingStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Passes the body through unchanged while noting when each chunk arrived."""
+
+    def __init__(self, stream, started, on_close):
+        self._stream = stream
+        self._started = started
+        self._on_close = on_close
+        self._chunks = []
+        self._closed = False
+        # Chunks can split a multi-byte character
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _note(self, chunk):
+        self._chunks.append([round(time.perf_counter() - self._started, 4), self._decoder.decode(chunk)])
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._note(chunk)
+            yield chunk
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._note(chunk)
+            yield chunk
+
+    def _finish(self):
+        if not self._closed:
+            self._closed = True
+            self._on_close(self._chunks)
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._finish()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._finish()
+
+class _ReplayStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Yields recorded chunks at their recorded offsets times `scale` (0 = no delay)."""
+
+    def __init__(self, chunks, started, scale):
+        self._chunks = chunks
+        self._started = started
+        self._scale = scale
+
+    def _delay(self, offset):
+        return offset * self._scale - (time.perf_counter() - self._started)
+
+    def __iter__(self):
+        for offset, text in self._chunks:
+            delay = self._delay(offset)
+            if delay > 0:
+                time.sleep(delay)
+            yield text.encode("utf-8")
+
+    async def __aiter__(self):
+        for offset, text in self._chunks:
+            delay = self._delay(offset)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield text.encode("utf-8")
+
+class CassetteTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport for the OpenAI clients. "record" forwards to the network
+    and appends every exchange to the cassette; "replay" answers from the
+    cassette only and never opens a connection.
+    """
+
+    def __init__(self, cassette, mode, latency_scale=1.0):
+        self.cassette = cassette
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._sync = httpx.HTTPTransport() if mode == "record" else None
+        self._async = httpx.AsyncHTTPTransport() if mode == "record" else None
+
+    def _prepare(self, request):
+        # Recorded bodies are stored as text, so ask for them uncompressed
+        request.headers["Accept-Encoding"] = "identity"
+        return request_key(request.method, request.url.path, request.content), time.perf_counter()
+
+    def _recorder(self, request, key, response, started):
+        def save(chunks):
+            self.cassette.append({
+                "key": key,
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "content_type": response.headers.get("content-type", "application/json"),
+                "latency": round(time.perf_counter() - started, 4),
+                "chunks": chunks,
+            })
+        return _RecordingStream(response.stream, started, save)
+
+    def _replay(self, request, key, started):
+        entry = self.cassette.find(key, request.url.path)
+        if entry is None:
+            raise httpx.ConnectError(f"No cassette entry for {request.method} {request.url.path} ({key[:12]})", request=request)
+        return httpx.Response(
+            entry["status"],
+            headers={"content-type": entry["content_type"]},
+            stream=_ReplayStream(entry["chunks"], started, self.latency_scale),
+            request=request,
+        )
+
+    def handle_request(self, request):
+        key, started = self._prepare(request)
+        if self.mode == "replay":
+            return self._replay(request, key, started)
+        response = self._sync.handle_request(request)
+        response.stream = self._recorder(request, key, response, started)
+        return response
+
+    async def handle_async_request(self, request):
+        key, started = self._prepare(request)
+        if self.mode == "replay":
+            return self._replay(request, key, started)
+        response = await self._async.handle_async_request(request)
+        response.stream = self._recorder(request, key, response, started)
+        return response
+
+    def close(self):
+        if self._sync:
+            self._sync.close()
+
+    async def aclose(self):
+        if self._async:
+            await self._async.aclose()
+
+# =========================================================
+# 🧩 CLIENT WIRING (agent.py, knowledge_base.py)
+# =========================================================
+
+CASSETTE = None
+_transport = None
+
+def get_transport():
+    """The shared CassetteTransport, or None when LLM_CASSETTE_MODE is off."""
+    global CASSETTE, _transport
+    if config.LLM_CASSETTE_MODE not in ("record", "replay"):
+        return None
+    if _transport is None:
+        CASSETTE = Cassette(config.LLM_CASSETTE_PATH, strict=config.LLM_CASSETTE_STRICT)
+        _transport = CassetteTransport(CASSETTE, config.LLM_CASSETTE_MODE, config.LLM_CASSETTE_LATENCY_SCALE)
+        logger.warning(
+            f"📼 LLM cassette {config.LLM_CASSETTE_MODE}: {config.LLM_CASSETTE_PATH} "
+            f"({len(CASSETTE)} entries, latency x{config.LLM_CASSETTE_LATENCY_SCALE:g})"
+        )
+    return _transport
+
+def client_kwargs():
+    """
+    Extra ChatOpenAI / OpenAIEmbeddings arguments that route their HTTP
+    calls through the cassette; empty when cassettes are off.
+    """
+    transport = get_transport()
+    if transport is None:
+        return {}
+    timeout = httpx.Timeout(config.HTTP_TIMEOUT_SECONDS * 6, connect=config.HTTP_CONNECT_TIMEOUT_SECONDS)
+    return {
+        "http_client": httpx.Client(transport=transport, timeout=timeout),
+        "http_async_client": httpx.AsyncClient(transport=transport, timeout=timeout),
+    }
+
+if __name__ == "__main__":
+    import sys
+
+    # Summary of a cassette: calls and recorded latency per endpoint
+    for path in sys.argv[1:]:
+        totals = {}
+        with _open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    first = entry["chunks"][0][0] if entry["chunks"] else entry["latency"]
+                    row = totals.setdefault(entry["path"], {"calls": 0, "seconds": 0.0, "first_byte": 0.0})
+                    row["calls"] += 1
+                    row["seconds"] += entry["latency"]
+                    row["first_byte"] += first
+        print(path)
+        for endpoint, row in totals.items():
+            print(f"  {endpoint:<28} {row['calls']:>6} calls  avg {row['seconds'] / row['calls'] * 1000:>8.1f} ms  "
+                  f"first byte {row['first_byte'] / row['calls'] * 1000:>8.1f} ms")
@@ -0,0 +1,392 @@
+"""
+Offline end-to-end load test for the chat service.
+
+Boots the FastAPI app (uvicorn subprocess) against local stand-ins from
+load_test_stubs.py - fake OpenAI LLM/embeddings, eMudhra OTP and
+application-details stub, Google Docs stub, Ameyo mock - and a Postgres
+database you provide, then runs N concurrent simulated users through:
+
+    mobile -> OTP -> verified questions -> handover -> agent reply (poll)
+           -> message to the agent -> agent reply (poll)
+
+    python load_test.py --postgres-url postgresql://user:pw@localhost/lia_loadtest \\
+        [--users 50] [--questions 3] [--workers 1] [--llm-latency 0.8] [--output load_test_result.json]
+
+Use a throwaway database: the session and transcript tables are created
+if missing and load-test rows are left in place. The result file holds
+per-endpoint latency percentiles and error rates, end-to-end flow timings,
+Ameyo webhook latency and Postgres connection counts (pg_stat_activity).
+
+The OpenAI embeddings client tokenizes with tiktoken; for a fully offline
+run its encodings must already be cached (TIKTOKEN_CACHE_DIR).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+import httpx
+import psycopg2
+import uvicorn
+
+import config
+import load_test_stubs
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUESTIONS = [
+    "How do I download my DSC certificate?",
+    "I am getting error 0x80090016 while signing a document",
+    "What documents are required for a Class 3 DSC?",
+    "My USB token is not detected on Windows 11, what should I do?",
+    "How long does video verification take?",
+    "Token shows CKR_PIN_INCORRECT, how can I fix it?",
+]
+HANDOVER_MESSAGE = "Please connect me to a support specialist"
+AGENT_MESSAGE = "I still cannot install the token driver"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS active_user_sessions (
+    session_id TEXT PRIMARY KEY,
+    session_data JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE TABLE IF NOT EXISTS chat_transaction_logs (
+    session_id TEXT PRIMARY KEY,
+    mobile_number TEXT,
+    txn_start_time TIMESTAMP,
+    txn_end_time TIMESTAMP,
+    chat_messages JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+# =========================================================
+# 📊 RESULTS
+# =========================================================
+
+class Recorder:
+    """Latency samples and error counts per endpoint label (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration):
+        report = {}
+        with self._lock:
+            for name, samples in sorted(self.samples.items()):
+                ordered = sorted(samples)
+                errors = self.errors.get(name, 0)
+                report[name] = {
+                    "count": len(ordered),
+                    "errors": errors,
+                    "error_rate": round(errors / len(ordered), 4),
+                    "throughput_rps": round(len(ordered) / duration, 2) if duration else 0,
+                    "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+                    **{f"p{q}_ms": round(percentile(ordered, q) * 1000, 1) for q in (50, 90, 95, 99)},
+                    "max_ms": round(ordered[-1] * 1000, 1),
+                }
+        return report
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class ConnectionSampler:
+    """Samples Postgres connection counts for the test database every `interval` seconds."""
+
+    def __init__(self, dsn, interval=0.5):
+        self.dsn = dsn
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        try:
+            cur = conn.cursor()
+            while not self._stop.is_set():
+                cur.execute(
+                    "SELECT COUNT(*), COUNT(*) FILTER (WHERE state = 'active') "
+                    "FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                )
+                total, active = cur.fetchone()
+                self.samples.append((total, active))
+                self._stop.wait(self.interval)
+        finally:
+            conn.close()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        totals = [t for t, _ in self.samples]
+        actives = [a for _, a in self.samples]
+        return {
+            "samples": len(self.samples),
+            "peak_connections": max(totals),
+            "mean_connections": round(statistics.mean(totals), 1),
+            "peak_active": max(actives),
+            "mean_active": round(statistics.mean(actives), 1),
+        }
+
+# =========================================================
+# 🧩 PROCESS / SERVER MANAGEMENT
+# =========================================================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class StubServer:
+    """Runs an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, port):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        deadline = time.time() + 10
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError(f"Stub server on port {self.port} did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+def ensure_schema(dsn):
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+
+def start_backend(args, port, urls, workdir):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"{urls['openai']}/v1",
+        "EMUDHRA_API_URL": urls["emudhra"],
+        "AMEYO_BASE_URL": urls["ameyo"],
+        "GOOGLE_DOCS_BASE_URL": urls["docs"],
+        "POSTGRES_DB_URL": args.postgres_url,
+        "KB_INDEX_DIR": os.path.join(workdir, "kb_index"),
+        "SEMANTIC_CACHE_ENABLED": "false" if args.no_answer_cache else env.get("SEMANTIC_CACHE_ENABLED", "true"),
+    })
+    log = open(os.path.join(workdir, "backend.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited during startup, see {log.name}")
+        try:
+            if httpx.get(f"{url}/", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Backend did not become healthy within {args.startup_timeout}s, see {log.name}")
+
+# =========================================================
+# 👥 SIMULATED USERS
+# =========================================================
+
+async def timed(recorder, name, call, check=None):
+    start = time.perf_counter()
+    try:
+        resp = await call()
+        ok = resp.status_code == 200 and (check is None or check(resp.json()))
+    except Exception:
+        resp, ok = None, False
+    recorder.record(name, time.perf_counter() - start, ok)
+    return resp if ok else None
+
+async def chat(client, recorder, name, session_id, message, check=None):
+    return await timed(
+        recorder, name,
+        lambda: client.post("/chat", json={"session_id": session_id, "message": message}),
+        check
+    )
+
+async def wait_for_agent(client, recorder, session_id, args):
+    """Polls /chat/poll until the live agent's reply arrives; returns seconds waited or None."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.agent_timeout:
+        resp = await timed(recorder, "chat.poll", lambda: client.get("/chat/poll", params={"session_id": session_id}))
+        if resp is not None and resp.json().get("messages"):
+            return time.perf_counter() - start
+        await asyncio.sleep(args.poll_interval)
+    return None
+
+async def simulate_user(index, client, recorder, args):
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    session_id = f"loadtest-{uuid.uuid4().hex}"
+    mobile = f"9{random.randint(100000000, 999999999)}"
+    flow_start = time.perf_counter()
+
+    if not await chat(client, recorder, "chat.mobile", session_id, mobile, lambda r: "OTP" in r.get("response", "")):
+        return False
+    if not await chat(client, recorder, "chat.otp", session_id, load_test_stubs.TEST_OTP, lambda r: "verified" in r.get("response", "")):
+        return False
+
+    for question in random.sample(QUESTIONS, min(args.questions, len(QUESTIONS))):
+        await asyncio.sleep(random.uniform(0, args.think_time))
+        await chat(client, recorder, "chat.question", session_id, question,
+                   lambda r: bool(r.get("response")) and "error processing" not in r["response"])
+
+    if not await chat(client, recorder, "chat.handover", session_id, HANDOVER_MESSAGE, lambda r: bool(r.get("response"))):
+        return False
+    waited = await wait_for_agent(client, recorder, session_id, args)
+    recorder.record("flow.agent_reply_wait", waited if waited is not None else args.agent_timeout, waited is not None)
+    if waited is None:
+        return False
+
+    # In handover the message is forwarded to Ameyo and /chat returns an empty response
+    if not await chat(client, recorder, "chat.to_agent", session_id, AGENT_MESSAGE, lambda r: r.get("response") == ""):
+        return False
+    waited = await wait_for_agent(client, recorder, session_id, args)
+    recorder.record("flow.agent_reply_wait", waited if waited is not None else args.agent_timeout, waited is not None)
+
+    recorder.record("flow.total", time.perf_counter() - flow_start, waited is not None)
+    return waited is not None
+
+async def run_users(base_url, recorder, args):
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        results = await asyncio.gather(*(simulate_user(i, client, recorder, args) for i in range(args.users)))
+    return sum(1 for ok in results if ok)
+
+# =========================================================
+# 🚀 MAIN
+# =========================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test for the chat service")
+    parser.add_argument("--postgres-url", default=os.getenv("LOAD_TEST_POSTGRES_URL"), help="Throwaway Postgres DSN")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--questions", type=int, default=3, help="Verified questions per user")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Users start uniformly over this many seconds")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Max pause before each question")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--emudhra-latency", type=float, default=0.15)
+    parser.add_argument("--agent-reply-delay", type=float, default=2.0, help="Ameyo mock reply delay")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--agent-timeout", type=float, default=20.0, help="Max wait for a live-agent reply")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--no-answer-cache", action="store_true", help="Disable the semantic answer cache")
+    parser.add_argument("--output", default="load_test_result.json")
+    args = parser.parse_args()
+
+    if not args.postgres_url:
+        print("❌ --postgres-url (or LOAD_TEST_POSTGRES_URL) is required")
+        sys.exit(2)
+
+    ensure_schema(args.postgres_url)
+    workdir = tempfile.mkdtemp(prefix="lia-load-test-")
+    recorder = Recorder()
+    backend_port = free_port()
+    backend_url = f"http://127.0.0.1:{backend_port}"
+
+    openai_app = load_test_stubs.create_openai_app(args.llm_latency, args.llm_jitter, args.embedding_latency)
+    stubs = {
+        "openai": StubServer(openai_app, free_port()),
+        "emudhra": StubServer(load_test_stubs.create_emudhra_app(args.emudhra_latency), free_port()),
+        "docs": StubServer(load_test_stubs.create_docs_app(config.FAQ_DOC_ID, config.ERROR_DOC_ID), free_port()),
+        "ameyo": StubServer(
+            load_test_stubs.create_ameyo_app(
+                backend_url, args.agent_reply_delay,
+                on_webhook=lambda seconds, ok: recorder.record("ameyo.webhook", seconds, ok)
+            ),
+            free_port()
+        ),
+    }
+    for stub in stubs.values():
+        stub.start()
+
+    backend = None
+    sampler = ConnectionSampler(args.postgres_url)
+    try:
+        print(f"🚀 Starting backend on {backend_url} (logs in {workdir})")
+        backend, _ = start_backend(args, backend_port, {name: s.url for name, s in stubs.items()}, workdir)
+        sampler.start()
+
+        print(f"👥 Running {args.users} users...")
+        started = time.perf_counter()
+        completed = asyncio.run(run_users(backend_url, recorder, args))
+        duration = time.perf_counter() - started
+        # Let the last webhook replies land
+        time.sleep(1)
+    finally:
+        sampler.stop()
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=15)
+        for stub in stubs.values():
+            stub.stop()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "postgres_url"},
+        "duration_seconds": round(duration, 2),
+        "users": {"started": args.users, "completed_flow": completed, "failed_flow": args.users - completed},
+        "endpoints": recorder.summary(duration),
+        "db_connections": sampler.summary(),
+        "stub_calls": {"openai": openai_app.state.calls},
+        "backend_log": os.path.join(workdir, "backend.log"),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'endpoint':<22} {'count':>6} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<22} {row['count']:>6} {row['error_rate'] * 100:>5.1f}% {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+    print(f"\n✅ {completed}/{args.users} flows completed in {duration:.1f}s; DB: {report['db_connections']}")
+    print(f"📄 Result written to {args.output}")
+
+if __name__ == "__main__":
+    main()
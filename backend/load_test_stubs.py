@@ -0,0 +1,305 @@
+"""
+Local stand-ins for the services the chat backend calls, used by
+load_test.py. Each factory returns a FastAPI app:
+
+- create_openai_app: OpenAI-compatible /v1/chat/completions (tool calling,
+  plain or streamed) and /v1/embeddings with configurable latency
+- create_emudhra_app: CustomerCareAPI OTP and application-details stub
+- create_docs_app: Google Docs export stub serving a small FAQ / Error doc
+- create_ameyo_app: Ameyo receiveMessage mock that answers through the
+  backend's /send/appusers/{id}/messages webhook, like mock_api.py
+
+Latencies are `base ± jitter` seconds, slept on the event loop.
+"""
+import re
+import json
+import time
+import uuid
+import base64
+import struct
+import asyncio
+import hashlib
+import random
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+EMBEDDING_DIMENSIONS = 1536
+TEST_OTP = "123456"
+
+FAQ_DOC = """Frequently Asked Questions
+
+Q: How do I download my DSC certificate?
+A: Log in to the eMudhra portal, open My Certificates and click Download. Keep your USB token plugged in.
+
+Q: What documents are required for a Class 3 DSC?
+A: A PAN card, an address proof and a passport size photograph. Organisation DSCs also need an authorisation letter.
+
+Q: How long does video verification take?
+A: Video verification is usually reviewed within 2 working hours.
+
+Q: My USB token is not detected on Windows 11
+A: Install the latest token driver, try another USB port and restart the system.
+"""
+
+ERROR_DOC = """Token Errors
+
+Error 0x80090016: Keyset does not exist.
+Fix: Reinstall the token driver and re-insert the token.
+
+CKR_PIN_INCORRECT: The PIN entered is wrong.
+Fix: Reset the PIN using the token admin tool.
+
+Error Code: 1603
+The installer failed. Run the setup as administrator.
+"""
+
+def _sleep_for(base, jitter):
+    return max(0.0, base + random.uniform(-jitter, jitter)) if base or jitter else 0.0
+
+# =========================================================
+# 🤖 FAKE OPENAI (CHAT + EMBEDDINGS)
+# =========================================================
+
+_CODE_RE = re.compile(r"\b0x[0-9a-f]{4,}\b|\b[a-z]+_[a-z_]+\b|\berror (?:code )?\d{3,}\b", re.IGNORECASE)
+_HANDOVER_RE = re.compile(r"\b(human|agent|specialist|representative)\b", re.IGNORECASE)
+
+def fake_embedding(text):
+    """Deterministic unit vector per input (identical text -> identical vector)."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+def _message_text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+def _completion(model, message, finish_reason, prompt_tokens, completion_tokens):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+def fake_chat_reply(body):
+    """
+    Scripted agent behaviour: a new user question gets one knowledge-base
+    tool call (errordscdoc for error codes, faqdoc otherwise); a tool result
+    gets a short answer built from it. Handover requests return the marker.
+    """
+    messages = body.get("messages", [])
+    tools = {t["function"]["name"] for t in body.get("tools", []) if t.get("type") == "function"}
+    prompt_tokens = sum(len(_message_text(m)) for m in messages) // 4
+    last = messages[-1] if messages else {}
+    model = body.get("model", "fake-model")
+
+    if last.get("role") == "tool":
+        answer = _message_text(last).strip().split("\n\n")[0][:400] or "I could not find that in the knowledge base."
+        message = {"role": "assistant", "content": answer}
+        return _completion(model, message, "stop", prompt_tokens, len(answer) // 4)
+
+    question = _message_text(last)
+    if _HANDOVER_RE.search(question):
+        message = {"role": "assistant", "content": "{HANDOVER_REQUIRED}"}
+        return _completion(model, message, "stop", prompt_tokens, 5)
+
+    tool = "errordscdoc" if _CODE_RE.search(question) else "faqdoc"
+    if tool in tools:
+        call = {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool, "arguments": json.dumps({"query": question})},
+        }
+        message = {"role": "assistant", "content": None, "tool_calls": [call]}
+        return _completion(model, message, "tool_calls", prompt_tokens, 20)
+
+    # No tools offered (e.g. history summarisation)
+    answer = f"Summary: {question[:200]}"
+    return _completion(model, {"role": "assistant", "content": answer}, "stop", prompt_tokens, len(answer) // 4)
+
+def _stream_chunks(completion):
+    """Splits a chat.completion into chat.completion.chunk deltas (words, or one tool-call delta)."""
+    choice = completion["choices"][0]
+    message = choice["message"]
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"], "model": completion["model"]}
+
+    def chunk(delta, finish_reason=None):
+        return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}]}
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    if message.get("tool_calls"):
+        chunks.append(chunk({"tool_calls": [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]}))
+    else:
+        chunks += [chunk({"content": word}) for word in re.findall(r"\S+\s*", message["content"])]
+    chunks.append(chunk({}, choice["finish_reason"]))
+    return chunks
+
+def create_openai_app(llm_latency=0.8, llm_jitter=0.2, embedding_latency=0.05, embedding_jitter=0.02):
+    app = FastAPI()
+    app.state.calls = {"chat": 0, "embeddings": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls["chat"] += 1
+        latency = _sleep_for(llm_latency, llm_jitter)
+        completion = fake_chat_reply(body)
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return completion
+
+        # Half the latency before the first token, the rest spread over the chunks
+        chunks = _stream_chunks(completion)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunks.append({**chunks[-1], "choices": [], "usage": completion["usage"]})
+
+        async def events():
+            await asyncio.sleep(latency / 2)
+            for item in chunks:
+                yield f"data: {json.dumps(item)}\n\n"
+                await asyncio.sleep(latency / 2 / len(chunks))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.calls["embeddings"] += 1
+        inputs = body.get("input")
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(_sleep_for(embedding_latency, embedding_jitter))
+
+        data = []
+        for index, item in enumerate(inputs or []):
+            # Token-id inputs (tiktoken path) are hashed as their JSON form
+            vector = fake_embedding(item if isinstance(item, str) else json.dumps(item))
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": len(data), "total_tokens": len(data)},
+        }
+
+    return app
+
+# =========================================================
+# 🔐 EMUDHRA CUSTOMER CARE API STUB
+# =========================================================
+
+def create_emudhra_app(latency=0.15, jitter=0.05):
+    app = FastAPI()
+
+    @app.post("/CustomerCareAPI/GetMobileOtp")
+    async def get_mobile_otp(request: Request):
+        await request.json()
+        await asyncio.sleep(_sleep_for(latency, jitter))
+        return {"response": {"status": "1"}, "session_info": {"session_id": uuid.uuid4().hex}}
+
+    @app.post("/CustomerCareAPI/AuthenticateMobileOTP")
+    async def authenticate_mobile_otp(request: Request):
+        body = await request.json()
+        await asyncio.sleep(_sleep_for(latency, jitter))
+        ok = body.get("details", {}).get("OTP") == TEST_OTP
+        return {"status": "1" if ok else "0"}
+
+    @app.post("/CustomerCareAPI/getApplicationDetails")
+    async def get_application_details(request: Request):
+        body = await request.json()
+        await asyncio.sleep(_sleep_for(latency, jitter))
+        mobile = body.get("details", {}).get("mobileNo", "")
+        return {
+            "meta": {"status": "1"},
+            "details": {
+                "applicantDetails": {"commonname": "Load Test User", "state": "Karnataka", "country": "India"},
+                "schemeCertDetails": {"applicationNo": f"LT{mobile[-6:]}", "certificateClass": "Class 3", "validity": "2 Years"},
+                "paymentDetails": {"product": "Class 3 DSC", "INVOICE_ID": "INV-LOADTEST", "status": "Paid"},
+                "statusDetails": [
+                    {"status": "Application Submitted", "dateAndTime": "2026-01-01 10:00"},
+                    {"status": "Video Verification Pending", "dateAndTime": "2026-01-01 10:05"},
+                ],
+            },
+        }
+
+    return app
+
+# =========================================================
+# 📄 GOOGLE DOCS EXPORT STUB
+# =========================================================
+
+def create_docs_app(faq_doc_id, error_doc_id):
+    app = FastAPI()
+
+    @app.get("/document/d/{doc_id}/export")
+    async def export(doc_id: str):
+        if doc_id == faq_doc_id:
+            return PlainTextResponse(FAQ_DOC)
+        if doc_id == error_doc_id:
+            return PlainTextResponse(ERROR_DOC)
+        return PlainTextResponse("Not found", status_code=404)
+
+    return app
+
+# =========================================================
+# 👤 AMEYO MOCK (LIVE AGENT)
+# =========================================================
+
+def create_ameyo_app(webhook_base_url, reply_delay=2.0, on_webhook=None):
+    """
+    Accepts forwarded user messages and, after `reply_delay` seconds, posts
+    an agent reply to the backend webhook. `on_webhook(seconds, ok)` is
+    called with each webhook call's latency.
+    """
+    app = FastAPI()
+    app.state.received = 0
+    client = httpx.AsyncClient(timeout=30)
+
+    async def reply(session_id):
+        await asyncio.sleep(reply_delay)
+        payload = {
+            "role": "appMaker",
+            "type": "text",
+            "name": "rchat",
+            "metadata": {"sourceType": "web", "IDENTIFIER": "AGENT_MESSAGE", "userName": "rchat", "userId": "rchat"},
+            "text": "Hello! This is the load-test agent. How can I help?",
+        }
+        start = time.perf_counter()
+        ok = False
+        try:
+            resp = await client.post(f"{webhook_base_url}/send/appusers/{session_id}/messages", json=payload)
+            ok = resp.status_code == 200 and resp.json().get("status") == "success"
+        except Exception:
+            pass
+        if on_webhook:
+            on_webhook(time.perf_counter() - start, ok)
+
+    @app.post("/ameyorestapi/receiveMessage")
+    async def receive_message(request: Request):
+        data = await request.json()
+        app.state.received += 1
+        props = data.get("appUser", {}).get("properties", {}).get("additionalParameters", "{}")
+        session_id = json.loads(props).get("session_id")
+        if session_id:
+            asyncio.ensure_future(reply(session_id))
+        return {"status": "success", "message": "Message received", "responseCode": 200}
+
+    @app.on_event("shutdown")
+    async def close_client():
+        await client.aclose()
+
+    return app
@@ -3,9 +3,11 @@ import re
 import json
 import uuid
 import time
-import requests
+import asyncio
 from fastapi import FastAPI, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, List
 
@@ -13,11 +15,25 @@ from typing import Dict, List
 import config
 from logger_config import get_logger
 from auth import send_otp, verify_otp
-from agent import get_agent_executor
-from tools import get_application_details
-from database import log_chat_to_db
-from state_manager import StateManager 
-from langchain_core.messages import HumanMessage, AIMessage
+from agent import get_agent_executor, get_summary_llm
+from tools import get_application_details, format_application_details
+from application_cache import APPLICATION_DETAILS_CACHE
+from database import log_chat_to_db, close_log_writer, get_log_writer
+from state_manager import StateManager, SESSION_CACHE
+from http_client import apost, close_async_client, close_session
+import db_pool
+from answer_cache import SemanticAnswerCache
+from agent_events import AGENT_BROKER
+from conversation_memory import ConversationMemory
+from history_compactor import HistoryCompactor
+import agent_queue
+import knowledge_base
+from prompt_builder import PROMPT_BUILDER
+from agent_stream import stream_agent
+from fast_path import FastPathRouter, STATUS
+from pii_masking import mask_pii
+import metrics
+import agent_profiler
 
 # Initialize Logger
 logger = get_logger(__name__)
@@ -32,8 +48,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-Memory History
-CHAT_HISTORY = {} 
+# In-Memory History (bounded; rehydrated from session_data["ai_history"] when evicted)
+CHAT_HISTORY = ConversationMemory(
+    max_sessions=config.CHAT_HISTORY_MAX_SESSIONS,
+    ttl_seconds=config.CHAT_HISTORY_TTL_SECONDS,
+    max_tokens=config.CHAT_HISTORY_MAX_TOKENS
+)
 
 # =========================================================================
 # 🚀 PERFORMANCE OPTIMIZATION: LOAD AGENT ONCE AT STARTUP
@@ -47,40 +67,99 @@ except Exception as e:
     logger.critical(f"❌ Failed to initialize AI Agent: {e}")
     AGENT_EXECUTOR = None
 
+# Keeps long sessions' prompts flat by summarizing old turns after each response
+HISTORY_COMPACTOR = HistoryCompactor(
+    get_summary_llm(),
+    CHAT_HISTORY,
+    trigger_tokens=config.CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS,
+    keep_messages=config.CHAT_HISTORY_KEEP_MESSAGES
+)
+
+# =========================================================================
+# ♻️ SEMANTIC ANSWER CACHE (Generic FAQ answers, shared across users)
+# =========================================================================
+ANSWER_CACHE = None
+if config.SEMANTIC_CACHE_ENABLED:
+    ANSWER_CACHE = SemanticAnswerCache(
+        knowledge_base.embeddings.embed_query,
+        threshold=config.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=config.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+        min_chars=config.SEMANTIC_CACHE_MIN_CHARS
+    )
+    # Answers generated from old documents must not outlive a KB reload
+    knowledge_base.on_reload(ANSWER_CACHE.invalidate)
+
+# Answers unambiguous requests without the LLM and reports the latency saved
+FAST_PATH = FastPathRouter(max_words=config.FAST_PATH_MAX_WORDS, enabled=config.FAST_PATH_ENABLED)
+
+# Component counters, read only when /metrics is scraped
+metrics.register_stats("chat_history", CHAT_HISTORY.stats)
+metrics.register_stats("history_compactor", HISTORY_COMPACTOR.stats)
+metrics.register_stats("answer_cache", lambda: ANSWER_CACHE.stats() if ANSWER_CACHE else {})
+metrics.register_stats("fast_path", FAST_PATH.stats)
+metrics.register_stats("prompt_builder", PROMPT_BUILDER.stats)
+metrics.register_stats("application_cache", APPLICATION_DETAILS_CACHE.stats)
+metrics.register_stats("retrieval", lambda: knowledge_base.RETRIEVAL_STATS)
+metrics.register_stats("error_code_index", lambda: knowledge_base.ERROR_CODE_INDEX.stats() if knowledge_base.ERROR_CODE_INDEX else {})
+metrics.register_stats("session_cache", SESSION_CACHE.stats)
+metrics.register_stats("embedding_cache", knowledge_base.embeddings.stats)
+metrics.register_stats("db_pool", lambda: db_pool.get_pool().stats() if config.POSTGRES_DB_URL else {})
+metrics.register_stats("chat_log_writer", lambda: get_log_writer().stats())
+
+# Streaming turns still running after their client went away (strong refs until done)
+STREAM_TURNS = set()
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
 
+@app.on_event("startup")
+async def startup_resources():
+    await run_in_threadpool(agent_queue.ensure_schema)
+    agent_queue.start_listener()
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    agent_queue.stop_listener()
+    if STREAM_TURNS:
+        # Let in-flight streaming turns log their transcript before the writer closes
+        await asyncio.wait(list(STREAM_TURNS), timeout=config.SHUTDOWN_TURN_TIMEOUT_SECONDS)
+    await close_async_client()
+    close_session()
+    # Flush queued transcript entries before the pool goes away
+    await run_in_threadpool(close_log_writer)
+    db_pool.close_pool()
+
 @app.get("/")
 def health_check():
     logger.info("Health check endpoint called.")
     return {"status": "running", "service": "Lia Support Bot (Stateful)"}
 
+if config.METRICS_ENABLED:
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # =========================================================================
-# HELPER: MASK SENSITIVE INFO (PII)
+# HELPER: APPLICATION STATUS (FAST PATH)
 # =========================================================================
-def mask_sensitive_info(text: str) -> str:
-    """
-    Masks PII: Keeps ONLY the 1st and Last character/digit.
-    Rest is replaced with 'X'.
-    """
-    if not text: return ""
-
-    # 1. Mask Aadhaar (12 digits) -> 1XXXXXXXXXX2
-    text = re.sub(r'\b(\d)\d{10}(\d)\b', r'\1XXXXXXXXXX\2', text)
-
-    # 2. Mask Mobile (10 digits) -> 9XXXXXXXX8
-    text = re.sub(r'\b(\d)\d{8}(\d)\b', r'\1XXXXXXXX\2', text)
-
-    # 3. Mask PAN (10 chars: 5 letters, 4 digits, 1 letter) -> AXXXXXXXXF
-    text = re.sub(r'\b([A-Za-z])[A-Za-z0-9]{8}([A-Za-z0-9])\b', r'\1XXXXXXXX\2', text)
-
-    return text
+async def fetch_application_status(mobile):
+    """Status card for the fast path; an empty string lets the agent handle failures."""
+    if not mobile:
+        return ""
+    try:
+        with metrics.STAGE_SECONDS.time("app_details"):
+            tool_raw = await get_application_details.ainvoke(mobile)
+        return format_application_details(mobile, tool_raw)
+    except Exception as e:
+        logger.error(f"❌ Fast-path status fetch failed: {e}")
+        return ""
 
 # =========================================================================
 # 1. SEND USER MESSAGE -> AMEYO API
 # =========================================================================
-def send_to_ameyo(session_id, mobile, message_text):
+async def send_to_ameyo(session_id, mobile, message_text):
     try:
         ameyo_url = config.AMEYO_BASE_URL
         app_id = config.AMEYO_APP_ID
@@ -114,7 +193,8 @@ def send_to_ameyo(session_id, mobile, message_text):
             }
         }
         
-        requests.post(f"{ameyo_url}/ameyorestapi/receiveMessage", json=payload, verify=False, timeout=5)
+        with metrics.STAGE_SECONDS.time("ameyo_forward"):
+            await apost("ameyo.receive_message", f"{ameyo_url}/ameyorestapi/receiveMessage", json=payload, timeout=5)
         logger.info(f"✅ Forwarded message to Ameyo for session {session_id}")
         return True
     except Exception as e:
@@ -147,14 +227,16 @@ async def receive_from_ameyo(user_id: str, request: Request, background_tasks: B
             }
 
             # 3. Queue this OBJECT (not just a string)
-            StateManager.queue_agent_message(user_id, message_data)
+            await run_in_threadpool(StateManager.queue_agent_message, user_id, message_data)
+            # Wakes local streams at once; other workers are woken by Postgres NOTIFY
+            AGENT_BROKER.notify(user_id)
             
             # 4. Log to DB (Text only for readability)
-            user_data = StateManager.get_verified_user(user_id)
+            user_data = await run_in_threadpool(StateManager.get_verified_user, user_id)
             mobile = user_data.get('mobile', 'Unknown') if user_data else 'Unknown'
             
             log_text_db = f"[{agent_name}]: {agent_text}"
-            background_tasks.add_task(log_chat_to_db, user_id, mobile, "", log_text_db, "agent")
+            background_tasks.add_task(metrics.tracked(log_chat_to_db), user_id, mobile, "", log_text_db, "agent")
             
         return {"status": "success", "message": "Message queued"}
     except Exception as e:
@@ -169,42 +251,150 @@ def poll_messages(session_id: str):
     messages = StateManager.get_agent_messages(session_id)
     return {"messages": messages}
 
+# =========================================================================
+# 3b. PUSH ENDPOINT (Server-Sent Events, replaces polling)
+# =========================================================================
+@app.get("/chat/events")
+async def stream_agent_messages(session_id: str, request: Request):
+    """
+    Pushes live-agent messages as they arrive. The queue is read on
+    connect, whenever a local webhook or a Postgres NOTIFY wakes this
+    session, and on every heartbeat as a safety net. A message leaves the
+    queue only after it was sent (see agent_queue.deliver).
+    """
+    async def event_stream():
+        subscription = AGENT_BROKER.subscribe(session_id)
+        wakeup = subscription[1]
+        last_id = 0
+        try:
+            yield f"retry: {config.SSE_RETRY_MS}\n\n"
+            while not await request.is_disconnected():
+                wakeup.clear()
+                async for message_id, message in agent_queue.deliver(session_id, last_id):
+                    yield f"event: agent_message\ndata: {json.dumps(message)}\n\n"
+                    last_id = message_id
+
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=config.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            AGENT_BROKER.unsubscribe(session_id, subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 # =========================================================================
 # 4. MAIN CHAT ENDPOINT
 # =========================================================================
 @app.post("/chat")
 async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
+    # One state read per turn; every mutation below is flushed in a single write
+    metrics.ACTIVE_SESSIONS.touch(req.session_id)
+    with metrics.STAGE_SECONDS.time("turn"):
+        with metrics.STAGE_SECONDS.time("state_load"):
+            session = await run_in_threadpool(StateManager.load_session, req.session_id)
+        try:
+            return await process_chat_turn(req, background_tasks, session)
+        finally:
+            if session.dirty:
+                with metrics.STAGE_SECONDS.time("state_flush"):
+                    await run_in_threadpool(session.flush)
+
+# =========================================================================
+# 4b. STREAMING CHAT ENDPOINT (Server-Sent Events)
+# =========================================================================
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Same turn as /chat, streamed: `tool` events while the agent calls tools,
+    `token` events as the answer is generated, then one `done` event with
+    the final response (handover marker removed, exactly what /chat returns).
+    Turns answered without the agent only send `done`.
+
+    The turn and its follow-up work (chat log, Ameyo forward, compaction)
+    run in their own task, not the response's BackgroundTasks, which
+    Starlette runs early or skips when the client disconnects.
+    """
+    events = asyncio.Queue()
+    turn_tasks = BackgroundTasks()
+
+    async def emit(event, data):
+        await events.put((event, data))
+
+    async def run_turn():
+        metrics.ACTIVE_SESSIONS.touch(req.session_id)
+        with metrics.STAGE_SECONDS.time("turn"):
+            with metrics.STAGE_SECONDS.time("state_load"):
+                session = await run_in_threadpool(StateManager.load_session, req.session_id)
+            try:
+                result = await process_chat_turn(req, turn_tasks, session, emit=emit)
+            except Exception as e:
+                logger.error(f"❌ Streaming turn failed ({req.session_id}): {e}")
+                result = {"response": "I encountered an error processing your request."}
+            finally:
+                if session.dirty:
+                    with metrics.STAGE_SECONDS.time("state_flush"):
+                        await run_in_threadpool(session.flush)
+        await events.put(("done", result))
+        try:
+            await turn_tasks()
+        except Exception as e:
+            logger.error(f"❌ Streaming turn background task failed ({req.session_id}): {e}")
+
+    async def event_stream():
+        # The turn runs to completion even if the browser disconnects mid-stream
+        turn = asyncio.create_task(run_turn())
+        STREAM_TURNS.add(turn)
+        turn.add_done_callback(STREAM_TURNS.discard)
+        while True:
+            event, data = await events.get()
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event == "done":
+                break
+        # Not awaited: the stream ends with `done`; logging and compaction carry on in the task
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+async def process_chat_turn(req: ChatRequest, background_tasks: BackgroundTasks, session, emit=None):
+    """One chat turn. With `emit`, agent tool progress and tokens are streamed through it."""
     session_id = req.session_id
     raw_input = req.message.strip()
     
     # 1. Load State
-    session_data = StateManager.get_state(session_id)
+    session_data = session.data
     is_verified_user = session_data.get("verified") is True
     current_state = session_data.get("state", "init")
     current_mobile = session_data.get("mobile")
 
     # 2. PII MASKING LOGIC
     if is_verified_user or current_state == "handover_active":
-        user_input = mask_sensitive_info(raw_input)
+        user_input = mask_pii(raw_input)
     else:
         user_input = raw_input # No masking during OTP/Mobile entry
 
     # 3. Context Memory
-    if session_id not in CHAT_HISTORY: CHAT_HISTORY[session_id] = []
-    history = CHAT_HISTORY[session_id]
+    history = CHAT_HISTORY.get_messages(session_id, session_data)
+
+    def remember_turn(user_msg, bot_msg):
+        # Persisted with this turn's single state write, so any worker can rehydrate it
+        session.update(CHAT_HISTORY.append(session_id, user_msg, bot_msg, session_data))
+        background_tasks.add_task(metrics.tracked(HISTORY_COMPACTOR.maybe_compact), session_id)
 
     # =========================================================================
     # 🔴 HANDOVER MODE (STRICT TERMINATION OF AI)
     # =========================================================================
     if current_state == "handover_active":
+        metrics.ROUTES.inc("live_agent")
         if current_mobile:
             logger.info(f"👤 Routing to Live Agent: {session_id}")
             
             # A. Send RAW (Unmasked) input to Live Agent
-            background_tasks.add_task(send_to_ameyo, session_id, current_mobile, raw_input)
+            background_tasks.add_task(metrics.tracked(send_to_ameyo), session_id, current_mobile, raw_input)
             
             # B. Log MASKED input to Database (Privacy)
-            background_tasks.add_task(log_chat_to_db, session_id, current_mobile, user_input, "")
+            background_tasks.add_task(metrics.tracked(log_chat_to_db), session_id, current_mobile, user_input, "")
             
             # Return empty (Frontend polls for agent reply)
             return {"response": ""} 
@@ -217,87 +407,28 @@ async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
     # PART A: AUTHENTICATION FLOW
     # =========================================================================
     if not is_verified_user:
-        
+        metrics.ROUTES.inc("auth")
+
         # --- SCENARIO 1: WAITING FOR OTP ---
         if current_state == "waiting_for_otp":
             mobile = session_data.get("mobile")
             api_sess_id = session_data.get("api_session_id")
             
             # Verify OTP using raw_input logic (OTP is not PII in this context)
-            is_verified, msg = verify_otp(mobile, raw_input, api_sess_id)
+            with metrics.STAGE_SECONDS.time("otp_verify"):
+                is_verified, msg = await verify_otp(mobile, raw_input, api_sess_id)
             
             if is_verified:
-                StateManager.update_session(session_id, {"verified": True, "state": "verified"})
+                session.update({"verified": True, "state": "verified"})
                 
                 try:
                     logger.info(f"🤖 User Verified. Fetching details for {mobile}...")
-                    tool_raw = get_application_details.invoke(mobile)
-                    tool_data = json.loads(tool_raw)
-                    
-                    meta_status = tool_data.get("meta", {}).get("status", "0")
-                    
-                    if meta_status != "1":
-                        bot_response = (
-                            "✅ OTP verified. Loading your application details.\n\n"
-                            "**Application Not Found.**\n\n"
-                            f"No application details found for mobile number **{mobile}**.\n\n"
-                            "[Buy Digital Signature](https://emudhradigital.com/buy-digital-signature)"
-                        )
-                    else:
-                        details = tool_data.get("details", {})
-                        app_det = details.get("applicantDetails", {})
-                        cert_det = details.get("schemeCertDetails", {})
-                        pay_det = details.get("paymentDetails", {})
-                        status_list = details.get("statusDetails", [])
-
-                        name = app_det.get("commonname") or "Customer"
-                        loc_parts = [app_det.get("locality"), app_det.get("state"), app_det.get("country")]
-                        location = ", ".join([p for p in loc_parts if p]) or "N/A"
-                        org = app_det.get("organization") or "N/A"
-                        product = pay_det.get("product") or cert_det.get("certificateClass") or "Digital Signature"
-                        app_no = cert_det.get("applicationNo") or "N/A"
-                        inv_id = pay_det.get("INVOICE_ID") or "N/A"
-                        pay_status = pay_det.get("status") or "Pending"
-
-                        timeline_text = ""
-                        def find_date(search_term):
-                            for s in status_list:
-                                if search_term.lower() in s.get("status", "").lower(): return s.get("dateAndTime")
-                            return None
-
-                        sub_date = find_date("Application Submitted")
-                        if sub_date: timeline_text += f"✅ Application Submitted on {sub_date}<br>"
-                        if find_date("Mobile verification") or find_date("Email verification"):
-                            timeline_text += "✅ Mobile and Email verifications completed<br>"
-                        
-                        act_date = find_date("Account Activated") or find_date("Account Approved")
-                        if act_date: timeline_text += f"✅ Account Approved on {act_date}<br>"
-                        else: timeline_text += f"⏳ Current Status: {status_list[-1].get('status', 'Pending')}<br>"
-
-                        table_html = """
-                        <div style="background-color: #f9f9f9; border-radius: 8px; padding: 10px; margin: 10px 0; border: 1px solid #eee;">
-                            <h4 style="margin: 0 0 10px 0; color: #0056b3;">Scheme Details</h4>
-                            <table style="width: 100%; border-collapse: collapse; font-size: 13px;">
-                        """
-                        fields = {"applicationNo": "App No", "certificateClass": "Class", "validity": "Validity", "expiryDate": "Expiry"}
-                        for k, l in fields.items():
-                            val = cert_det.get(k, "")
-                            if val: table_html += f"<tr><td style='padding:4px; font-weight:600;'>{l}</td><td style='padding:4px;'>{val}</td></tr>"
-                        table_html += "</table></div>"
-
-                        bot_response = (
-                            "✅ OTP verified. Loading your application details.\n\n"
-                            f"Dear Customer,\n\n"
-                            f"Below is the status for the registered mobile number {mobile}:\n\n"
-                            f"**Name:** {name}\n"
-                            f"**Location:** {location}\n"
-                            f"**Org:** {org}\n"
-                            f"**Product:** {product}\n\n"
-                            f"**Timeline:**\n{timeline_text}\n"
-                            f"{table_html}\n"
-                            f"**Payment:** {pay_status} (Inv: {inv_id})\n\n"
-                            "[Click Here to Login](https://emudhradigital.com/Login.jsp)"
-                        )
+                    with metrics.STAGE_SECONDS.time("app_details"):
+                        tool_raw = await get_application_details.ainvoke(mobile)
+                    bot_response = (
+                        "✅ OTP verified. Loading your application details.\n\n"
+                        + format_application_details(mobile, tool_raw)
+                    )
                         
                 except Exception as e:
                     logger.error(f"❌ Auto-Fetch Error: {e}")
@@ -309,18 +440,21 @@ async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
         else:
             if re.match(r'^\d{10}$', raw_input):
                 mobile_input = raw_input
-                StateManager.clear_previous_sessions_for_mobile(mobile_input)
-                success, msg, api_sess_id = send_otp(mobile_input)
+                await run_in_threadpool(StateManager.clear_previous_sessions_for_mobile, mobile_input)
+                # A new login always sees fresh application details
+                APPLICATION_DETAILS_CACHE.invalidate(mobile_input)
+                with metrics.STAGE_SECONDS.time("otp_send"):
+                    success, msg, api_sess_id = await send_otp(mobile_input)
                 
                 if success:
-                    StateManager.set_state(session_id, {
+                    session.update({
                         "state": "waiting_for_otp", 
                         "mobile": mobile_input,
                         "api_session_id": api_sess_id
                     })
                     bot_response = f"✅ We've sent an OTP to **{mobile_input}**. Please enter the OTP to verify and proceed."
                 else:
-                    StateManager.set_state(session_id, {"state": "init"})
+                    session.update({"state": "init"})
                     bot_response = f"⚠️ Failed to send OTP: {msg}"
             else:
                 bot_response = "Please enter your valid 10-digit registered mobile number."
@@ -332,13 +466,62 @@ async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
         verified_mobile = session_data.get("mobile")
         current_mobile = verified_mobile
         try:
-            if AGENT_EXECUTOR:
-                # 🚀 USE GLOBAL EXECUTOR
-                res = AGENT_EXECUTOR.invoke({"input": user_input, "chat_history": history, "verified_mobile": verified_mobile})
-                bot_response = res["output"]
+            turn_start = time.perf_counter()
+
+            # ⚡ Deterministic answers first (greetings, handover, purchase links, status).
+            # Routing is local, so it reads the unmasked text.
+            fast_path = FAST_PATH.route(raw_input)
+            if fast_path and fast_path.route == STATUS:
+                fast_path.response = await fetch_application_status(verified_mobile)
+
+            if fast_path and fast_path.response:
+                bot_response = fast_path.response
+                FAST_PATH.record(fast_path.route, time.perf_counter() - turn_start)
+                metrics.ROUTES.inc("fast_path")
             else:
-                logger.critical("Agent Executor is None!")
-                bot_response = "System Error: AI Agent not initialized."
+                # Lookup may embed the question, so keep it off the event loop
+                cached_response = await run_in_threadpool(ANSWER_CACHE.lookup, user_input) if ANSWER_CACHE else None
+
+                if cached_response:
+                    bot_response = cached_response
+                    FAST_PATH.record("answer_cache", time.perf_counter() - turn_start)
+                    metrics.ROUTES.inc("answer_cache")
+                elif AGENT_EXECUTOR:
+                    # 🚀 USE GLOBAL EXECUTOR (system prompt scoped to this turn's intent)
+                    system_prompt = PROMPT_BUILDER.build(raw_input)
+                    agent_inputs = {
+                        "input": user_input,
+                        "chat_history": history,
+                        "system_prompt": system_prompt.text,
+                        "verified_mobile": verified_mobile
+                    }
+                    metrics.ROUTES.inc("agent")
+                    agent_start = time.perf_counter()
+                    first_token = None
+                    with metrics.STAGE_SECONDS.time("agent"), agent_profiler.trace_turn(session_id) as callbacks:
+                        if emit:
+                            res, first_token = await stream_agent(
+                                AGENT_EXECUTOR, agent_inputs, emit,
+                                mask_output=config.PII_MASK_AGENT_OUTPUT, callbacks=callbacks
+                            )
+                        else:
+                            res = await AGENT_EXECUTOR.ainvoke(agent_inputs, {"callbacks": callbacks})
+                    bot_response = mask_pii(res["output"]) if config.PII_MASK_AGENT_OUTPUT else res["output"]
+                    agent_seconds = time.perf_counter() - agent_start
+                    FAST_PATH.record("agent", agent_seconds)
+                    logger.info(
+                        f"🧾 Prompt {system_prompt.tokens} tokens "
+                        f"(intents: {','.join(sorted(system_prompt.intents)) or 'unknown'}; "
+                        f"sections: {','.join(system_prompt.sections)}), "
+                        f"agent {agent_seconds:.2f}s"
+                        + (f", first token {first_token:.2f}s" if first_token is not None else "")
+                    )
+
+                    if ANSWER_CACHE and ANSWER_CACHE.is_cacheable(res.get("intermediate_steps", []), bot_response):
+                        background_tasks.add_task(metrics.tracked(ANSWER_CACHE.store), user_input, bot_response)
+                else:
+                    logger.critical("Agent Executor is None!")
+                    bot_response = "System Error: AI Agent not initialized."
                 
         except Exception as e:
             logger.error(f"Agent Error: {e}")
@@ -349,6 +532,7 @@ async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
     # =========================================================================
     
     if "HANDOVER_REQUIRED" in bot_response:
+        metrics.ROUTES.inc("handover")
         clean_response = bot_response.replace("{{HANDOVER_REQUIRED}}", "") \
                                      .replace("{HANDOVER_REQUIRED}", "") \
                                      .replace("HANDOVER_REQUIRED", "").strip()
@@ -357,22 +541,22 @@ async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
         
         mobile_payload = verified_mobile if verified_mobile else current_mobile
         
-        success = send_to_ameyo(session_id, mobile_payload, raw_input)
+        success = await send_to_ameyo(session_id, mobile_payload, raw_input)
         
         if success:
-            StateManager.set_state(session_id, {"state": "handover_active"})
+            session.update({"state": "handover_active"})
             
-            history.extend([HumanMessage(content=user_input), AIMessage(content=bot_response)])
+            remember_turn(user_input, bot_response)
             if current_mobile:
-                background_tasks.add_task(log_chat_to_db, session_id, current_mobile, user_input, bot_response, "bot")
+                background_tasks.add_task(metrics.tracked(log_chat_to_db), session_id, current_mobile, user_input, bot_response, "bot")
                 
             return {"response": "✅ You're now connected. A support specialist will join the chat shortly."}
         else:
             bot_response = "I'm sorry, I was unable to connect you to a support specialist right now."
 
-    history.extend([HumanMessage(content=user_input), AIMessage(content=bot_response)])
+    remember_turn(user_input, bot_response)
     
     if current_mobile:
-        background_tasks.add_task(log_chat_to_db, session_id, current_mobile, user_input, bot_response, "bot")
+        background_tasks.add_task(metrics.tracked(log_chat_to_db), session_id, current_mobile, user_input, bot_response, "bot")
 
     return {"response": bot_response}
\ No newline at end of file
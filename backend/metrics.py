@@ -0,0 +1,279 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+import config
+import http_client
+from http_client import LatencyHistogram, LATENCY_BUCKETS
+
+# Prometheus text exposition for /metrics. Hot-path cost is one lock and a
+# bisect per observation; component stats() are only read at scrape time.
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# =========================================================
+# 📈 METRIC TYPES
+# =========================================================
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> LatencyHistogram
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = LatencyHistogram(self.buckets)
+            series.observe(value)
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(h.counts), h.count, h.total_seconds) for labels, h in self._series.items()]
+        for labels, counts, count, total in series:
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                le = _labels(self.labelnames + ("le",), labels + (_number(bound),))
+                lines.append(f"{self.name}_bucket{le} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}" for labels, v in values]
+        return lines
+
+class Gauge:
+    """Set directly (inc/dec) or computed at scrape time by `func`."""
+
+    def __init__(self, name, documentation, func=None):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self._value = 0
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def collect(self):
+        value = self.func() if self.func else self._value
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {_number(value)}"]
+
+class StatsCollector:
+    """
+    Exposes a component's stats() dict as gauges: numeric values become
+    `lia_<prefix>_<key>`, nested dicts become `lia_<prefix>_<key>{name="..."}`.
+    """
+
+    def __init__(self, prefix, func):
+        self.prefix = prefix
+        self.func = func
+        REGISTRY.append(self)
+
+    def collect(self):
+        try:
+            stats = self.func() or {}
+        except Exception:
+            return []
+        lines = []
+        for key, value in stats.items():
+            name = f"lia_{self.prefix}_{key}"
+            if isinstance(value, bool) or value is None:
+                continue
+            if isinstance(value, (int, float)):
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+            elif isinstance(value, dict):
+                series = [(k, v) for k, v in value.items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+                if series:
+                    lines.append(f"# TYPE {name} gauge")
+                    lines += [f"{name}{_labels(('name',), (k,))} {_number(v)}" for k, v in series]
+        return lines
+
+class OutboundHttpCollector:
+    """The per-endpoint histograms http_client already keeps (eMudhra, Ameyo, Google Docs)."""
+
+    name = "lia_outbound_request_seconds"
+
+    def __init__(self):
+        REGISTRY.append(self)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} Outbound HTTP call latency by endpoint", f"# TYPE {self.name} histogram"]
+        for endpoint, snapshot in http_client.latency_stats().items():
+            for bound, running in snapshot["buckets"].items():
+                lines.append(f"{self.name}_bucket{_labels(('endpoint', 'le'), (endpoint, _number(bound)))} {running}")
+            lines.append(f"{self.name}_bucket{_labels(('endpoint', 'le'), (endpoint, '+Inf'))} {snapshot['count']}")
+            lines.append(f"{self.name}_sum{_labels(('endpoint',), (endpoint,))} {_number(snapshot['sum_seconds'])}")
+            lines.append(f"{self.name}_count{_labels(('endpoint',), (endpoint,))} {snapshot['count']}")
+        return lines
+
+REGISTRY = []
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.collect()
+    return "\n".join(lines) + "\n"
+
+# =========================================================
+# 👥 ACTIVE SESSIONS
+# =========================================================
+
+class SessionActivity:
+    """Sessions with a chat request in the last `window` seconds."""
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._last_seen = {}
+        self._pruned_at = time.monotonic()
+
+    def touch(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[session_id] = now
+            # Also pruned here (at most once per window), so it stays bounded without a scraper
+            if now - self._pruned_at >= self.window:
+                self._prune(now)
+
+    def count(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._last_seen)
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        for session_id in [s for s, seen in self._last_seen.items() if seen < cutoff]:
+            del self._last_seen[session_id]
+        self._pruned_at = now
+
+ACTIVE_SESSIONS = SessionActivity(config.METRICS_ACTIVE_SESSION_WINDOW_SECONDS)
+
+# =========================================================
+# 🧾 CHAT PIPELINE METRICS
+# =========================================================
+
+# state_load, state_flush, otp_send, otp_verify, app_details, agent, ameyo_forward, db_log_write, turn
+STAGE_SECONDS = Histogram("lia_chat_stage_seconds", "Duration of each chat pipeline stage", ("stage",))
+ROUTES = Counter("lia_chat_routes_total", "Chat turns by the route that answered them", ("route",))
+TOOL_SECONDS = Histogram("lia_tool_seconds", "Agent tool call duration", ("tool", "outcome"))
+LLM_SECONDS = Histogram("lia_llm_call_seconds", "LLM call duration", ("model",))
+LLM_TOKENS = Counter("lia_llm_tokens_total", "LLM tokens by type", ("model", "type"))
+BACKGROUND_TASKS = Gauge("lia_background_tasks_in_progress", "Request background tasks currently running")
+Gauge("lia_active_sessions", "Sessions with a chat request in the active-session window", ACTIVE_SESSIONS.count)
+OutboundHttpCollector()
+
+def tracked(func):
+    """Wraps a background task so BACKGROUND_TASKS counts it while it runs (sync or async)."""
+    if asyncio.iscoroutinefunction(func):
+        async def run_async(*args, **kwargs):
+            BACKGROUND_TASKS.inc()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                BACKGROUND_TASKS.dec()
+        return run_async
+
+    def run(*args, **kwargs):
+        BACKGROUND_TASKS.inc()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            BACKGROUND_TASKS.dec()
+    return run
+
+def token_usage(response):
+    """(prompt_tokens, completion_tokens) of an LLMResult; streamed calls report usage on the message."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("prompt_tokens") is not None:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback recording each chat model call's latency and token usage."""
+
+    # Called on the event loop, not via a thread hop, so latencies are not inflated
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        model = (response.llm_output or {}).get("model_name") or config.OPENAI_MODEL_NAME
+        if started is not None:
+            LLM_SECONDS.observe(time.perf_counter() - started, model)
+
+        prompt_tokens, completion_tokens = token_usage(response)
+        if prompt_tokens:
+            LLM_TOKENS.inc(model, "prompt", amount=prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.inc(model, "completion", amount=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+LLM_METRICS = LLMMetricsHandler()
+
+def register_stats(prefix, func):
+    """Exposes `func()` (a component's stats() dict) under lia_<prefix>_*."""
+    StatsCollector(prefix, func)
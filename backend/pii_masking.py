@@ -0,0 +1,189 @@
+import re
+
+# =========================================================
+# ✅ VALIDATORS
+# =========================================================
+
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+def verhoeff_valid(digits):
+    """Verhoeff checksum (the last digit of an Aadhaar number is its check digit)."""
+    check = 0
+    for position, digit in enumerate(reversed(digits)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[position % 8][ord(digit) - 48]]
+    return check == 0
+
+def is_aadhaar(digits):
+    """12 digits, not starting with 0 or 1, valid Verhoeff check digit."""
+    return len(digits) == 12 and digits[0] not in "01" and verhoeff_valid(digits)
+
+# 4th PAN character: holder type (Person, Company, HUF, Firm, AOP, Trust, BOI, Local authority, AJP, Govt)
+PAN_HOLDER_TYPES = "PCHFATBLJG"
+_PAN_RE = re.compile(r"[A-Z]{3}[" + PAN_HOLDER_TYPES + r"][A-Z]\d{4}[A-Z]")
+
+def is_pan(value):
+    """AAAPA1234A structure with a valid holder-type letter."""
+    return _PAN_RE.fullmatch(value.upper()) is not None
+
+# =========================================================
+# 🕵️ SINGLE-PASS MASKING
+# =========================================================
+
+# One scan classifies every candidate. Each kind keeps its first and last
+# character; separators and any +91 / 0 prefix are left as typed.
+PII_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])(?:"
+    r"(?P<aadhaar>\d{4}(?P<sep>[ -]?)\d{4}(?P=sep)\d{4})"
+    r"|(?P<mobile_prefix>(?:\+91|91|0)[ -]?)?(?P<mobile>[6-9]\d{4}[ -]?\d{5})"
+    r"|(?P<pan>[A-Za-z]{5}\d{4}[A-Za-z])"
+    r")(?![A-Za-z0-9])"
+)
+_MOBILE_IN_AADHAAR_RE = re.compile(r"(?:91|0)?[6-9]\d{9}")
+
+def _mask_core(value):
+    """Keeps the first and last alphanumeric character, X for the others (same length)."""
+    positions = [i for i, c in enumerate(value) if c.isalnum()]
+    if len(positions) < 3:
+        return value
+    chars = list(value)
+    for i in positions[1:-1]:
+        chars[i] = "X"
+    return "".join(chars)
+
+def _mask_mobile_digits(value):
+    """`value` is 11-12 digits: keep the 91 / 0 prefix, mask the 10-digit number."""
+    prefix_length = len(value) - 10
+    return value[:prefix_length] + _mask_core(value[prefix_length:])
+
+def _replace(match):
+    aadhaar = match.group("aadhaar")
+    if aadhaar is not None:
+        digits = aadhaar.replace(" ", "").replace("-", "")
+        if is_aadhaar(digits):
+            return _mask_core(aadhaar)
+        # 919876543210 / 09876543210 style mobiles reach this branch first
+        if not match.group("sep") and _MOBILE_IN_AADHAAR_RE.fullmatch(digits):
+            return _mask_mobile_digits(aadhaar)
+        return aadhaar
+
+    mobile = match.group("mobile")
+    if mobile is not None:
+        return (match.group("mobile_prefix") or "") + _mask_core(mobile)
+
+    pan = match.group("pan")
+    return _mask_core(pan) if is_pan(pan) else pan
+
+def mask_pii(text):
+    """
+    Masks Aadhaar (Verhoeff-valid), Indian mobile and PAN numbers in one
+    pass, keeping only the first and last character, e.g. 9XXXXXXXX8.
+    Output has the same length as the input. Error codes, AWB numbers and
+    other 10-12 character tokens that fail validation are left untouched.
+    """
+    if not text:
+        return ""
+    return PII_PATTERN.sub(_replace, text)
+
+# =========================================================
+# 🌊 STREAMING MASKER (LLM OUTPUT)
+# =========================================================
+
+# Longest possible match: "+91 98765 43210" / "1234-5678-9012" (15 chars). A
+# match starting this far (plus its one-character lookahead) from the end of
+# the buffered text is already decided.
+_MAX_MATCH_LENGTH = 15
+_DECIDED_WINDOW = _MAX_MATCH_LENGTH + 1
+_CANDIDATE_CHARS = frozenset("0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ+- ")
+
+class StreamingMasker:
+    """
+    Masks text that arrives in arbitrary chunks (LLM tokens). Text that
+    could still become part of a PII match is held back until the next
+    chunk decides it; everything before that is masked and returned.
+    Masking is length-preserving, so the output equals mask_pii() of the
+    whole text.
+    """
+
+    def __init__(self):
+        self._held = ""
+        self._before = ""  # last released character (lookbehind context)
+
+    def _scan(self, buffer):
+        """Matches in `buffer`, found with the released character as lookbehind context."""
+        offset = len(self._before)
+        for match in PII_PATTERN.finditer(self._before + buffer, offset):
+            yield match, match.start() - offset, match.end() - offset
+
+    def _mask(self, buffer):
+        parts, last = [], 0
+        for match, start, end in self._scan(buffer):
+            parts.append(buffer[last:start])
+            parts.append(_replace(match))
+            last = end
+        parts.append(buffer[last:])
+        return "".join(parts)
+
+    def _safe_cut(self, buffer):
+        """
+        Last position that cannot be inside a match still open at the end of
+        `buffer`. Never inside the trailing candidate run, except where that
+        run is longer than any match: then at the first word boundary past
+        the decided window, since a match can only start after a boundary.
+        """
+        run_start = len(buffer)
+        while run_start > 0 and buffer[run_start - 1] in _CANDIDATE_CHARS:
+            run_start -= 1
+        if len(buffer) - run_start <= _DECIDED_WINDOW:
+            return run_start
+        cut = len(buffer) - _DECIDED_WINDOW
+        while cut < len(buffer) and buffer[cut - 1].isalnum():
+            cut += 1
+        return cut
+
+    def feed(self, text):
+        buffer = self._held + text
+        if not buffer:
+            return ""
+
+        cut = self._safe_cut(buffer)
+        # A decided match that crosses the cut is released whole next time
+        for _, start, end in self._scan(buffer):
+            if start < cut < end:
+                cut = start
+                break
+            if start >= cut:
+                break
+
+        released = self._mask(buffer)[:cut]
+        if cut:
+            self._before = buffer[cut - 1]
+        self._held = buffer[cut:]
+        return released
+
+    def flush(self):
+        """End of the stream (or of one model call): masks and releases the rest."""
+        held, self._held = self._held, ""
+        released = self._mask(held)
+        self._before = held[-1:] or self._before
+        return released
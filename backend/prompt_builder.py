@@ -0,0 +1,181 @@
+import re
+import threading
+from functools import lru_cache
+import config
+from prompts import PROMPT_SECTIONS
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# =========================================================
+# 🔢 TOKEN COUNTING
+# =========================================================
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(config.OPENAI_MODEL_NAME)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; fall back when offline
+        logger.warning(f"⚠️ tiktoken unavailable, estimating tokens: {e}")
+        return None
+
+def count_tokens(text):
+    """Exact count with tiktoken when installed, else ~4 chars per token."""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text))
+
+# =========================================================
+# 🧭 INTENT -> PROMPT SECTIONS
+# =========================================================
+
+# Safety, scope, mobile-number and handover rules go out on every turn
+ALWAYS_SECTIONS = ("core", "scope", "suggestions", "accuracy", "tools")
+
+INTENT_SECTIONS = {
+    "smalltalk": (),
+    "handover": (),
+    "status": ("application_status",),
+    "purchase": ("search_chain", "links"),
+    "knowledge": ("search_chain", "faq_corrections", "links"),
+}
+
+# Messages made only of these words are greetings / acknowledgements
+SMALLTALK_WORDS = {
+    "hi", "hii", "hello", "hey", "hlo", "namaste", "good", "morning", "afternoon", "evening",
+    "thanks", "thank", "you", "thx", "ty", "ok", "okay", "k", "cool", "great", "bye", "goodbye",
+    "welcome", "nice", "fine", "there", "lia", "sir", "madam", "dear", "noted", "got", "it",
+}
+
+# A greeting, thanks or goodbye is what makes such a message small talk. Bare
+# acknowledgements ("ok", "fine", "got it") usually answer the bot's last
+# question (e.g. "connect to a support specialist?") and need the full rules.
+SMALLTALK_MARKERS = {
+    "hi", "hii", "hello", "hey", "hlo", "namaste", "morning", "afternoon", "evening",
+    "thanks", "thank", "thx", "ty", "bye", "goodbye",
+}
+
+def is_smalltalk(words):
+    return words <= SMALLTALK_WORDS and bool(words & SMALLTALK_MARKERS)
+
+INTENT_KEYWORDS = {
+    "handover": {"human", "agent", "executive", "specialist", "representative", "person", "talk", "connect",
+                 "support", "call", "callback"},
+    "status": {"status", "application", "approved", "approval", "pending", "esign", "awb", "track",
+               "tracking", "shipment", "dispatched", "dispatch", "courier", "delivered", "delivery"},
+    "purchase": {"buy", "purchase", "price", "pricing", "cost", "costs", "renew", "renewal", "order", "payment"},
+    "knowledge": {"dsc", "certificate", "class", "token", "usb", "ssl", "pki", "error", "install",
+                  "download", "video", "guide", "tutorial", "steps", "gst", "itr",
+                  "dgft", "icegate", "tender", "mca", "kyc", "aadhaar", "aadhar", "pan", "embridge",
+                  "invoice", "refund", "sign", "signature", "encryption", "mime", "enrollment", "pin"},
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def classify_intents(message):
+    """
+    Keyword intent classifier. Returns a set of intents; an empty set means
+    "unknown" and selects every section (follow-ups like "yes, go on" need
+    the full rules).
+    """
+    words = set(_WORD_RE.findall((message or "").lower()))
+    if not words:
+        return set()
+    if is_smalltalk(words):
+        return {"smalltalk"}
+    return {intent for intent, keywords in INTENT_KEYWORDS.items() if words & keywords}
+
+def select_sections(intents):
+    """Section names for the intents, in prompt order."""
+    if not intents or not config.PROMPT_SCOPING_ENABLED:
+        return tuple(PROMPT_SECTIONS)
+    wanted = set(ALWAYS_SECTIONS)
+    for intent in intents:
+        wanted.update(INTENT_SECTIONS[intent])
+    return tuple(name for name in PROMPT_SECTIONS if name in wanted)
+
+@lru_cache(maxsize=64)
+def _assemble(sections):
+    text = "\n---\n".join(PROMPT_SECTIONS[name] for name in sections)
+    return text, count_tokens(text)
+
+class PromptSelection:
+    __slots__ = ("intents", "sections", "text", "tokens")
+
+    def __init__(self, intents, sections, text, tokens):
+        self.intents = intents
+        self.sections = sections
+        self.text = text
+        self.tokens = tokens
+
+# =========================================================
+# 🧱 PROMPT BUILDER
+# =========================================================
+
+class PromptBuilder:
+    """
+    Assembles the system prompt for one turn from the sections relevant to
+    the user's message, and keeps per-request token accounting against the
+    full prompt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.full_tokens = _assemble(tuple(PROMPT_SECTIONS))[1]
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.intent_counts = {}
+
+    def build(self, message):
+        intents = classify_intents(message)
+        sections = select_sections(intents)
+        text, tokens = _assemble(sections)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += tokens
+            label = ",".join(sorted(intents)) or "unknown"
+            self.intent_counts[label] = self.intent_counts.get(label, 0) + 1
+        return PromptSelection(intents, sections, text, tokens)
+
+    def stats(self):
+        with self._lock:
+            requests = self.requests
+            sent = self.prompt_tokens
+            intents = dict(self.intent_counts)
+        return {
+            "requests": requests,
+            "full_prompt_tokens": self.full_tokens,
+            "avg_prompt_tokens": round(sent / requests, 1) if requests else 0,
+            "tokens_saved": requests * self.full_tokens - sent,
+            "intents": intents,
+        }
+
+def section_token_report():
+    """Tokens per section plus the full prompt, for before/after comparisons."""
+    report = {name: count_tokens(text) for name, text in PROMPT_SECTIONS.items()}
+    report["total"] = _assemble(tuple(PROMPT_SECTIONS))[1]
+    return report
+
+PROMPT_BUILDER = PromptBuilder()
+
+if __name__ == "__main__":
+    import sys
+
+    print(f"Token counter: {'tiktoken' if _encoding() else 'estimate (len/4)'}")
+    for name, tokens in section_token_report().items():
+        print(f"{name:<20}{tokens:>8}")
+    for message in sys.argv[1:]:
+        selection = PROMPT_BUILDER.build(message)
+        print(f"\n{message!r}: intents={sorted(selection.intents) or ['unknown']} "
+              f"tokens={selection.tokens} sections={', '.join(selection.sections)}")
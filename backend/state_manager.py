@@ -1,79 +1,275 @@
 import os
+import copy
 import json
-import psycopg2
+import time
+import threading
 import config 
+import db_pool
+import agent_queue
+from collections import OrderedDict
 from logger_config import get_logger
 from langchain_core.messages import HumanMessage, AIMessage
 
 logger = get_logger(__name__)
-DB_URL = config.POSTGRES_DB_URL
+
+VERSION_KEY = "_version"
+MAX_WRITE_RETRIES = 3
+READ_RETRY_DELAY_SECONDS = 0.2
+
+# =========================================================
+# ⚡ SESSION CACHE (In-Process, Write-Through)
+# =========================================================
+
+class SessionCache:
+    """
+    LRU + TTL cache of session_data. Every successful DB write refreshes it.
+    A hit is only used after checking that its version is still the stored
+    one (a one-column read), so writes and deletes from other workers are
+    never missed; the saving is the session_data read and JSON decode.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # session_id -> (data, version, cached_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.conflicts = 0
+
+    def get(self, session_id):
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry and time.monotonic() - entry[2] <= self.ttl_seconds:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return copy.deepcopy(entry[0]), entry[1]
+            if entry:
+                del self._entries[session_id]
+            self.misses += 1
+            return None
+
+    def put(self, session_id, data, version):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = (copy.deepcopy(data), version, time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def discard_mobile(self, mobile):
+        with self._lock:
+            stale = [sid for sid, (data, _, _) in self._entries.items() if data.get("mobile") == mobile]
+            for sid in stale:
+                del self._entries[sid]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "conflicts": self.conflicts,
+            "entries": len(self._entries),
+        }
+
+SESSION_CACHE = SessionCache(config.SESSION_CACHE_MAX_ENTRIES, config.SESSION_CACHE_TTL_SECONDS)
+
+# =========================================================
+# 🧾 SESSION UNIT OF WORK
+# =========================================================
+
+class SessionState:
+    """
+    One request's view of a session: loaded once, mutated in memory and
+    written back with a single flush(). Writes are version-checked, so a
+    concurrent change from another worker is merged instead of overwritten.
+    """
+
+    def __init__(self, session_id, data, version):
+        self.session_id = session_id
+        self.data = data
+        self.version = version
+        self._dirty = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, updates):
+        self.data.update(updates)
+        self._dirty.update(updates)
+
+    @property
+    def dirty(self):
+        return bool(self._dirty)
+
+    def flush(self, expected=None):
+        """
+        Writes pending changes (no-op when nothing changed). `expected` is an
+        optional {key: value} checked against the re-read row after every
+        conflict: if it no longer holds, the changes were computed from an
+        older state and are dropped instead of re-applied. Returns True when
+        the changes were written (or there were none).
+        """
+        if not self._dirty:
+            return True
+        for _ in range(MAX_WRITE_RETRIES):
+            if StateManager._set_data(self.session_id, self.data, self.version):
+                self.version += 1
+                self._dirty = {}
+                return True
+            # Someone else wrote first (or the write failed): re-read and re-apply only our changes
+            SESSION_CACHE.conflicts += 1
+            SESSION_CACHE.discard(self.session_id)
+            row = StateManager._get_row(self.session_id)
+            if row is None:
+                # DB unreachable: keep the changes and try the same write again
+                logger.warning(f"⚠️ Could not re-read {self.session_id} after a failed write, retrying")
+                time.sleep(READ_RETRY_DELAY_SECONDS)
+                continue
+            fresh, fresh_version = row
+            if self.version > 0 and fresh_version == 0:
+                # Row deleted meanwhile (e.g. a new login for this mobile); don't bring it back
+                logger.warning(f"⚠️ Session {self.session_id} was cleared; dropping its pending changes")
+                self._dirty = {}
+                return False
+            if expected and any(fresh.get(key, 0) != value for key, value in expected.items()):
+                self._dirty = {}
+                return False
+            fresh.update(self._dirty)
+            self.data, self.version = fresh, fresh_version
+        logger.error(f"❌ Gave up writing {self.session_id} after {MAX_WRITE_RETRIES} tries; pending changes not saved: {sorted(self._dirty)}")
+        return False
 
 class StateManager:
     
+    # --- CORE: GET DATA (Strictly DB) ---
     @staticmethod
-    def _get_connection():
-        """Establishes connection to Postgres"""
-        if not DB_URL: return None
-        try:
-            return psycopg2.connect(DB_URL)
-        except Exception as e:
-            logger.error(f"❌ DB Connection Error: {e}")
-            return None
+    def _get_row(session_id):
+        """Reads (session_data, version) from the DB, bypassing the cache. None when the read failed."""
+        with db_pool.connection() as conn:
+            if not conn: return None
+            
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT session_data FROM active_user_sessions WHERE session_id = %s", (session_id,))
+                row = cur.fetchone()
+                cur.close()
+                
+                data = (row[0] if row else None) or {}
+                version = int(data.pop(VERSION_KEY, 0))
+                SESSION_CACHE.put(session_id, data, version)
+                return data, version
+                
+            except Exception as e:
+                logger.warning(f"⚠️ DB Read Error ({session_id}): {e}")
+                return None
+
+    @staticmethod
+    def _stored_version(session_id):
+        """Current version of the row (0 when it doesn't exist), None when the DB can't be reached."""
+        with db_pool.connection() as conn:
+            if not conn: return None
+
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT COALESCE((session_data->>'_version')::int, 0) FROM active_user_sessions WHERE session_id = %s",
+                    (session_id,)
+                )
+                row = cur.fetchone()
+                cur.close()
+                return row[0] if row else 0
+            except Exception as e:
+                logger.warning(f"⚠️ DB Version Read Error ({session_id}): {e}")
+                return None
+
+    @staticmethod
+    def _read(session_id):
+        """(data, version): the cached copy if it is still the stored version, else a full read."""
+        cached = SESSION_CACHE.get(session_id)
+        if cached:
+            stored = StateManager._stored_version(session_id)
+            if stored is None or stored == cached[1]:
+                return cached
+            SESSION_CACHE.stale += 1
+            SESSION_CACHE.discard(session_id)
+        # DB unavailable: start from an empty session, as before
+        return StateManager._get_row(session_id) or ({}, 0)
 
-    # --- CORE: GET DATA (Strictly DB) ---
     @staticmethod
     def _get_data(session_id):
-        conn = StateManager._get_connection()
-        if not conn: return {}
-        
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT session_data FROM active_user_sessions WHERE session_id = %s", (session_id,))
-            row = cur.fetchone()
-            cur.close()
-            conn.close()
-            
-            if row: return row[0]
-            return {}
-            
-        except Exception as e:
-            logger.warning(f"⚠️ DB Read Error ({session_id}): {e}")
-            if conn: conn.close()
-            return {}
+        return StateManager._read(session_id)[0]
 
     # --- CORE: SET DATA (Strictly DB) ---
     @staticmethod
-    def _set_data(session_id, data):
-        conn = StateManager._get_connection()
-        if not conn: return
+    def _set_data(session_id, data, expected_version):
+        """
+        Compare-and-set write. Returns False when another writer bumped the
+        version since it was read, when the row was deleted meanwhile (only
+        version 0 may insert), or when the write failed.
+        """
+        with db_pool.connection() as conn:
+            if not conn: return False
 
-        try:
-            cur = conn.cursor()
-            json_data = json.dumps(data)
-            
-            sql = """
-            INSERT INTO active_user_sessions (session_id, session_data, updated_at)
-            VALUES (%s, %s, NOW())
-            ON CONFLICT (session_id) 
-            DO UPDATE SET session_data = EXCLUDED.session_data, updated_at = NOW();
-            """
-            cur.execute(sql, (session_id, json_data))
-            conn.commit()
-            cur.close()
-            conn.close()
-        except Exception as e:
-            logger.warning(f"⚠️ DB Write Error: {e}")
-            if conn: conn.close()
+            try:
+                cur = conn.cursor()
+                payload = dict(data)
+                payload[VERSION_KEY] = expected_version + 1
+                json_data = json.dumps(payload)
+                
+                if expected_version == 0:
+                    sql = """
+                    INSERT INTO active_user_sessions (session_id, session_data, updated_at)
+                    VALUES (%s, %s, NOW())
+                    ON CONFLICT (session_id) 
+                    DO UPDATE SET session_data = EXCLUDED.session_data, updated_at = NOW()
+                    WHERE COALESCE((active_user_sessions.session_data->>'_version')::int, 0) = 0
+                    RETURNING 1;
+                    """
+                    cur.execute(sql, (session_id, json_data))
+                else:
+                    sql = """
+                    UPDATE active_user_sessions SET session_data = %s, updated_at = NOW()
+                    WHERE session_id = %s
+                      AND COALESCE((session_data->>'_version')::int, 0) = %s
+                    RETURNING 1;
+                    """
+                    cur.execute(sql, (json_data, session_id, expected_version))
+                written = cur.fetchone() is not None
+                conn.commit()
+                cur.close()
+
+                if written:
+                    SESSION_CACHE.put(session_id, data, expected_version + 1)
+                return written
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"❌ DB Write Error ({session_id}): {e}")
+                return False
 
     # =========================================================
     # PUBLIC METHODS
     # =========================================================
 
+    @staticmethod
+    def load_session(session_id):
+        """Starts a unit of work: one read (or cache hit) for the whole request."""
+        data, version = StateManager._read(session_id)
+        return SessionState(session_id, data, version)
+
     @staticmethod
     def update_session(session_id, updates):
-        current_data = StateManager._get_data(session_id)
-        current_data.update(updates)
-        StateManager._set_data(session_id, current_data)
+        session = StateManager.load_session(session_id)
+        session.update(updates)
+        session.flush()
 
     @staticmethod
     def get_state(session_id):
@@ -100,38 +296,26 @@ class StateManager:
 
     @staticmethod
     def clear_previous_sessions_for_mobile(mobile):
-        conn = StateManager._get_connection()
-        if conn:
-            try:
-                cur = conn.cursor()
-                sql = "DELETE FROM active_user_sessions WHERE session_data->>'mobile' = %s"
-                cur.execute(sql, (mobile,))
-                conn.commit()
-                cur.close()
-                conn.close()
-            except: pass
+        with db_pool.connection() as conn:
+            if conn:
+                try:
+                    cur = conn.cursor()
+                    sql = "DELETE FROM active_user_sessions WHERE session_data->>'mobile' = %s"
+                    cur.execute(sql, (mobile,))
+                    conn.commit()
+                    cur.close()
+                except: pass
+        SESSION_CACHE.discard_mobile(mobile)
 
-    # --- AGENT QUEUE (DB Based) ---
+    # --- AGENT QUEUE (Dedicated append-only table, see agent_queue.py) ---
     @staticmethod
     def queue_agent_message(session_id, message):
-        data = StateManager._get_data(session_id)
-        queue = data.get("agent_queue", [])
-        
-        if queue and queue[-1] == message: return
-
-        queue.append(message)
         logger.info(f"📥 Queueing for {session_id} -> {message}")
-        StateManager.update_session(session_id, {"agent_queue": queue})
+        agent_queue.enqueue(session_id, message)
 
     @staticmethod
     def get_agent_messages(session_id):
-        data = StateManager._get_data(session_id)
-        queue = data.get("agent_queue", [])
-        
-        if queue:
-            StateManager.update_session(session_id, {"agent_queue": []})
-            return queue
-        return []
+        return agent_queue.drain(session_id)
 
     # =========================================================
     # 🔥 AI CHAT HISTORY MANAGEMENT (DB Based) 🔥
@@ -153,8 +337,8 @@ class StateManager:
 
     @staticmethod
     def update_chat_history(session_id, user_msg, bot_msg):
-        data = StateManager._get_data(session_id)
-        current_history = data.get("ai_history", [])
+        session = StateManager.load_session(session_id)
+        current_history = session.get("ai_history", [])
         
         if user_msg:
             current_history.append({"type": "human", "content": user_msg})
@@ -164,4 +348,5 @@ class StateManager:
         if len(current_history) > 20: 
             current_history = current_history[-20:]
             
-        StateManager.update_session(session_id, {"ai_history": current_history})
\ No newline at end of file
+        session.update({"ai_history": current_history})
+        session.flush()
\ No newline at end of file
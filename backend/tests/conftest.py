@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules are flat (import config, import pii_masking, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
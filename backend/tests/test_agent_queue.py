@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+import config
+import agent_queue
+
+@pytest.fixture(autouse=True)
+def memory_queue(monkeypatch):
+    # No Postgres configured: agent_queue falls back to its in-process queue
+    monkeypatch.setattr(config, "POSTGRES_DB_URL", None)
+    agent_queue._memory_queues.clear()
+
+def _stream(session_id, fail_on_chunk):
+    """Serves the session's queue over SSE to a client that drops on the given body chunk."""
+    async def event_stream():
+        async for _, message in agent_queue.deliver(session_id):
+            yield f"event: agent_message\ndata: {message['text']}\n\n"
+
+    received = []
+
+    async def send(event):
+        if event["type"] != "http.response.body" or not event.get("body"):
+            return
+        if len(received) + 1 == fail_on_chunk:
+            raise OSError("connection reset by peer")
+        received.append(event["body"].decode())
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def run():
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        try:
+            await StreamingResponse(event_stream(), media_type="text/event-stream")(scope, receive, send)
+        except ClientDisconnect:
+            pass
+
+    asyncio.run(run())
+    return received
+
+def _queued(session_id):
+    return [message["text"] for _, message in agent_queue.pending(session_id)]
+
+def test_connection_dropped_mid_stream_keeps_unsent_messages():
+    for text in ("one", "two", "three"):
+        agent_queue.enqueue("s1", {"text": text})
+
+    received = _stream("s1", fail_on_chunk=2)
+
+    assert received == ["event: agent_message\ndata: one\n\n"]
+    assert _queued("s1") == ["two", "three"]
+
+    # The reconnecting client gets the rest, in order, and the queue empties
+    received = _stream("s1", fail_on_chunk=None)
+    assert [chunk.split("data: ")[1].strip() for chunk in received] == ["two", "three"]
+    assert _queued("s1") == []
+
+def test_poll_drain_still_removes_everything():
+    agent_queue.enqueue("s2", {"text": "hi"})
+    assert agent_queue.drain("s2") == [{"text": "hi"}]
+    assert agent_queue.drain("s2") == []
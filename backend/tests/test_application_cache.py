@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from application_cache import ApplicationDetailsCache
+
+def _run(cache, mobile, fetch):
+    return asyncio.run(cache.get(mobile, fetch))
+
+def _expire(cache, mobile, age):
+    data, fetched_at = cache._entries[mobile]
+    cache._entries[mobile] = (data, fetched_at - age)
+
+async def _ok(mobile):
+    return {"status": "approved"}
+
+async def _down(mobile):
+    raise ConnectionError("eMudhra API timed out")
+
+def test_expired_entry_is_refetched_while_upstream_is_healthy():
+    cache = ApplicationDetailsCache(ttl_seconds=60, stale_if_error_seconds=600)
+
+    async def pending(mobile):
+        return {"status": "pending"}
+
+    assert _run(cache, "9999999999", pending) == {"status": "pending"}
+    _expire(cache, "9999999999", 120)
+
+    assert _run(cache, "9999999999", _ok) == {"status": "approved"}
+    assert cache.stale_served == 0
+
+def test_stale_entry_is_served_only_when_upstream_fails():
+    cache = ApplicationDetailsCache(ttl_seconds=60, stale_if_error_seconds=600)
+    _run(cache, "9999999999", _ok)
+    _expire(cache, "9999999999", 120)
+
+    assert _run(cache, "9999999999", _down) == {"status": "approved"}
+    assert cache.stale_served == 1
+
+    _expire(cache, "9999999999", 600)
+    with pytest.raises(ConnectionError):
+        _run(cache, "9999999999", _down)
@@ -0,0 +1,51 @@
+import pytest
+from langchain_core.documents import Document
+from bm25_index import BM25Index, is_code_like, reciprocal_rank_fusion
+
+ERROR_CHUNKS = [
+    "Error 0x80090016: Keyset does not exist. Fix: reinstall the token driver and re-insert the token.",
+    "CKR_PIN_INCORRECT: the PIN entered is wrong. Fix: reset the PIN using the token admin tool.",
+    "Installer error 1603: run the setup as administrator and disable the antivirus.",
+    "The signer utility could not start. Restart the emBridge service from the task manager.",
+]
+
+def _docs(texts, source="Error_Doc"):
+    return [Document(page_content=t, metadata={"source": source}) for t in texts]
+
+def _contents(hits):
+    return [doc.page_content for doc, _ in hits]
+
+def test_codes_and_identifiers_are_code_like():
+    for token in ("0x80090016", "err-1023", "e1001", "ckr_pin_incorrect", "80090016", "16030"):
+        assert is_code_like(token), token
+
+def test_years_dates_and_short_numbers_are_not_code_like():
+    for token in ("2024", "1603", "12-05-2024", "10.5", "123", "token", "pin"):
+        assert not is_code_like(token), token
+
+def test_exact_code_is_a_strong_hit():
+    hits, strong = BM25Index(_docs(ERROR_CHUNKS)).search("getting 0x80090016 on signing")
+    assert strong
+    assert _contents(hits)[0] == ERROR_CHUNKS[0]
+
+def test_fully_covered_query_is_a_strong_hit():
+    hits, strong = BM25Index(_docs(ERROR_CHUNKS)).search("restart embridge service task manager")
+    assert strong
+    assert _contents(hits)[0] == ERROR_CHUNKS[3]
+
+def test_vague_queries_are_not_strong():
+    index = BM25Index(_docs(ERROR_CHUNKS))
+    for query in ("token problem", "the token does not work with my new laptop", "dsc bought in 2024 fails"):
+        assert not index.search(query)[1], query
+
+def test_rrf_merges_by_rank_and_dedupes_by_content():
+    a, b, c = _docs(["alpha", "bravo", "charlie"])
+    vector = [(a, 0.1), (b, 0.2), (c, 0.3)]
+    # Same content as `c`/`b` but different Document objects, as FAISS and BM25 return
+    lexical = [(Document(page_content="charlie"), 9.0), (Document(page_content="bravo"), 5.0)]
+
+    fused = reciprocal_rank_fusion([vector, lexical], k=3, rrf_k=60)
+
+    assert _contents(fused) == ["charlie", "bravo", "alpha"]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2][1] == pytest.approx(1 / 61)
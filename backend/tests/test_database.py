@@ -0,0 +1,84 @@
+import threading
+import time
+from contextlib import contextmanager
+import database
+from database import ChatLogWriter
+
+class FakeDB:
+    """Stands in for db_pool.connection + execute_values; fails the first `failures` writes."""
+
+    def __init__(self, failures=0, gate=None):
+        self.failures = failures
+        self.gate = gate
+        self.rows = []
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def execute_values(self, cur, sql, rows, template=None):
+        if self.gate:
+            self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.rows.extend(rows)
+
+def _writer(monkeypatch, db, **kwargs):
+    monkeypatch.setattr(database.db_pool, "connection", db.connection)
+    monkeypatch.setattr(database, "execute_values", db.execute_values)
+    return ChatLogWriter(flush_interval=0.05, retry_delay=0, **kwargs)
+
+def _entry(session_id):
+    return (session_id, "9999999999", None, [{"source": "user", "message": "hi"}])
+
+def test_failed_batch_is_retried_once(monkeypatch):
+    db = FakeDB(failures=1)
+    writer = _writer(monkeypatch, db)
+    writer.submit(_entry("s1"))
+    writer.close()
+
+    assert [row[0] for row in db.rows] == ["s1"]
+    assert writer.stats()["retried_batches"] == 1
+    assert writer.stats()["failed_batches"] == 0
+
+def test_batch_failing_twice_is_counted_as_dropped(monkeypatch):
+    db = FakeDB(failures=2)
+    writer = _writer(monkeypatch, db)
+    writer.submit(_entry("s1"))
+    writer.submit(_entry("s2"))
+    writer.close()
+
+    assert db.rows == []
+    stats = writer.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["failed"] == 2
+
+def test_close_with_full_queue_returns_and_writer_still_stops(monkeypatch):
+    gate = threading.Event()
+    db = FakeDB(gate=gate)
+    writer = _writer(monkeypatch, db, batch_size=1, max_queue=2)
+    writer.submit(_entry("s0"))
+    time.sleep(0.1)  # writer thread is now stuck inside the upsert
+    writer.submit(_entry("s1"))
+    writer.submit(_entry("s2"))
+
+    # The queue is full, so _STOP can't be enqueued; close() must not hang on it
+    started = time.monotonic()
+    writer.close(timeout=1)
+    assert time.monotonic() - started < 2
+
+    # Once the DB recovers, the stop flag drains the queue and ends the thread
+    gate.set()
+    writer._thread.join(timeout=2)
+    assert not writer._thread.is_alive()
+    assert sorted(row[0] for row in db.rows) == ["s0", "s1", "s2"]
@@ -0,0 +1,40 @@
+from error_code_index import ErrorCodeIndex
+
+ERROR_DOC = """Token Errors
+
+Error 0x80090016: Keyset does not exist.
+Fix: Reinstall the token driver and re-insert the token.
+
+CKR_PIN_INCORRECT: The PIN entered is wrong.
+Fix: Reset the PIN using the token admin tool.
+
+Error Code: 1603
+The installer failed. Run the setup as administrator.
+
+ERR-1023: The signer utility could not start.
+"""
+
+def _codes(index, query):
+    return [(entry.codes[0], match_type) for entry, match_type in index.lookup(query)]
+
+def test_exact_and_normalized_codes():
+    index = ErrorCodeIndex.from_text(ERROR_DOC)
+    assert _codes(index, "getting 0x80090016") == [("0x80090016", "exact")]
+    assert _codes(index, "error 0X8009-0016 on sign") == [("0x80090016", "normalized")]
+    assert _codes(index, "setup shows err1023") == [("ERR-1023", "normalized")]
+
+def test_symbolic_names_match_fuzzy():
+    index = ErrorCodeIndex.from_text(ERROR_DOC)
+    assert _codes(index, "token says CKR_PIN_INCORECT") == [("CKR_PIN_INCORRECT", "fuzzy")]
+
+def test_near_miss_numeric_and_hex_codes_do_not_match():
+    index = ErrorCodeIndex.from_text(ERROR_DOC)
+    assert _codes(index, "getting 0x80090017") == []
+    assert _codes(index, "error 16030 while installing") == []
+    assert _codes(index, "error code 1604") == []
+    assert _codes(index, "ERR-1024 in the utility") == []
+
+def test_plain_numbers_match_only_listed_codes():
+    index = ErrorCodeIndex.from_text(ERROR_DOC)
+    assert _codes(index, "installer says 1603") == [("1603", "exact")]
+    assert _codes(index, "token bought in 2024 stopped working") == []
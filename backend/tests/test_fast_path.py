@@ -0,0 +1,38 @@
+from fast_path import FastPathRouter, GREETING, HANDOVER, PURCHASE, STATUS
+
+def _route(message):
+    match = FastPathRouter(max_words=8).route(message)
+    return match.route if match else None
+
+def test_explicit_handover_requests():
+    for message in ("talk to a human", "connect me to an agent", "can I speak to customer support",
+                    "I need help from a live agent", "customer care please"):
+        assert _route(message) == HANDOVER, message
+
+def test_descriptive_messages_mentioning_support_go_to_agent():
+    for message in (
+        "customer support told me to reinstall the driver but the token is still not detected",
+        "I tried to connect the token as the agent said and now I get error 0x80090016",
+        "why does customer support need my PAN for class 3",
+        "chat support agent said error 1603 on installation",
+        "how do I connect with support agent",
+        "i don't want to talk to an agent",
+    ):
+        assert _route(message) is None, message
+
+def test_other_routes():
+    assert _route("hi") == GREETING
+    assert _route("buy usb token") == PURCHASE
+    assert _route("show my application status") == STATUS
+    assert _route("which dsc class should I buy") is None
+
+def test_acknowledgements_reach_the_agent():
+    # "ok" may answer "Would you like to connect to a support specialist?"
+    for message in ("ok", "okay got it", "fine", "great", "noted", "ok sir"):
+        assert _route(message) is None, message
+
+def test_greetings_thanks_and_goodbyes():
+    router = FastPathRouter(max_words=8)
+    assert router.route("good morning").response.startswith("Hello!")
+    assert router.route("ok thanks").response.startswith("You're welcome!")
+    assert router.route("ok bye").response.startswith("Thank you for contacting eMudhra")
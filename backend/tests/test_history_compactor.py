@@ -0,0 +1,65 @@
+import state_manager
+from state_manager import StateManager
+from history_compactor import HistoryCompactor
+
+class FakeStore:
+    """active_user_sessions row for one session, with the same version CAS as _set_data."""
+
+    def __init__(self, data, version):
+        self.data, self.version = data, version
+        self.writes = []
+
+    def get_row(self, session_id):
+        return dict(self.data), self.version
+
+    def set_data(self, session_id, data, expected_version):
+        if expected_version != self.version:
+            return False
+        self.data, self.version = dict(data), expected_version + 1
+        self.writes.append(dict(data))
+        return True
+
+def _install(monkeypatch, store):
+    monkeypatch.setattr(StateManager, "_read", staticmethod(store.get_row))
+    monkeypatch.setattr(StateManager, "_get_row", staticmethod(store.get_row))
+    monkeypatch.setattr(StateManager, "_set_data", staticmethod(store.set_data))
+    monkeypatch.setattr(state_manager, "SESSION_CACHE", state_manager.SessionCache(10, 0))
+
+def test_persist_writes_when_rev_unchanged(monkeypatch):
+    store = FakeStore({"ai_history_rev": 3}, 5)
+    _install(monkeypatch, store)
+
+    assert HistoryCompactor._persist("s1", 3, {"ai_summary": "sum", "ai_history_rev": 4})
+    assert store.data == {"ai_summary": "sum", "ai_history_rev": 4}
+
+def test_persist_gives_up_when_a_turn_lands_before_the_write(monkeypatch):
+    store = FakeStore({"ai_history_rev": 3, "ai_history": ["old"]}, 5)
+    _install(monkeypatch, store)
+    set_data = store.set_data
+
+    def turn_written_first(session_id, data, expected_version):
+        # A chat turn commits between our load and our write
+        store.data, store.version = {"ai_history_rev": 4, "ai_history": ["old", "new"]}, store.version + 1
+        monkeypatch.setattr(StateManager, "_set_data", staticmethod(set_data))
+        return False
+
+    monkeypatch.setattr(StateManager, "_set_data", staticmethod(turn_written_first))
+
+    assert not HistoryCompactor._persist("s1", 3, {"ai_summary": "sum", "ai_history": [], "ai_history_rev": 4})
+    assert store.writes == []
+    assert store.data["ai_history"] == ["old", "new"]
+
+def test_persist_retries_past_unrelated_writes(monkeypatch):
+    store = FakeStore({"ai_history_rev": 3}, 5)
+    _install(monkeypatch, store)
+    set_data = store.set_data
+
+    def other_key_written_first(session_id, data, expected_version):
+        store.data, store.version = {"ai_history_rev": 3, "otp_sent": True}, store.version + 1
+        monkeypatch.setattr(StateManager, "_set_data", staticmethod(set_data))
+        return False
+
+    monkeypatch.setattr(StateManager, "_set_data", staticmethod(other_key_written_first))
+
+    assert HistoryCompactor._persist("s1", 3, {"ai_summary": "sum", "ai_history_rev": 4})
+    assert store.data == {"ai_history_rev": 4, "otp_sent": True, "ai_summary": "sum"}
@@ -0,0 +1,47 @@
+import importlib
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+import config
+import http_client
+from bm25_index import BM25Index
+from test_bm25_index import ERROR_CHUNKS, _docs, _contents
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+@pytest.fixture(scope="module")
+def knowledge_base(tmp_path_factory):
+    # Imported offline: no API key, no doc download, snapshots in a temp dir
+    index_dir = tmp_path_factory.mktemp("kb_index")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(config, "OPENAI_API_KEY", config.OPENAI_API_KEY or "sk-test")
+        mp.setattr(config, "KB_INDEX_DIR", str(index_dir))
+        mp.setattr(config, "EMBEDDING_CACHE_PATH", str(index_dir / "embedding_cache.sqlite3"))
+        mp.setattr(http_client, "get", lambda *a, **k: (_ for _ in ()).throw(ConnectionError("offline")))
+        yield importlib.import_module("knowledge_base")
+
+@pytest.fixture
+def error_store(knowledge_base, monkeypatch):
+    embeddings = CountingEmbeddings(size=16)
+    store = FAISS.from_documents(_docs(ERROR_CHUNKS), embeddings)
+    monkeypatch.setattr(knowledge_base, "embeddings", embeddings)
+    monkeypatch.setattr(knowledge_base, "VECTOR_STORES", {"Error_Doc": store})
+    monkeypatch.setattr(knowledge_base, "LEXICAL_INDEXES", {"Error_Doc": BM25Index(_docs(ERROR_CHUNKS))})
+    return embeddings
+
+def test_hybrid_strong_lexical_hit_makes_no_embedding_call(knowledge_base, error_store):
+    results = knowledge_base.search_knowledge_base("0x80090016", k=2, mode="hybrid")
+
+    assert error_store.calls == 0
+    assert _contents(results["Error_Doc"])[0] == ERROR_CHUNKS[0]
+
+def test_hybrid_vague_query_embeds_once_and_fuses(knowledge_base, error_store):
+    results = knowledge_base.search_knowledge_base("token problem", k=2, mode="hybrid")
+
+    assert error_store.calls == 1
+    assert len(results["Error_Doc"]) == 2
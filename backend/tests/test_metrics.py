@@ -0,0 +1,14 @@
+from metrics import SessionActivity
+
+def test_touch_prunes_idle_sessions_without_a_scrape(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("metrics.time.monotonic", lambda: now[0])
+    activity = SessionActivity(window=300)
+
+    for i in range(100):
+        activity.touch(f"s{i}")
+    now[0] += 301
+    activity.touch("late")
+
+    assert list(activity._last_seen) == ["late"]
+    assert activity.count() == 1
@@ -0,0 +1,37 @@
+import random
+from pii_masking import mask_pii, StreamingMasker
+from benchmark_masking import CORPUS, AADHAAR_A, SPACED_AADHAAR
+
+def _stream(text, sizes):
+    masker = StreamingMasker()
+    out, i = [], 0
+    for size in sizes:
+        out.append(masker.feed(text[i:i + size]))
+        i += size
+    out.append(masker.feed(text[i:]))
+    return "".join(out) + masker.flush()
+
+def test_mask_pii_corpus():
+    for case in CORPUS:
+        output = mask_pii(case["text"])
+        assert all(value not in output for value in case["pii"]), case["text"]
+        assert all(value in output for value in case["keep"]), case["text"]
+
+def test_streaming_matches_whole_text_for_random_splits():
+    rng = random.Random(7)
+    pieces = ["9876543210", "+91 98765 43210", "919812345678", AADHAAR_A, SPACED_AADHAAR, "ABCPE1234F",
+              "0x80090016", "CKR_PIN_INCORRECT", "1234567890", "please call me on", "my PAN is", "error code",
+              "aadhaar", ",", ".", ":"]
+    for _ in range(5000):
+        text = "".join(rng.choice(pieces) + rng.choice(["", " ", ", ", "\n"]) for _ in range(rng.randint(2, 20)))
+        sizes = [rng.randint(1, rng.choice((3, 8, 30))) for _ in range(len(text))]
+        assert _stream(text, sizes) == mask_pii(text), text
+
+def test_streaming_never_releases_unmasked_digits():
+    text = "aadhaar 234567890124 token 0x80090016 8765 4321 0988 number"
+    masker = StreamingMasker()
+    released = ""
+    for ch in text:
+        released += masker.feed(ch)
+        assert "8765" not in released and "45678901" not in released
+    assert released + masker.flush() == mask_pii(text)
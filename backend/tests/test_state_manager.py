@@ -0,0 +1,53 @@
+import state_manager
+from state_manager import StateManager, SessionState
+
+def _install(monkeypatch, writes, reads):
+    """_set_data answers from `writes` (True/False), _get_row from `reads` (row or None for a failed read)."""
+    written = []
+
+    def set_data(session_id, data, expected_version):
+        ok = writes.pop(0)
+        if ok:
+            written.append(dict(data))
+        return ok
+
+    monkeypatch.setattr(StateManager, "_set_data", staticmethod(set_data))
+    monkeypatch.setattr(StateManager, "_get_row", staticmethod(lambda session_id: reads.pop(0)))
+    monkeypatch.setattr(state_manager, "READ_RETRY_DELAY_SECONDS", 0)
+    return written
+
+def test_failed_reread_keeps_changes_and_retries(monkeypatch):
+    written = _install(monkeypatch, writes=[False, True], reads=[None])
+    session = SessionState("s1", {"mobile": "9999999999"}, 3)
+    session.update({"verified": True})
+
+    assert session.flush()
+    assert written == [{"mobile": "9999999999", "verified": True}]
+
+def test_db_down_gives_up_without_claiming_the_row_was_cleared(monkeypatch):
+    _install(monkeypatch, writes=[False] * 3, reads=[None] * 3)
+    warnings = []
+    monkeypatch.setattr(state_manager.logger, "warning", warnings.append)
+    session = SessionState("s1", {}, 3)
+    session.update({"state": "handover_active"})
+
+    assert not session.flush()
+    assert session.dirty
+    assert not any("was cleared" in w for w in warnings)
+
+def test_deleted_row_is_not_recreated(monkeypatch):
+    written = _install(monkeypatch, writes=[False], reads=[({}, 0)])
+    session = SessionState("s1", {"mobile": "9999999999"}, 3)
+    session.update({"verified": True})
+
+    assert not session.flush()
+    assert written == []
+
+def test_conflict_merges_our_changes_into_the_fresh_row(monkeypatch):
+    written = _install(monkeypatch, writes=[False, True], reads=[({"otp_sent": True}, 4)])
+    session = SessionState("s1", {}, 3)
+    session.update({"verified": True})
+
+    assert session.flush()
+    assert written == [{"otp_sent": True, "verified": True}]
+    assert session.version == 5
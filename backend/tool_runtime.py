@@ -0,0 +1,84 @@
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import StructuredTool
+import config
+import metrics
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Sync tools (vector search, web search) run here instead of the loop's default executor,
+# so a burst of tool calls cannot starve other blocking work in the worker.
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=config.TOOL_THREAD_POOL_SIZE, thread_name_prefix="agent-tool")
+
+class ToolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = {}
+
+    def record(self, name, seconds, outcome):
+        with self._lock:
+            entry = self._tools.setdefault(name, {"calls": 0, "timeouts": 0, "errors": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if outcome != "ok":
+                entry[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**entry, "seconds": round(entry["seconds"], 3), "avg_ms": round(entry["seconds"] / entry["calls"] * 1000, 1)}
+                for name, entry in self._tools.items()
+            }
+
+TOOL_STATS = ToolStats()
+
+def with_timeout(tool, timeout):
+    """
+    Returns a copy of `tool` whose async path runs in TOOL_EXECUTOR (sync
+    tools) and gives up after `timeout` seconds. A timed-out tool returns a
+    message instead of raising, so the agent can answer from the other
+    tools' results. The sync path is left unchanged.
+    """
+    name = tool.name
+    sync_func = tool.func
+    async_func = tool.coroutine
+
+    async def run(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            if async_func is not None:
+                call = async_func(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(TOOL_EXECUTOR, functools.partial(sync_func, *args, **kwargs))
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            # A sync tool's thread keeps running until it returns; its result is discarded
+            outcome = "timeouts"
+            logger.warning(f"⏱️ Tool {name} timed out after {timeout}s")
+            return f"The {name} tool timed out after {timeout:g} seconds. Use the other results or try a different tool."
+        except Exception:
+            outcome = "errors"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            TOOL_STATS.record(name, elapsed, outcome)
+            metrics.TOOL_SECONDS.observe(elapsed, name, outcome)
+
+    return StructuredTool.from_function(
+        func=sync_func,
+        coroutine=run,
+        name=name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        return_direct=tool.return_direct
+    )
+
+def prepare_tools(tools):
+    """Applies the configured per-tool timeouts (TOOL_TIMEOUTS, else TOOL_TIMEOUT_SECONDS)."""
+    return [with_timeout(t, config.TOOL_TIMEOUTS.get(t.name, config.TOOL_TIMEOUT_SECONDS)) for t in tools]
@@ -1,15 +1,13 @@
 import os
 import json
-import requests
-import hashlib
-import time
-from datetime import datetime, timedelta, timezone
 from langchain.tools import tool
 from langchain_community.tools import DuckDuckGoSearchRun
 from logger_config import get_logger # Import Logger
+from http_client import apost, emudhra_meta
+from application_cache import APPLICATION_DETAILS_CACHE
 
 import config
-from knowledge_base import faq_retriever, error_retriever
+import knowledge_base
 
 logger = get_logger(__name__)
 
@@ -32,31 +30,98 @@ def track_shipment(awb_number: str):
     """Tracks shipment using Shiprocket API given an AWB number."""
     return "Tracking functionality requires Shiprocket credentials setup."
 
-@tool
-def get_application_details(query: str = ""):
-    """Fetches application details. Auto-detects verified mobile from context."""
-    mobile_number = query.strip()
-    if not mobile_number: return "Mobile number not found in context."
-
-    now_utc = datetime.now(timezone.utc)
-    ts = (now_utc + timedelta(hours=5, minutes=30)).strftime("%Y-%m-%dT%H:%M:%S")
-    txn = f"TXN{int(time.time() * 1000)}"
-    client_key = config.CLIENT_ACCESS_KEY
-    auth_hash = hashlib.sha256(f"{client_key}{ts}{txn}".encode()).hexdigest()
-    
+async def _fetch_application_details(mobile_number):
+    """Signed call to the eMudhra status API; raises on network/HTTP/JSON errors."""
     payload = {
-        "meta": {"ver": "1.0", "ts": ts, "txn": txn, "clientCode": config.CLIENT_CODE, "clientAccessKey": auth_hash},
+        "meta": emudhra_meta(),
         "details": {"mobileNo": mobile_number, "isPIIMasked": "1"}
     }
     url = f"{config.EMUDHRA_API_URL}/CustomerCareAPI/getApplicationDetails"
     
+    resp = await apost("emudhra.application_details", url, json=payload, timeout=5)
+    resp.raise_for_status()
+    return resp.json()
+
+@tool
+async def get_application_details(query: str = ""):
+    """Fetches application details. Auto-detects verified mobile from context."""
+    mobile_number = query.strip()
+    if not mobile_number: return "Mobile number not found in context."
+
     try:
-        resp = requests.post(url, json=payload, verify=False, timeout=5)
-        return json.dumps(resp.json())
+        # Cached per mobile for a short TTL; concurrent lookups share one API call
+        data = await APPLICATION_DETAILS_CACHE.get(mobile_number, _fetch_application_details)
+        return json.dumps(data)
     except Exception as e:
         logger.error(f"Error fetching app details: {e}")
         return f"Error: {str(e)}"
 
+def format_application_details(mobile, tool_raw):
+    """Renders get_application_details output as the customer-facing status card."""
+    tool_data = json.loads(tool_raw)
+    
+    meta_status = tool_data.get("meta", {}).get("status", "0")
+    
+    if meta_status != "1":
+        return (
+            "**Application Not Found.**\n\n"
+            f"No application details found for mobile number **{mobile}**.\n\n"
+            f"[Buy Digital Signature]({config.URL_BUY_DSC})"
+        )
+
+    details = tool_data.get("details", {})
+    app_det = details.get("applicantDetails", {})
+    cert_det = details.get("schemeCertDetails", {})
+    pay_det = details.get("paymentDetails", {})
+    status_list = details.get("statusDetails", [])
+
+    name = app_det.get("commonname") or "Customer"
+    loc_parts = [app_det.get("locality"), app_det.get("state"), app_det.get("country")]
+    location = ", ".join([p for p in loc_parts if p]) or "N/A"
+    org = app_det.get("organization") or "N/A"
+    product = pay_det.get("product") or cert_det.get("certificateClass") or "Digital Signature"
+    inv_id = pay_det.get("INVOICE_ID") or "N/A"
+    pay_status = pay_det.get("status") or "Pending"
+
+    timeline_text = ""
+    def find_date(search_term):
+        for s in status_list:
+            if search_term.lower() in s.get("status", "").lower(): return s.get("dateAndTime")
+        return None
+
+    sub_date = find_date("Application Submitted")
+    if sub_date: timeline_text += f"✅ Application Submitted on {sub_date}<br>"
+    if find_date("Mobile verification") or find_date("Email verification"):
+        timeline_text += "✅ Mobile and Email verifications completed<br>"
+    
+    act_date = find_date("Account Activated") or find_date("Account Approved")
+    if act_date: timeline_text += f"✅ Account Approved on {act_date}<br>"
+    else: timeline_text += f"⏳ Current Status: {status_list[-1].get('status', 'Pending')}<br>"
+
+    table_html = """
+    <div style="background-color: #f9f9f9; border-radius: 8px; padding: 10px; margin: 10px 0; border: 1px solid #eee;">
+        <h4 style="margin: 0 0 10px 0; color: #0056b3;">Scheme Details</h4>
+        <table style="width: 100%; border-collapse: collapse; font-size: 13px;">
+    """
+    fields = {"applicationNo": "App No", "certificateClass": "Class", "validity": "Validity", "expiryDate": "Expiry"}
+    for k, l in fields.items():
+        val = cert_det.get(k, "")
+        if val: table_html += f"<tr><td style='padding:4px; font-weight:600;'>{l}</td><td style='padding:4px;'>{val}</td></tr>"
+    table_html += "</table></div>"
+
+    return (
+        f"Dear Customer,\n\n"
+        f"Below is the status for the registered mobile number {mobile}:\n\n"
+        f"**Name:** {name}\n"
+        f"**Location:** {location}\n"
+        f"**Org:** {org}\n"
+        f"**Product:** {product}\n\n"
+        f"**Timeline:**\n{timeline_text}\n"
+        f"{table_html}\n"
+        f"**Payment:** {pay_status} (Inv: {inv_id})\n\n"
+        f"[Click Here to Login]({config.URL_LOGIN})"
+    )
+
 # --- RAG TOOLS (With Logging) ---
 
 @tool
@@ -64,10 +129,11 @@ def faqdoc(query: str) -> str:
     """
     Search the FAQ Knowledge Base. 
     """
-    if not faq_retriever:
+    results = knowledge_base.search_knowledge_base(query, sources=["FAQ_Doc"])
+    if "FAQ_Doc" not in results:
         return "FAQ Database not loaded."
     
-    docs = faq_retriever.invoke(query)
+    docs = [d for d, _ in results["FAQ_Doc"]]
     
     # Log to FILE only (Console is Warning only)
     logger.info(f"🔍 FAQ SEARCH for '{query}':")
@@ -82,10 +148,20 @@ def errordscdoc(query: str) -> str:
     """
     Search the Error Troubleshooting Database.
     """
-    if not error_retriever:
+    # Named error codes are answered from the parsed code table (complete entry, no embedding)
+    index = knowledge_base.ERROR_CODE_INDEX
+    matches = index.lookup(query) if index else []
+    if matches:
+        logger.info(f"🧾 ERROR CODE LOOKUP for '{query}':")
+        for entry, match_type in matches:
+            logger.info(f"   [{match_type}] {', '.join(entry.codes)}: {entry.text[:150]}...")
+        return "\n\n".join(entry.text for entry, _ in matches)
+
+    results = knowledge_base.search_knowledge_base(query, sources=["Error_Doc"])
+    if "Error_Doc" not in results:
         return "Error Database not loaded."
     
-    docs = error_retriever.invoke(query)
+    docs = [d for d, _ in results["Error_Doc"]]
     
     logger.info(f"🔍 ERROR SEARCH for '{query}':")
     for i, d in enumerate(docs):
@@ -113,9 +189,23 @@ def query_data_tool(query: str) -> str:
     """
     General Knowledge Base Search (VectorDB).
     """
-    faq_res = faqdoc(query)
-    err_res = errordscdoc(query)
-    
+    # Hybrid BM25 + vector search over both FAQ and Error indexes (at most one embedding)
+    results = knowledge_base.search_knowledge_base(query)
+
+    logger.info(f"🔍 KB SEARCH for '{query}':")
+    for source, hits in results.items():
+        for i, (d, score) in enumerate(hits):
+            logger.info(f"   [{source} {i+1} | score {score:.3f}]: {d.page_content[:150]}...")
+
+    def _join(source, not_loaded, not_found):
+        if source not in results:
+            return not_loaded
+        text = "\n\n".join([d.page_content for d, _ in results[source]])
+        return text if text else not_found
+
+    faq_res = _join("FAQ_Doc", "FAQ Database not loaded.", "No relevant FAQ found.")
+    err_res = _join("Error_Doc", "Error Database not loaded.", "No relevant error solution found.")
+
     combined = f"FAQs:\n{faq_res}\n\nErrors:\n{err_res}"
     return combined
     
\ No newline at end of file
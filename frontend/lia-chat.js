@@ -18,6 +18,20 @@ const sendBtn = document.getElementById("lia-send-btn");
 
 let chatSessionId = null;
 let pollTimeout = null;
+let eventSource = null;
+let usePolling = false; // Set once the server push endpoint proves unavailable
+let useStreaming = true; // Cleared once /chat/stream proves unavailable
+
+// Progress text shown while the agent runs a tool
+const TOOL_LABELS = {
+    query_data_tool: "Searching the knowledge base…",
+    faqdoc: "Checking the FAQs…",
+    errordscdoc: "Looking up the error…",
+    website_search: "Searching emudhradigital.com…",
+    get_application_details: "Fetching your application details…",
+    track_shipment: "Tracking your shipment…",
+    get_purchase_links: "Finding the purchase link…"
+};
 
 // Initialize
 startNewChat(false);
@@ -33,12 +47,12 @@ function toggleChat() {
         iconClose.style.display = "block";
         setTimeout(() => inputField.focus(), 100);
         msgContainer.scrollTop = msgContainer.scrollHeight;
-        restartPolling();
+        restartLiveUpdates();
     } else {
         chatWindow.style.display = "none";
         iconChat.style.display = "block";
         iconClose.style.display = "none";
-        if(pollTimeout) clearTimeout(pollTimeout);
+        stopLiveUpdates();
     }
 }
 
@@ -58,7 +72,7 @@ function startNewChat(clearUI = true) {
         inputField.focus();
     }
     
-    restartPolling();
+    restartLiveUpdates();
 }
 
 /* ================= FORMATTING ================= */
@@ -107,17 +121,24 @@ async function sendMessage() {
     msgContainer.scrollTop = msgContainer.scrollHeight;
 
     try {
-        const res = await fetch(`${BASE_URL}/chat`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ session_id: chatSessionId, message: text })
-        });
+        let reply = null;
+        if (useStreaming && window.ReadableStream && window.TextDecoder) {
+            reply = await streamReply(text);
+        }
+        if (reply === null) {
+            // Streaming unsupported here: fall back to the plain endpoint
+            const res = await fetch(`${BASE_URL}/chat`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ session_id: chatSessionId, message: text })
+            });
 
-        const data = await res.json();
-        typing.style.display = "none";
+            const data = await res.json();
+            typing.style.display = "none";
 
-        if (data.response) {
-            addMessage(data.response, "bot");
+            if (data.response) {
+                addMessage(data.response, "bot");
+            }
         }
     } catch (error) {
         console.error("Chat Error:", error);
@@ -130,11 +151,136 @@ async function sendMessage() {
     }
 }
 
-/* ================= POLLING (ROBUST) ================= */
+/* ================= STREAMING REPLIES ================= */
+
+function parseSseFrame(frame) {
+    let event = "message";
+    const data = [];
+    frame.split("\n").forEach(line => {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+    });
+    return { event, data: data.length ? JSON.parse(data.join("\n")) : null };
+}
+
+// Streams one reply from /chat/stream into a bot bubble. Returns the final
+// response, or null if the endpoint is unavailable (nothing was sent).
+async function streamReply(text) {
+    let res;
+    try {
+        res = await fetch(`${BASE_URL}/chat/stream`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ session_id: chatSessionId, message: text })
+        });
+    } catch (err) {
+        return null;
+    }
+    if (!res.ok || !res.body) {
+        if (res.status === 404 || res.status === 405) useStreaming = false;
+        return null;
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let draft = "";
+    let bubble = null;
+
+    const showBubble = (html) => {
+        typing.style.display = "none";
+        if (!bubble) {
+            bubble = document.createElement("div");
+            bubble.className = "lia-message bot";
+            msgContainer.appendChild(bubble);
+        }
+        bubble.innerHTML = html;
+        msgContainer.scrollTop = msgContainer.scrollHeight;
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            const { event, data } = parseSseFrame(frame);
+
+            if (event === "tool" && data.status === "start") {
+                // Text before a tool call is not part of the final answer
+                draft = "";
+                showBubble(`<i>${TOOL_LABELS[data.name] || "Working on it…"}</i>`);
+            } else if (event === "token") {
+                draft += data.text;
+                showBubble(formatMessage(draft));
+            } else if (event === "done") {
+                // The final text is authoritative (e.g. handover marker removed)
+                const response = data.response || "";
+                if (response) {
+                    showBubble(formatMessage(response));
+                } else if (bubble) {
+                    bubble.remove();
+                }
+                typing.style.display = "none";
+                return response;
+            }
+        }
+    }
+    throw new Error("Stream ended before the reply was complete");
+}
+
+/* ================= LIVE AGENT MESSAGES (PUSH + POLL FALLBACK) ================= */
+
+function renderAgentMessages(messages) {
+    messages.forEach(m => addMessage(typeof m === "string" ? m : m.text, "bot"));
+}
 
-function restartPolling() {
+function stopLiveUpdates() {
     if (pollTimeout) clearTimeout(pollTimeout);
-    pollLoop();
+    pollTimeout = null;
+    if (eventSource) eventSource.close();
+    eventSource = null;
+}
+
+function restartLiveUpdates() {
+    stopLiveUpdates();
+    // Only listen while the chat is open to save resources
+    if (chatWindow.style.display !== "flex") return;
+
+    if (window.EventSource && !usePolling) {
+        openEventStream();
+    } else {
+        pollLoop();
+    }
+}
+
+function openEventStream() {
+    const url = `${BASE_URL}/chat/events?session_id=${encodeURIComponent(chatSessionId)}`;
+    const source = new EventSource(url);
+    eventSource = source;
+
+    source.addEventListener("agent_message", (e) => {
+        try {
+            const message = JSON.parse(e.data);
+            console.log("📩 Incoming Agent Message:", message);
+            renderAgentMessages([message]);
+        } catch (err) {
+            console.error("Bad agent message:", err);
+        }
+    });
+
+    source.onerror = () => {
+        // EventSource reconnects on its own; CLOSED means the server refused the stream
+        if (source.readyState === EventSource.CLOSED && eventSource === source) {
+            console.warn("⚠️ Live stream unavailable, falling back to polling");
+            usePolling = true;
+            stopLiveUpdates();
+            pollLoop();
+        }
+    };
 }
 
 async function pollLoop() {
@@ -150,7 +296,7 @@ async function pollLoop() {
             const data = await res.json();
             if (data.messages && data.messages.length > 0) {
                 console.log("📩 Incoming Agent Messages:", data.messages);
-                data.messages.forEach(m => addMessage(m, "bot"));
+                renderAgentMessages(data.messages);
             }
         }
     } catch (e) {